@@ -0,0 +1,204 @@
+"""
+This module computes bulk analytics over the delivery data of every construction site.
+
+Each site's rows are read with one grouped query into a dense sites x commodities matrix
+of required and delivered amounts, and everything else (completion per commodity,
+hauling effort rankings, what-if scenarios) is computed with NumPy array operations on
+that matrix rather than per-row Python loops. Delivery sources are summed from each
+site's delivery_log with a grouped query as well.
+
+NumPy is an optional dependency; it is only needed for this module and the analytics
+report window. Use numpy_available() to check before calling into it.
+"""
+
+import os
+import sqlite3
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from database import fetch_construction_sites, open_connection, resolve_commodity, site_registry
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('Analytics')
+
+# Cargo capacity assumed when converting remaining tonnage into trips
+CARGO_CAPACITY = 784
+
+# Source label for delivered amounts recorded before deliveries were logged
+UNLOGGED_SOURCE = "unlogged"
+
+# Dense delivery data for many sites. required and delivered are int64 arrays of shape
+# (len(sites), len(commodities)); missing combinations are 0.
+DeliveryMatrix = namedtuple('DeliveryMatrix', ['sites', 'commodities', 'required', 'delivered'])
+
+CommodityCompletion = namedtuple('CommodityCompletion',
+                                 ['commodity', 'required', 'delivered', 'percent', 'sites_remaining'])
+
+HaulingEffort = namedtuple('HaulingEffort', ['name', 'remaining', 'trips', 'percent_complete'])
+
+def numpy_available():
+    """Return True if NumPy is installed and analytics can run."""
+    return np is not None
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for analytics; install it with 'pip install numpy'")
+
+def _site_paths(sites):
+    for site in sites:
+        path = site_registry.path_for(site)
+        if path is not None and os.path.exists(path):
+            yield site, path
+
+def load_delivery_matrix(sites=None):
+    """
+    Load required and delivered amounts for many sites into a DeliveryMatrix.
+
+    Args:
+        sites (list): Site names to load; defaults to every construction site.
+    """
+    _require_numpy()
+    sites = list(fetch_construction_sites() if sites is None else sites)
+    site_index = {site: i for i, site in enumerate(sites)}
+    commodity_index = {}
+    rows, cols, required, delivered = [], [], [], []
+    for site, path in _site_paths(sites):
+        try:
+            with open_connection(path) as conn:
+                # Every row of a commodity carries the same requirement
+                cursor = conn.execute('''
+                    SELECT commodity, MAX(amount_required), SUM(quantity)
+                    FROM deliveries GROUP BY commodity
+                ''')
+                for commodity, amount_required, quantity in cursor:
+                    rows.append(site_index[site])
+                    cols.append(commodity_index.setdefault(commodity, len(commodity_index)))
+                    required.append(amount_required or 0)
+                    delivered.append(quantity or 0)
+        except sqlite3.Error as e:
+            logger.error(f"Database error loading analytics data for {site}: {e}")
+
+    shape = (len(sites), len(commodity_index))
+    matrix = DeliveryMatrix(sites, list(commodity_index), np.zeros(shape, dtype=np.int64),
+                            np.zeros(shape, dtype=np.int64))
+    if rows:
+        index = (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp))
+        matrix.required[index] = required
+        matrix.delivered[index] = delivered
+    logger.debug(f"Loaded delivery matrix of {shape[0]} sites x {shape[1]} commodities")
+    return matrix
+
+def remaining_matrix(matrix):
+    """Return the amount still needed for every site and commodity, never below zero."""
+    return np.maximum(matrix.required - matrix.delivered, 0)
+
+def _percent(part, whole):
+    # Treat nothing required as complete
+    return np.where(whole > 0, 100.0 * part / np.maximum(whole, 1), 100.0)
+
+def commodity_completion(matrix):
+    """
+    Completion of each commodity across all sites, least complete first.
+
+    Deliveries beyond a site's requirement do not count towards the total.
+    """
+    _require_numpy()
+    required = matrix.required.sum(axis=0)
+    useful = np.minimum(matrix.delivered, matrix.required).sum(axis=0)
+    percent = _percent(useful, required)
+    sites_remaining = (remaining_matrix(matrix) > 0).sum(axis=0)
+    order = np.lexsort((-required, percent))
+    return [CommodityCompletion(matrix.commodities[i], int(required[i]), int(useful[i]),
+                                float(percent[i]), int(sites_remaining[i])) for i in order]
+
+def site_hauling_effort(matrix, cargo_capacity=CARGO_CAPACITY):
+    """Rank sites by the tonnage they still need, most work first."""
+    _require_numpy()
+    remaining = remaining_matrix(matrix).sum(axis=1)
+    percent = _percent(matrix.required.sum(axis=1) - remaining, matrix.required.sum(axis=1))
+    return _rank(matrix.sites, remaining, percent, cargo_capacity)
+
+def commodity_hauling_effort(matrix, cargo_capacity=CARGO_CAPACITY):
+    """Rank commodities by the tonnage still needed across all sites, most work first."""
+    _require_numpy()
+    remaining = remaining_matrix(matrix).sum(axis=0)
+    percent = _percent(matrix.required.sum(axis=0) - remaining, matrix.required.sum(axis=0))
+    return _rank(matrix.commodities, remaining, percent, cargo_capacity)
+
+def _rank(names, remaining, percent, cargo_capacity):
+    trips = -(-remaining // max(cargo_capacity, 1))
+    order = np.argsort(-remaining, kind='stable')
+    return [HaulingEffort(names[i], int(remaining[i]), int(trips[i]), float(percent[i])) for i in order]
+
+def what_if(matrix, cargo):
+    """
+    Find the sites that a given load of cargo would complete on its own.
+
+    Args:
+        matrix (DeliveryMatrix): Current delivery data.
+        cargo (dict): Commodity name (or alias) -> quantity available to deliver.
+
+    Returns:
+        list: (site, tonnage used) tuples for incomplete sites that the cargo would
+        complete, needing the least cargo first.
+    """
+    _require_numpy()
+    remaining = remaining_matrix(matrix)
+    column = {commodity: i for i, commodity in enumerate(matrix.commodities)}
+    available = np.zeros(len(matrix.commodities), dtype=np.int64)
+    for commodity, quantity in cargo.items():
+        index = column.get(resolve_commodity(commodity))
+        if index is not None:
+            available[index] += quantity
+    incomplete = remaining.sum(axis=1) > 0
+    completes = incomplete & (remaining <= available).all(axis=1)
+    used = remaining.sum(axis=1)
+    indices = np.flatnonzero(completes)
+    indices = indices[np.argsort(used[indices], kind='stable')]
+    return [(matrix.sites[i], int(used[i])) for i in indices]
+
+def contribution_by_source(sites=None):
+    """
+    Total delivered amount per delivery source across sites, largest first.
+
+    Amounts delivered before delivery logging existed are reported as UNLOGGED_SOURCE.
+
+    Returns:
+        list: (source, quantity, percent of all deliveries) tuples.
+    """
+    _require_numpy()
+    sites = list(fetch_construction_sites() if sites is None else sites)
+    source_index = {}
+    codes, quantities = [], []
+    for site, path in _site_paths(sites):
+        try:
+            with open_connection(path) as conn:
+                total = conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM deliveries").fetchone()[0]
+                logged = 0
+                try:
+                    cursor = conn.execute("SELECT source, SUM(quantity) FROM delivery_log GROUP BY source")
+                    for source, quantity in cursor:
+                        codes.append(source_index.setdefault(source or UNLOGGED_SOURCE, len(source_index)))
+                        quantities.append(quantity or 0)
+                        logged += quantity or 0
+                except sqlite3.OperationalError:
+                    # Sites without any logged deliveries may not have a delivery_log table yet
+                    pass
+                if total > logged:
+                    codes.append(source_index.setdefault(UNLOGGED_SOURCE, len(source_index)))
+                    quantities.append(total - logged)
+        except sqlite3.Error as e:
+            logger.error(f"Database error loading delivery sources for {site}: {e}")
+
+    totals = np.bincount(np.array(codes, dtype=np.intp), weights=np.array(quantities, dtype=np.float64),
+                         minlength=len(source_index))
+    grand_total = totals.sum()
+    names = list(source_index)
+    order = np.argsort(-totals, kind='stable')
+    return [(names[i], int(totals[i]), float(100.0 * totals[i] / grand_total) if grand_total else 0.0)
+            for i in order]
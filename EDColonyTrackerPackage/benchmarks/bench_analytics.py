@@ -0,0 +1,103 @@
+"""
+Benchmark for the analytics module.
+
+Builds a throwaway databases directory with many construction sites, each with a full set
+of commodity requirements, partial deliveries and a long delivery history, then times
+loading the delivery matrix and every analytics query over it.
+
+Requires NumPy.
+
+Usage:
+    python benchmarks/bench_analytics.py [--sites 1000] [--commodities 50] [--history 500]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analytics
+import database
+from common import close_log, log_to_directory
+
+SOURCES = ["manual", "batch", "carrier"]
+
+def populate(sites, commodities, history, seed=None):
+    """Create sites with requirements, delivered totals and logged history rows."""
+    rng = random.Random(seed)
+    names = [f"Commodity {i:03d}" for i in range(commodities)]
+    site_names = [f"Bench Site {i:04d}" for i in range(sites)]
+    database.add_construction_sites(site_names)
+    now = time.time()
+    for site in site_names:
+        requirements = [(name, rng.randint(100, 20000)) for name in names]
+        log_rows = [(rng.choice(names), rng.randint(1, 784), now - rng.random() * 90 * 86400, rng.choice(SOURCES))
+                    for _ in range(history)]
+        delivered = {}
+        for commodity, quantity, _, _ in log_rows:
+            delivered[commodity] = delivered.get(commodity, 0) + quantity
+        with database.site_connection(site) as conn:
+            cursor = conn.cursor()
+            database.create_site_tables(cursor)
+            cursor.executemany("INSERT INTO deliveries (commodity, quantity, construction_site, amount_required) "
+                               "VALUES (?, ?, ?, ?)",
+                               [(name, delivered.get(name, 0), site, amount) for name, amount in requirements])
+            cursor.executemany("INSERT INTO delivery_log (commodity, quantity, delivered_at, source) "
+                               "VALUES (?, ?, ?, ?)", log_rows)
+    return site_names, names
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>26} {elapsed * 1000:9.1f} ms")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=1000)
+    parser.add_argument("--commodities", type=int, default=50)
+    parser.add_argument("--history", type=int, default=500, help="Logged deliveries per site")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not analytics.numpy_available():
+        print("NumPy is not installed; install it with 'pip install numpy' to run this benchmark")
+        sys.exit(1)
+
+    # Keep the database logger quiet so logging does not dominate the measurement
+    database.logger.setLevel("WARNING")
+
+    db_dir = tempfile.mkdtemp(prefix="edct-analytics-")
+    log_to_directory(db_dir)
+    database.DB_DIR = db_dir
+    try:
+        database.initialize_database()
+        start = time.perf_counter()
+        _, names = populate(args.sites, args.commodities, args.history, seed=args.seed)
+        print(f"Created {args.sites} sites x {args.commodities} commodities with {args.history} "
+              f"logged deliveries each in {time.perf_counter() - start:.1f} s")
+
+        total = 0.0
+        matrix, elapsed = timed("load_delivery_matrix", analytics.load_delivery_matrix)
+        total += elapsed
+        for label, function, function_args in (
+                ("commodity_completion", analytics.commodity_completion, (matrix,)),
+                ("site_hauling_effort", analytics.site_hauling_effort, (matrix,)),
+                ("commodity_hauling_effort", analytics.commodity_hauling_effort, (matrix,)),
+                ("what_if", analytics.what_if, (matrix, {name: 5000 for name in names})),
+                ("contribution_by_source", analytics.contribution_by_source, ())):
+            total += timed(label, function, *function_args)[1]
+        print(f"{'total':>26} {total * 1000:9.1f} ms")
+    finally:
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
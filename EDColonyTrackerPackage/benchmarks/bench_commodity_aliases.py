@@ -0,0 +1,90 @@
+"""
+Benchmark commodity name resolution over a large stream of mixed names.
+
+The stream mixes canonical names, localised names, journal symbols, misspellings and
+commodities the tracker does not know about, in roughly the proportions seen when
+importing spreadsheets and game data.
+
+Usage:
+    python benchmarks/bench_commodity_aliases.py [--names 1000000] [--seed 1]
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from commodity_aliases import COMMODITY_ALIASES, CommodityResolver
+from common import close_log, log_to_directory
+
+# Canonical names as seeded by database.populate_items
+CANONICAL_NAMES = sorted(set(COMMODITY_ALIASES) | {
+    "Beer", "Biowaste", "Coffee", "Copper", "Fish", "Grain", "Liquor", "Robotics", "Steel",
+    "Tea", "Titanium", "Water", "Wine",
+})
+
+UNKNOWN_NAMES = ["Gold", "Palladium", "Tritanium", "Void Opals", "Low Temperature Diamonds",
+                 "Bertrandite", "Indite", "Gallite", "Platinum", "Osmium"]
+
+def _misspell(rng, name):
+    """Drop or swap a character to simulate a typo."""
+    if len(name) < 5:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    if rng.random() < 0.5:
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def generate_names(count, seed=None):
+    """Return a list of count commodity names drawn from a realistic mix."""
+    rng = random.Random(seed)
+    aliases = [alias for alias_list in COMMODITY_ALIASES.values() for alias in alias_list]
+    symbols = [f"${name.replace(' ', '').replace('.', '')}_Name;" for name in CANONICAL_NAMES]
+    typos = [_misspell(rng, name) for name in CANONICAL_NAMES for _ in range(3)]
+    pools = [(CANONICAL_NAMES, 0.5), (aliases, 0.2), (symbols, 0.15), (typos, 0.1), (UNKNOWN_NAMES, 0.05)]
+    names = []
+    for _ in range(count):
+        roll = rng.random()
+        for pool, weight in pools:
+            if roll < weight:
+                break
+            roll -= weight
+        names.append(rng.choice(pool))
+    return names
+
+def run(names, fuzzy):
+    resolver = CommodityResolver(CANONICAL_NAMES, fuzzy=fuzzy)
+    start = time.perf_counter()
+    resolved = sum(1 for name in names if resolver.resolve(name) is not None)
+    elapsed = time.perf_counter() - start
+    return resolved, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Fuzzy matches are logged, so keep them out of the application log
+    log_dir = tempfile.mkdtemp(prefix="edct-aliases-")
+    log_to_directory(log_dir)
+    try:
+        names = generate_names(args.names, seed=args.seed)
+        print(f"Resolving {len(names):,} names ({len(set(names))} distinct)")
+        for fuzzy in (False, True):
+            resolved, elapsed = run(names, fuzzy)
+            print(f"  fuzzy={fuzzy!s:5}  resolved {resolved / len(names):6.1%}  "
+                  f"{elapsed:6.3f}s  {len(names) / elapsed:,.0f} names/s  "
+                  f"{elapsed / len(names) * 1e9:,.0f} ns/name")
+    finally:
+        close_log()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
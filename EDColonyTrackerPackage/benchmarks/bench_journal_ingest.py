@@ -0,0 +1,166 @@
+"""
+Throughput benchmark for journal ingestion.
+
+Generates a synthetic journal (see journal.generate_journal_file) against construction
+sites in a fresh temporary database directory, then times three stages over it:
+
+    parse    json.loads on every line, the cost of naively decoding the whole journal
+    filter   the event-name prefilter, decoding only the events ingest uses
+    ingest   ingest_journal end to end, including the writes into the delivery tables
+
+Each stage reports events/s and MB/s. Results are appended as one JSON line to a results
+file together with the git revision, so runs can be compared across versions; the change
+against the previous stored run is printed.
+
+Usage:
+    python benchmarks/bench_journal_ingest.py [--events 200000] [--size-mb 500] [--sites 20]
+        [--mix ColonisationContribution=30,Music=5] [--journal existing.log] [--keep]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import journal
+from common import close_log, log_to_directory
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "bench_journal_ingest.jsonl")
+
+def parse_mix(text):
+    """Parse 'Event=weight,...' overrides on top of the default event mix."""
+    mix = dict(journal.DEFAULT_EVENT_MIX)
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def fresh_databases(sites):
+    db_dir = tempfile.mkdtemp(prefix="edct-journal-")
+    log_to_directory(db_dir)
+    database.DB_DIR = db_dir
+    database.initialize_database()
+    names = [f"Bench Depot {i}" for i in range(sites)]
+    for name in names:
+        database.add_construction_site(name)
+    return db_dir, names
+
+def time_parse(path):
+    events = 0
+    start = time.perf_counter()
+    with open(path, mode='rb') as file:
+        for line in file:
+            json.loads(line)
+            events += 1
+    return events, time.perf_counter() - start
+
+def time_filter(path):
+    start = time.perf_counter()
+    with open(path, mode='rb') as file:
+        relevant = sum(1 for _ in journal.iter_relevant_events(file))
+    return relevant, time.perf_counter() - start
+
+def time_ingest(path):
+    start = time.perf_counter()
+    recorded = journal.ingest_journal(path, from_start=True)
+    return recorded, time.perf_counter() - start
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def previous_result(results_path, params):
+    """Return the last stored result run with the same parameters, if any."""
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("params") == params:
+                previous = result
+    return previous
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, help="Events to generate (default 200,000 unless --size-mb is given)")
+    parser.add_argument("--size-mb", type=float, help="Generate a journal of about this size instead")
+    parser.add_argument("--sites", type=int, default=20)
+    parser.add_argument("--mix", default="", help="Event weight overrides, e.g. ColonisationContribution=30,Scan=0")
+    parser.add_argument("--journal", help="Benchmark this journal instead of generating one")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated journal file")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file results are appended to")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Keep the database and journal loggers quiet so logging does not dominate the measurement
+    database.logger.setLevel("WARNING")
+    journal.logger.setLevel("WARNING")
+
+    db_dir, sites = fresh_databases(args.sites)
+    path = args.journal
+    try:
+        if path is None:
+            path = os.path.join(db_dir, "Journal.synthetic.01.log")
+            events = args.events if args.events or args.size_mb else 200000
+            start = time.perf_counter()
+            journal.generate_journal_file(path, events=events, size_mb=args.size_mb, mix=parse_mix(args.mix),
+                                          seed=args.seed, sites=sites)
+            print(f"Generated journal in {time.perf_counter() - start:.1f} s")
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        events, parse_seconds = time_parse(path)
+        relevant, filter_seconds = time_filter(path)
+        recorded, ingest_seconds = time_ingest(path)
+        print(f"Journal: {events:,} events, {size_mb:,.1f} MB, {relevant:,} relevant, "
+              f"{recorded:,} contributions recorded across {len(sites)} sites")
+    finally:
+        if args.keep and args.journal is None:
+            kept = os.path.join(tempfile.gettempdir(), os.path.basename(path))
+            shutil.move(path, kept)
+            print(f"Kept journal at {kept}")
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    rates = {}
+    print(f"{'stage':>8} {'seconds':>9} {'events/s':>12} {'MB/s':>9}")
+    for stage, seconds in (("parse", parse_seconds), ("filter", filter_seconds), ("ingest", ingest_seconds)):
+        rates[stage] = {"seconds": round(seconds, 4), "events_per_s": round(events / seconds),
+                        "mb_per_s": round(size_mb / seconds, 2)}
+        print(f"{stage:>8} {seconds:9.3f} {events / seconds:12,.0f} {size_mb / seconds:9.1f}")
+
+    params = {"events": events, "size_mb": round(size_mb, 1), "sites": len(sites),
+              "mix": args.mix, "journal": args.journal, "seed": args.seed}
+    previous = previous_result(args.results, params)
+    if previous:
+        print(f"Compared with {previous['revision']} ({previous['recorded_at']}):")
+        for stage, rate in rates.items():
+            before = previous["rates"].get(stage, {}).get("events_per_s")
+            if before:
+                print(f"{stage:>8} {(rate['events_per_s'] - before) / before:+.1%}")
+
+    result = {"recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": git_revision(),
+              "python": platform.python_version(), "params": params, "rates": rates,
+              "relevant": relevant, "recorded": recorded}
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, mode='a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + "\n")
+    print(f"Result appended to {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Scaling benchmark for the parallel CSV importer.
+
+Generates a set of synthetic requirement sheets, then imports them into a fresh temporary
+databases directory with 1, 2, 4, ... up to N worker processes and reports the wall time,
+row throughput and speedup relative to a single worker.
+
+Usage:
+    python benchmarks/bench_parallel_import.py [--files 24] [--sites 200] [--max-workers 8]
+"""
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from commodity_aliases import COMMODITY_ALIASES
+from common import close_log, log_to_directory
+from parallel_import import import_csv_files_parallel
+
+def generate_csv_files(directory, files, sites, commodities_per_site, seed=None):
+    """Write synthetic requirement sheets, spreading each site's rows across the files."""
+    rng = random.Random(seed)
+    commodities = sorted(COMMODITY_ALIASES)
+    writers = []
+    handles = []
+    for i in range(files):
+        handle = open(os.path.join(directory, f"sheet_{i:03d}.csv"), mode='w', newline='')
+        writer = csv.writer(handle)
+        writer.writerow(["Commodity", "Amount Required", "Construction Site"])
+        handles.append(handle)
+        writers.append(writer)
+    rows = 0
+    for site in range(sites):
+        for commodity in rng.sample(commodities, k=min(commodities_per_site, len(commodities))):
+            rng.choice(writers).writerow([commodity, rng.randint(100, 20000), f"Bench Site {site:04d}"])
+            rows += 1
+    for handle in handles:
+        handle.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=24)
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--commodities", type=int, default=20, help="Commodities per site")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Keep the database logger quiet so logging does not dominate the measurement
+    database.logger.setLevel("WARNING")
+
+    csv_dir = tempfile.mkdtemp(prefix="edct-csv-")
+    # Worker processes log here too
+    log_to_directory(csv_dir)
+    rows = generate_csv_files(csv_dir, args.files, args.sites, args.commodities, seed=args.seed)
+    print(f"Importing {rows} rows for {args.sites} sites from {args.files} files")
+    print(f"{'workers':>7} {'seconds':>9} {'rows/s':>10} {'speedup':>8}")
+
+    worker_counts = []
+    workers = 1
+    while workers < args.max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    worker_counts.append(args.max_workers)
+
+    baseline = None
+    try:
+        for workers in worker_counts:
+            db_dir = tempfile.mkdtemp(prefix="edct-import-")
+            database.DB_DIR = db_dir
+            database.initialize_database()
+            start = time.perf_counter()
+            import_csv_files_parallel([csv_dir], max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:7} {elapsed:9.3f} {rows / elapsed:10,.0f} {baseline / elapsed:7.2f}x")
+            shutil.rmtree(db_dir, ignore_errors=True)
+    finally:
+        close_log()
+        shutil.rmtree(csv_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput benchmark for the write-behind delivery buffer.
+
+Records the same bursty stream of deliveries twice in fresh temporary databases
+directories: once with a direct add_delivery call (one transaction) per delivery, and once
+through DeliveryBuffer, which spools each delivery and group-commits per-site totals. Both
+runs end with identical delivered totals, which the benchmark checks before reporting.
+
+Usage:
+    python benchmarks/bench_write_behind.py [--deliveries 2000] [--sites 4] [--burst 50]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from commodity_aliases import COMMODITY_ALIASES
+from common import close_log, log_to_directory
+from delivery_buffer import DeliveryBuffer
+
+def generate_stream(deliveries, sites, commodities, seed=None):
+    """Return a list of (site, commodity, quantity) deliveries."""
+    rng = random.Random(seed)
+    names = rng.sample(sorted(COMMODITY_ALIASES), k=min(commodities, len(COMMODITY_ALIASES)))
+    return [(f"Bench Site {rng.randrange(sites)}", rng.choice(names), rng.randint(1, 800))
+            for _ in range(deliveries)]
+
+def fresh_databases(sites):
+    db_dir = tempfile.mkdtemp(prefix="edct-write-behind-")
+    log_to_directory(db_dir)
+    database.DB_DIR = db_dir
+    database.initialize_database()
+    database.add_construction_sites([f"Bench Site {i}" for i in range(sites)])
+    return db_dir
+
+def delivered_totals(sites):
+    return {f"Bench Site {i}": {record.commodity: record.total_delivered
+                                for record in database.fetch_deliveries(f"Bench Site {i}")}
+            for i in range(sites)}
+
+def run_direct(stream, burst, pause):
+    start = time.perf_counter()
+    for i, (site, commodity, quantity) in enumerate(stream):
+        database.add_delivery(site, commodity, quantity)
+        if (i + 1) % burst == 0:
+            time.sleep(pause)
+    return time.perf_counter() - start
+
+def run_buffered(stream, burst, pause, flush_ms, max_events):
+    buffer = DeliveryBuffer(flush_ms=flush_ms, max_events=max_events)
+    buffer.start()
+    start = time.perf_counter()
+    for i, (site, commodity, quantity) in enumerate(stream):
+        buffer.add(site, commodity, quantity)
+        if (i + 1) % burst == 0:
+            time.sleep(pause)
+    accepted = time.perf_counter() - start
+    buffer.stop()
+    return accepted, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--commodities", type=int, default=15, help="Distinct commodities in the stream")
+    parser.add_argument("--burst", type=int, default=50, help="Deliveries per burst")
+    parser.add_argument("--pause-ms", type=float, default=5.0, help="Pause between bursts")
+    parser.add_argument("--flush-ms", type=int, default=250)
+    parser.add_argument("--max-events", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Keep the database logger quiet so logging does not dominate the measurement
+    database.logger.setLevel("WARNING")
+
+    stream = generate_stream(args.deliveries, args.sites, args.commodities, seed=args.seed)
+    pause = args.pause_ms / 1000
+    print(f"Recording {len(stream)} deliveries for {args.sites} sites in bursts of {args.burst}")
+
+    db_dir = fresh_databases(args.sites)
+    try:
+        direct = run_direct(stream, args.burst, pause)
+        expected = delivered_totals(args.sites)
+    finally:
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    db_dir = fresh_databases(args.sites)
+    try:
+        accepted, buffered = run_buffered(stream, args.burst, pause, args.flush_ms, args.max_events)
+        actual = delivered_totals(args.sites)
+    finally:
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    print(f"{'mode':>10} {'seconds':>9} {'deliveries/s':>13}")
+    print(f"{'direct':>10} {direct:9.3f} {len(stream) / direct:13,.0f}")
+    print(f"{'buffered':>10} {buffered:9.3f} {len(stream) / buffered:13,.0f}   "
+          f"(accepted in {accepted:.3f} s, {direct / buffered:.1f}x faster)")
+    if actual != expected:
+        print("FAIL: buffered totals differ from direct totals")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
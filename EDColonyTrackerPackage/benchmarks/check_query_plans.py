@@ -0,0 +1,244 @@
+"""
+Query-plan regression guard for the SQL in database.py.
+
+Every statement passed to execute or executemany in database.py is found by parsing the
+module, so new queries are checked without being listed here. Each one is run against
+large synthetic databases built with the real schema (create_tables and
+create_site_tables): a cargo_tracker.db with many sites and items, and a site database
+with many requirement rows and a long delivery log.
+
+For each statement the script prints its EXPLAIN QUERY PLAN and the measured latency, then
+fails if the plan scans a whole table or index or builds a temp B-tree (for GROUP BY,
+ORDER BY or DISTINCT). Scans of partial indexes are allowed, since they only visit the
+rows matching the index's WHERE clause. Statements whose job is to read every row are
+listed in FULL_READS and only fail on a temp B-tree. Each execution runs inside a
+savepoint that is rolled back, so the data stays the same size throughout. Schema
+statements (CREATE, ALTER, PRAGMA) are not checked.
+
+Exits with status 1 if any statement fails, so it can gate a build.
+
+Usage:
+    python benchmarks/check_query_plans.py [--sites 20000] [--requirements 5000]
+        [--log-rows 500000] [--repeat 50] [--max-ms 5] [--verbose]
+"""
+
+import argparse
+import ast
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from common import close_log, log_to_directory
+
+# Functions whose statements are meant to read every row, and why
+FULL_READS = {
+    "SiteRegistry.load": "loads every registered site file",
+    "create_tables": "repairs sites sharing a file once, before the unique db_file index exists",
+    "add_construction_sites": "reads every site name to skip existing ones",
+    "fetch_items": "returns every item",
+    "fetch_construction_sites": "returns every site",
+    "fetch_deliveries": "aggregates every requirement of the site",
+}
+
+SCHEMA_STATEMENTS = ("CREATE", "ALTER", "PRAGMA", "ATTACH", "DETACH")
+
+_COMPARISON = re.compile(r"(\w+)\s*(=|>=|>|<=|<)\s*$")
+
+def find_statements(module_path):
+    """
+    Return (function, sql, database) for each SQL string literal passed to execute or
+    executemany, where database is "main" if the function opens cargo_tracker.db and
+    "site" otherwise.
+    """
+    with open(module_path, encoding='utf-8') as file:
+        source = file.read()
+    tree = ast.parse(source)
+    statements = []
+
+    def visit(node, prefix=""):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                visit(child, f"{child.name}.")
+            elif isinstance(child, ast.FunctionDef):
+                name = prefix + child.name
+                target = "main" if "get_db_path(" in ast.get_source_segment(source, child) else "site"
+                for call in ast.walk(child):
+                    if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                            and call.func.attr in ("execute", "executemany") and call.args
+                            and isinstance(call.args[0], ast.Constant) and isinstance(call.args[0].value, str)):
+                        statements.append((name, " ".join(call.args[0].value.split()), target))
+    visit(tree)
+    return statements
+
+def build_main_database(path, sites, items, seed):
+    """Fill cargo_tracker.db with registered sites and items."""
+    rng = random.Random(seed)
+    database.create_tables()
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT OR IGNORE INTO items (name) VALUES (?)", ((f"Commodity {i}",) for i in range(items)))
+        conn.executemany("INSERT INTO construction_sites (name, db_file) VALUES (?, ?)",
+                         ((f"Site {i}", f"site_{i}.db") for i in range(sites)))
+        conn.executemany("INSERT INTO carriers (name) VALUES (?)", ((f"Carrier {i}",) for i in range(100)))
+        conn.execute("ANALYZE")
+    return {"name": [f"Site {i}" for i in range(sites)], "commodity": [f"Commodity {i}" for i in range(items)],
+            "id": list(range(1, sites + 1)), "rng": rng}
+
+def build_site_database(path, requirements, log_rows, seed):
+    """Fill a site database with requirement rows and a delivery log."""
+    rng = random.Random(seed)
+    commodities = [f"Commodity {i}" for i in range(requirements)]
+    with sqlite3.connect(path) as conn:
+        database.create_site_tables(conn.cursor())
+        conn.executemany("INSERT INTO deliveries (commodity, quantity, construction_site, amount_required) "
+                         "VALUES (?, ?, 'Plan Check Site', ?)",
+                         ((name, rng.randint(0, 5000), rng.randint(1000, 50000)) for name in commodities))
+        start = time.time() - log_rows
+        conn.executemany("INSERT INTO delivery_log (commodity, quantity, delivered_at, source) VALUES (?, ?, ?, ?)",
+                         ((rng.choice(commodities), rng.randint(1, 784), start + i, "manual") for i in range(log_rows)))
+        conn.execute("INSERT INTO spool_state (id, applied_seq) VALUES (1, 0)")
+        conn.execute("ANALYZE")
+    return {"commodity": commodities, "name": ["Plan Check Site"], "id": list(range(1, requirements + 1)),
+            "max_log_id": log_rows, "rng": rng}
+
+def bind_parameters(sql, samples, counter):
+    """
+    Choose a value for each ? in sql. Comparisons in a WHERE clause get existing values
+    so the lookup finds real rows; everything else gets a fresh value so inserts and
+    renames do not collide with existing unique keys.
+    """
+    rng = samples["rng"]
+    values = []
+    for match in re.finditer(r"\?", sql):
+        prefix = sql[:match.start()]
+        clause = max(("WHERE", "SET", "VALUES"), key=lambda keyword: prefix.upper().rfind(keyword))
+        comparison = _COMPARISON.search(prefix)
+        column = comparison.group(1) if comparison and clause == "WHERE" else None
+        if column == "id" and comparison.group(2) in (">", ">="):
+            # Incremental reads ask for the newest few rows
+            values.append(samples.get("max_log_id", len(samples["id"])) - 100)
+        elif column in samples:
+            values.append(rng.choice(samples[column]))
+        else:
+            values.append(f"check-{next(counter)}")
+    return values
+
+def query_plan(conn, sql, parameters):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+
+def partial_indexes(conn):
+    """Names of indexes with a WHERE clause, whose scans only visit the matching rows."""
+    return {row[0] for row in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+            if " WHERE " in " ".join(row[1].upper().split())}
+
+def plan_problems(plan, full_read, partial):
+    problems = []
+    for detail in plan:
+        index = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+        bounded = "CONSTANT ROW" in detail or (index and index.group(1) in partial)
+        # A SEARCH without an index walks the table in rowid order until a row matches,
+        # as for MIN(id) ... WHERE on an unindexed column
+        scan = detail.startswith("SCAN ") or (detail.startswith("SEARCH ") and " USING " not in detail)
+        if scan and not bounded and not full_read:
+            problems.append(f"full scan: {detail}")
+        if "TEMP B-TREE" in detail:
+            problems.append(f"temp B-tree: {detail}")
+    return problems
+
+def measure(conn, sql, samples, counter, repeat):
+    """Return execution times in milliseconds, rolling back each execution."""
+    timings = []
+    for _ in range(repeat):
+        parameters = bind_parameters(sql, samples, counter)
+        conn.execute("SAVEPOINT plan_check")
+        try:
+            start = time.perf_counter()
+            conn.execute(sql, parameters).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            conn.execute("ROLLBACK TO plan_check")
+            conn.execute("RELEASE plan_check")
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=20000, help="Registered sites in cargo_tracker.db")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--requirements", type=int, default=5000, help="Requirement rows in the site database")
+    parser.add_argument("--log-rows", type=int, default=500000, help="Delivery log rows in the site database")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed executions per statement")
+    parser.add_argument("--max-ms", type=float, help="Also fail statements whose median latency exceeds this")
+    parser.add_argument("--verbose", action="store_true", help="Print the full plan of every statement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Keep the database logger quiet so logging does not dominate the measurement
+    database.logger.setLevel("WARNING")
+
+    statements = find_statements(database.__file__)
+    db_dir = tempfile.mkdtemp(prefix="edct-plans-")
+    log_to_directory(db_dir)
+    database.DB_DIR = db_dir
+    failures = 0
+    checked = 0
+    counter = iter(range(10 ** 9))
+    try:
+        print(f"Building synthetic databases: {args.sites:,} sites, {args.items:,} items, "
+              f"{args.requirements:,} requirements, {args.log_rows:,} log rows")
+        samples = {"main": build_main_database(database.get_db_path("cargo_tracker.db"),
+                                               args.sites, args.items, args.seed),
+                   "site": build_site_database(os.path.join(db_dir, "plan_check_site.db"),
+                                               args.requirements, args.log_rows, args.seed)}
+        connections = {"main": sqlite3.connect(database.get_db_path("cargo_tracker.db"), isolation_level=None),
+                       "site": sqlite3.connect(os.path.join(db_dir, "plan_check_site.db"), isolation_level=None)}
+
+        partial = {target: partial_indexes(conn) for target, conn in connections.items()}
+
+        print(f"{'status':<6} {'median ms':>9} {'p95 ms':>8}  {'function':<28} statement")
+        for function, sql, target in statements:
+            if sql.split(" ", 1)[0].upper() in SCHEMA_STATEMENTS:
+                continue
+            checked += 1
+            conn = connections[target]
+            problems = []
+            timings = []
+            try:
+                plan = query_plan(conn, sql, bind_parameters(sql, samples[target], counter))
+                problems = plan_problems(plan, function in FULL_READS, partial[target])
+                timings = measure(conn, sql, samples[target], counter, args.repeat)
+            except sqlite3.Error as e:
+                plan = []
+                problems.append(f"error: {e}")
+            median = statistics.median(timings) if timings else float("nan")
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else median
+            if args.max_ms is not None and median > args.max_ms:
+                problems.append(f"median {median:.3f} ms exceeds {args.max_ms} ms")
+            status = "FAIL" if problems else "ok"
+            failures += bool(problems)
+            print(f"{status:<6} {median:9.3f} {p95:8.3f}  {function:<28} {sql[:70]}")
+            for problem in problems:
+                print(f"{'':>34}- {problem}")
+            if args.verbose or problems:
+                for detail in plan:
+                    print(f"{'':>34}  plan: {detail}")
+        for conn in connections.values():
+            conn.close()
+    finally:
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    print(f"Checked {checked} statements from database.py: {failures} failed")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
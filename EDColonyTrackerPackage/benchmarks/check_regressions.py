@@ -0,0 +1,150 @@
+"""
+Regression checks for data handling that is easy to break without noticing.
+
+Each check runs against a fresh temporary databases directory and fails with an
+AssertionError if the behaviour it guards has regressed:
+
+    market_snapshot_drops_commodity
+        A commodity missing from a station's newer market snapshot is removed, and an
+        older snapshot ingested afterwards does not bring it back.
+
+    batch_paste_thousands_separators
+        A comma-separated paste such as "Steel, 1,200" keeps 1,200 as one quantity
+        instead of reading it as 1 unit for a site named "200".
+
+    carrier_transfer_to_unknown_site
+        Transferring carrier cargo to a site that is not registered raises ValueError,
+        leaves the carrier's stock alone and creates no database file.
+
+The script prints one line per check and exits with status 1 if any check fails, so it
+can gate a build.
+
+Usage:
+    python benchmarks/check_regressions.py [check ...]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import carriers
+import database
+import market_data
+from gui.batch_delivery import parse_delivery_text
+from common import close_log, log_to_directory
+
+# Check functions by name, in the order they run
+CHECKS = {}
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+def _write_market_snapshot(path, timestamp, commodities):
+    """Write a one-station EDDN-style dump listing the given {name: stock} commodities."""
+    message = {"systemName": "Check System", "stationName": "Check Station", "timestamp": timestamp,
+               "StarPos": [0, 0, 0], "commodities": [{"name": name, "buyPrice": 100, "stock": stock}
+                                                     for name, stock in commodities.items()]}
+    with open(path, mode='w', encoding='utf-8') as file:
+        file.write(json.dumps({"message": message}) + "\n")
+
+def _listed_commodities(station):
+    with market_data._connect() as conn:
+        cursor = conn.execute("SELECT commodity FROM market_listings WHERE station = ? ORDER BY commodity",
+                              (station,))
+        return [row[0] for row in cursor]
+
+@check
+def market_snapshot_drops_commodity(db_dir):
+    older = os.path.join(db_dir, "older.jsonl")
+    newer = os.path.join(db_dir, "newer.jsonl")
+    _write_market_snapshot(older, "2025-01-01T00:00:00Z", {"Steel": 500, "Titanium": 200})
+    _write_market_snapshot(newer, "2025-01-02T00:00:00Z", {"Steel": 400})
+
+    market_data.ingest_market_dump(older)
+    assert _listed_commodities("Check Station") == ["Steel", "Titanium"], _listed_commodities("Check Station")
+    market_data.ingest_market_dump(newer)
+    assert _listed_commodities("Check Station") == ["Steel"], _listed_commodities("Check Station")
+    assert market_data.find_sellers("Titanium") == [], "a dropped commodity is still offered"
+
+    # Re-ingesting the older snapshot must not bring the dropped commodity back
+    market_data.ingest_market_dump(older, force=True)
+    assert _listed_commodities("Check Station") == ["Steel"], _listed_commodities("Check Station")
+    assert market_data.find_sellers("Steel")[0][3] == 400, "an older snapshot overwrote newer stock"
+
+@check
+def batch_paste_thousands_separators(db_dir):
+    expected = {
+        "Steel, 1,200": [("Steel", "1200", "")],
+        "Steel,1,200,Alpha Base": [("Steel", "1200", "Alpha Base")],
+        "1,200, Steel": [("Steel", "1200", "")],
+        "Commodity,Quantity\nTitanium,12,345": [("Titanium", "12345", "")],
+        "Steel, 120, Site 7": [("Steel", "120", "Site 7")],
+        "Steel\t1,200\tAlpha Base": [("Steel", "1,200", "Alpha Base")],
+    }
+    for text, rows in expected.items():
+        assert parse_delivery_text(text) == rows, f"{text!r} parsed as {parse_delivery_text(text)}"
+
+@check
+def carrier_transfer_to_unknown_site(db_dir):
+    carriers.add_carrier("Check Carrier")
+    carriers.record_purchase("Check Carrier", "Steel", 500)
+    files = sorted(os.listdir(db_dir))
+    try:
+        carriers.transfer_to_site("Check Carrier", "Nowhere", "Steel", 100)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("transfer to an unregistered site did not raise ValueError")
+    assert sorted(os.listdir(db_dir)) == files, f"new files: {set(os.listdir(db_dir)) - set(files)}"
+    assert carriers.fetch_carrier_stock("Check Carrier") == [("Steel", 500)], carriers.fetch_carrier_stock("Check Carrier")
+
+def run_check(name):
+    """Run one check in a fresh databases directory. Returns the error text, or None."""
+    db_dir = tempfile.mkdtemp(prefix="edct-check-")
+    log_to_directory(db_dir)
+    database.DB_DIR = db_dir
+    database.site_registry.load()
+    database.delivery_cache.invalidate()
+    try:
+        database.initialize_database()
+        CHECKS[name](db_dir)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_log()
+        shutil.rmtree(db_dir, ignore_errors=True)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("checks", nargs="*", metavar="check", help="Checks to run (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)} (choose from {', '.join(CHECKS)})")
+
+    # Keep the application loggers quiet so the check output stays readable
+    database.logger.setLevel("WARNING")
+    market_data.logger.setLevel("WARNING")
+
+    failures = 0
+    for name in args.checks or CHECKS:
+        error = run_check(name)
+        print(f"{'FAIL' if error else 'ok':<6} {name}")
+        if error:
+            failures += 1
+            print(error)
+    print(f"Ran {len(args.checks or CHECKS)} checks: {failures} failed")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
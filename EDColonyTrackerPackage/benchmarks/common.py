@@ -0,0 +1,37 @@
+"""
+Helpers shared by the benchmark and check scripts.
+"""
+
+import logging
+import os
+
+from utils import LOG_FILE_VARIABLE
+
+def _replace_root_handlers(handler=None):
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    if handler is not None:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        root.addHandler(handler)
+
+def log_to_directory(directory, file_name="benchmark.log"):
+    """
+    Send log records to a file in a temporary directory instead of the application log.
+
+    The path is also exported in LOG_FILE_VARIABLE, so worker processes spawned afterwards
+    log to the same file. Call close_log before removing the directory.
+
+    Returns:
+        str: The path of the log file.
+    """
+    path = os.path.join(directory, file_name)
+    _replace_root_handlers(logging.FileHandler(path))
+    os.environ[LOG_FILE_VARIABLE] = path
+    return path
+
+def close_log():
+    """Close the log opened by log_to_directory, so its directory can be removed."""
+    _replace_root_handlers()
+    os.environ.pop(LOG_FILE_VARIABLE, None)
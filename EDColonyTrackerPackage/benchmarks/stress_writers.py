@@ -0,0 +1,267 @@
+"""
+Multi-writer stress test for the database module.
+
+Spawns worker threads and worker processes that issue a random mix of add_delivery,
+fetch_deliveries, add_commodity_requirement and clear_deliveries calls against a
+throwaway databases directory, logging to that directory too, then reports throughput, p50/p99 latency per operation
+and the number of failed and "database is locked" calls.
+
+Every successful add_delivery is recorded in a ledger. Deliveries go to "ledger" sites
+that are never cleared, while clear_deliveries only targets separate "scratch" sites, so
+once all workers finish the delivered totals in each ledger site must match the ledger
+exactly. Any difference is a lost update. The script exits non-zero if it finds lost
+updates or lock errors, so it can be used as a regression check.
+
+Usage:
+    python benchmarks/stress_writers.py [--threads 4] [--processes 4] [--ops 500]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+from common import close_log, log_to_directory
+
+COMMODITIES = ["Steel", "Titanium", "Aluminium", "Copper", "Polymers", "Semiconductors",
+               "Water", "Liquid Oxygen", "Food Cartridges", "Computer Components"]
+
+# Relative weights of each operation in the workload
+OPERATION_WEIGHTS = {
+    "add_delivery": 50,
+    "fetch_deliveries": 35,
+    "add_commodity_requirement": 10,
+    "clear_deliveries": 5,
+}
+
+class _ErrorCounter(logging.Handler):
+    """Count error records logged by the database module, per thread."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.errors = Counter()
+        self.lock_errors = Counter()
+
+    def emit(self, record):
+        self.errors[record.thread] += 1
+        if "locked" in record.getMessage():
+            self.lock_errors[record.thread] += 1
+
+def _install_error_counter():
+    """Attach an error counter to the database logger and silence its per-call info logs."""
+    handler = _ErrorCounter()
+    db_logger = logging.getLogger('Database')
+    db_logger.setLevel(logging.WARNING)
+    db_logger.addHandler(handler)
+    return handler
+
+def ledger_site(i):
+    return f"Ledger Site {i}"
+
+def scratch_site(i):
+    return f"Scratch Site {i}"
+
+def _required_amount(commodity):
+    """Fixed requirement per commodity, so concurrent requirement writes agree."""
+    return 1000 + 100 * COMMODITIES.index(commodity)
+
+def run_worker(worker_id, db_dir, ops, sites, seed, error_counter=None):
+    """
+    Run one worker's share of the workload.
+
+    Returns:
+        dict: Latencies and error counts per operation, plus the worker's delivery ledger
+        as a list of [site, commodity, quantity] entries.
+    """
+    database.DB_DIR = db_dir
+    if error_counter is None:
+        error_counter = _install_error_counter()
+    thread_id = threading.get_ident()
+    rng = random.Random(seed * 100003 + worker_id)
+    operations = list(OPERATION_WEIGHTS)
+    weights = list(OPERATION_WEIGHTS.values())
+
+    latencies = defaultdict(list)
+    errors = Counter()
+    lock_errors = Counter()
+    ledger = Counter()
+    for _ in range(ops):
+        operation = rng.choices(operations, weights)[0]
+        commodity = rng.choice(COMMODITIES)
+        site_index = rng.randrange(sites)
+        errors_before = error_counter.errors[thread_id]
+        locks_before = error_counter.lock_errors[thread_id]
+
+        start = time.perf_counter()
+        if operation == "add_delivery":
+            quantity = rng.randint(1, 50)
+            database.add_delivery(ledger_site(site_index), commodity, quantity)
+        elif operation == "fetch_deliveries":
+            database.fetch_deliveries(ledger_site(site_index))
+        elif operation == "add_commodity_requirement":
+            database.add_commodity_requirement(ledger_site(site_index), commodity, _required_amount(commodity))
+        else:
+            target = scratch_site(site_index)
+            database.add_delivery(target, commodity, 1)
+            database.clear_deliveries(target)
+        latencies[operation].append(time.perf_counter() - start)
+
+        failed = error_counter.errors[thread_id] - errors_before
+        if failed:
+            errors[operation] += 1
+            lock_errors[operation] += error_counter.lock_errors[thread_id] - locks_before
+        elif operation == "add_delivery":
+            ledger[(ledger_site(site_index), commodity)] += quantity
+
+    return {
+        "latencies": dict(latencies),
+        "errors": dict(errors),
+        "lock_errors": dict(lock_errors),
+        "ledger": [[site, commodity, quantity] for (site, commodity), quantity in ledger.items()],
+    }
+
+def _process_worker(args):
+    # Spawned processes inherit the log path set by log_to_directory through the environment
+    return run_worker(*args)
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def verify_ledger(sites, ledger):
+    """Compare delivered totals in each ledger site with the expected ledger."""
+    mismatches = []
+    for i in range(sites):
+        site = ledger_site(i)
+        with database.site_connection(site) as conn:
+            actual = dict(conn.execute(
+                "SELECT commodity, COALESCE(SUM(quantity), 0) FROM deliveries GROUP BY commodity"))
+        for commodity in COMMODITIES:
+            expected = ledger.get((site, commodity), 0)
+            if actual.get(commodity, 0) != expected:
+                mismatches.append((site, commodity, expected, actual.get(commodity, 0)))
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4, help="Worker threads in the main process")
+    parser.add_argument("--processes", type=int, default=4, help="Worker processes")
+    parser.add_argument("--ops", type=int, default=500, help="Operations per worker")
+    parser.add_argument("--sites", type=int, default=3, help="Ledger sites (and scratch sites)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary databases directory")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="edct-stress-")
+    log_to_directory(db_dir, "stress.log")
+    database.DB_DIR = db_dir
+    database.initialize_database()
+    for i in range(args.sites):
+        database.add_construction_site(ledger_site(i))
+        database.add_construction_site(scratch_site(i))
+
+    print(f"Stressing {db_dir} with {args.threads} threads and {args.processes} processes, "
+          f"{args.ops} ops each")
+    error_counter = _install_error_counter()
+    results = []
+    start = time.perf_counter()
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.processes) if args.processes else _NullPool() as pool:
+        process_args = [(args.threads + i, db_dir, args.ops, args.sites, args.seed)
+                        for i in range(args.processes)]
+        async_result = pool.map_async(_process_worker, process_args) if args.processes else None
+
+        def thread_worker(worker_id):
+            results.append(run_worker(worker_id, db_dir, args.ops, args.sites, args.seed, error_counter))
+
+        threads = [threading.Thread(target=thread_worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if async_result is not None:
+            results.extend(async_result.get())
+    elapsed = time.perf_counter() - start
+
+    latencies = defaultdict(list)
+    errors = Counter()
+    lock_errors = Counter()
+    ledger = Counter()
+    for result in results:
+        for operation, values in result["latencies"].items():
+            latencies[operation].extend(values)
+        errors.update(result["errors"])
+        lock_errors.update(result["lock_errors"])
+        for site, commodity, quantity in result["ledger"]:
+            ledger[(site, commodity)] += quantity
+
+    total_ops = sum(len(values) for values in latencies.values())
+    report = {
+        "threads": args.threads,
+        "processes": args.processes,
+        "elapsed_s": elapsed,
+        "ops": total_ops,
+        "ops_per_s": total_ops / elapsed,
+        "operations": {},
+    }
+    print(f"\n{total_ops} operations in {elapsed:.2f}s ({total_ops / elapsed:,.0f} ops/s)\n")
+    print(f"{'operation':28} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'locked':>7}")
+    for operation in OPERATION_WEIGHTS:
+        values = latencies.get(operation)
+        if not values:
+            continue
+        p50 = _percentile(values, 0.50) * 1000
+        p99 = _percentile(values, 0.99) * 1000
+        report["operations"][operation] = {
+            "count": len(values), "p50_ms": p50, "p99_ms": p99,
+            "errors": errors[operation], "lock_errors": lock_errors[operation],
+        }
+        print(f"{operation:28} {len(values):7} {p50:9.2f} {p99:9.2f} "
+              f"{errors[operation]:7} {lock_errors[operation]:7}")
+
+    mismatches = verify_ledger(args.sites, ledger)
+    report["lost_updates"] = len(mismatches)
+    report["lock_errors"] = sum(lock_errors.values())
+    if mismatches:
+        print(f"\nLEDGER MISMATCH in {len(mismatches)} site/commodity totals:")
+        for site, commodity, expected, actual in mismatches:
+            print(f"  {site} / {commodity}: expected {expected}, found {actual}")
+    else:
+        print("\nLedger verified: all delivered totals match")
+
+    if args.json:
+        with open(args.json, mode='w') as file:
+            json.dump(report, file, indent=2)
+    close_log()
+    if args.keep:
+        print(f"Databases and stress.log kept in {db_dir}")
+    else:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    sys.exit(1 if mismatches or report["lock_errors"] else 0)
+
+class _NullPool:
+    """Stand-in for a process pool when no worker processes are requested."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+This module tracks fleet carriers as stock locations: purchases into a carrier, transfers
+from a carrier to a construction site, and what carrier stock could be delivered now.
+
+Carrier stock and the carrier ledger live in cargo_tracker.db. A transfer attaches it to
+the receiving site's database, so the carrier stock decrement, the ledger entry and the
+site delivery are committed in one transaction across both files.
+"""
+
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from database import (apply_delivery, create_site_tables, delivery_cache, fetch_construction_sites,
+                      get_db_path, open_connection, resolve_commodity, site_connection, site_registry)
+from events import publish, CarrierChanged, DeliveryRecorded
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('Carriers')
+
+# Source recorded in delivery_log for deliveries transferred from a carrier
+CARRIER_SOURCE = "carrier"
+
+# One commodity a site still needs that a carrier holds. deliverable is the smaller of
+# the site's remaining amount and the carrier's stock.
+DeliverableCargo = namedtuple('DeliverableCargo',
+                              ['construction_site', 'commodity', 'remaining', 'carrier', 'in_stock', 'deliverable'])
+
+def add_carrier(carrier):
+    """Add a fleet carrier. Returns True if it was added or already existed."""
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO carriers (name) VALUES (?)", (carrier,))
+            added = cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Database error in add_carrier: {e}")
+        return False
+    if added:
+        logger.info(f"Added fleet carrier: {carrier}")
+        publish(CarrierChanged(carrier, None))
+    return True
+
+def remove_carrier(carrier):
+    """Remove a fleet carrier with its stock and ledger."""
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            conn.execute("DELETE FROM carrier_stock WHERE carrier = ?", (carrier,))
+            conn.execute("DELETE FROM carrier_ledger WHERE carrier = ?", (carrier,))
+            conn.execute("DELETE FROM carriers WHERE name = ?", (carrier,))
+    except sqlite3.Error as e:
+        logger.error(f"Database error in remove_carrier: {e}")
+        return False
+    logger.info(f"Removed fleet carrier: {carrier}")
+    publish(CarrierChanged(carrier, None))
+    return True
+
+def fetch_carriers():
+    """Fetch the names of all fleet carriers."""
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            return [row[0] for row in conn.execute("SELECT name FROM carriers ORDER BY name")]
+    except sqlite3.Error as e:
+        logger.error(f"Database error in fetch_carriers: {e}")
+        return []
+
+def fetch_carrier_stock(carrier):
+    """Fetch (commodity, quantity) pairs a carrier currently holds."""
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            cursor = conn.execute('''
+                SELECT commodity, quantity FROM carrier_stock
+                WHERE carrier = ? AND quantity > 0 ORDER BY commodity
+            ''', (carrier,))
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error in fetch_carrier_stock: {e}")
+        return []
+
+def _check_quantity(quantity):
+    if quantity <= 0:
+        raise ValueError(f"Quantity must be positive, got {quantity}")
+
+def record_purchase(carrier, commodity, quantity):
+    """
+    Add purchased cargo to a carrier's stock and ledger.
+
+    Raises:
+        ValueError: If quantity is not positive.
+    """
+    _check_quantity(quantity)
+    commodity = resolve_commodity(commodity)
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            conn.execute('''
+                INSERT INTO carrier_stock (carrier, commodity, quantity) VALUES (?, ?, ?)
+                ON CONFLICT(carrier, commodity) DO UPDATE SET quantity = quantity + excluded.quantity
+            ''', (carrier, commodity, quantity))
+            conn.execute('''
+                INSERT INTO carrier_ledger (carrier, commodity, quantity, construction_site, recorded_at)
+                VALUES (?, ?, ?, NULL, ?)
+            ''', (carrier, commodity, quantity, time.time()))
+    except sqlite3.Error as e:
+        logger.error(f"Database error in record_purchase: {e}")
+        return False
+    logger.info(f"Recorded purchase of {quantity} units of {commodity} into {carrier}")
+    publish(CarrierChanged(carrier, commodity))
+    return True
+
+def transfer_to_site(carrier, construction_site, commodity, quantity):
+    """
+    Move cargo from a carrier to a construction site in a single transaction.
+
+    The carrier's stock is only decremented if it holds enough; otherwise nothing changes.
+
+    Returns:
+        bool: True if the transfer was recorded.
+
+    Raises:
+        ValueError: If quantity is not positive or the construction site is not registered.
+    """
+    _check_quantity(quantity)
+    # Checked up front so a mistyped or removed site never gets a database file of its own
+    if site_registry.path_for(construction_site) is None:
+        raise ValueError(f"Unknown construction site: {construction_site}")
+    commodity = resolve_commodity(commodity)
+    now = time.time()
+    try:
+        with site_connection(construction_site) as conn:
+            cursor = conn.cursor()
+            create_site_tables(cursor)
+            # ATTACH must run outside a transaction, so commit the table setup first
+            conn.commit()
+            cursor.execute("ATTACH DATABASE ? AS main_db", (get_db_path("cargo_tracker.db"),))
+            cursor.execute('''
+                UPDATE main_db.carrier_stock SET quantity = quantity - ?
+                WHERE carrier = ? AND commodity = ? AND quantity >= ?
+            ''', (quantity, carrier, commodity, quantity))
+            if cursor.rowcount == 0:
+                logger.warning(f"{carrier} does not hold {quantity} units of {commodity}")
+                return False
+            cursor.execute('''
+                INSERT INTO main_db.carrier_ledger (carrier, commodity, quantity, construction_site, recorded_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (carrier, commodity, -quantity, construction_site, now))
+            apply_delivery(cursor, construction_site, commodity, quantity, now, CARRIER_SOURCE)
+    except sqlite3.Error as e:
+        logger.error(f"Database error in transfer_to_site: {e}")
+        return False
+    finally:
+        delivery_cache.invalidate(construction_site)
+    logger.info(f"Transferred {quantity} units of {commodity} from {carrier} to {construction_site}")
+    publish(DeliveryRecorded(construction_site, commodity, quantity))
+    publish(CarrierChanged(carrier, commodity))
+    return True
+
+def fetch_deliverable_cargo(carrier=None):
+    """
+    List what could be delivered right now from carrier stock, across all sites.
+
+    Carrier stock is read once through the partial stock index, then each site's database
+    is visited once with a grouped query restricted to the commodities in stock.
+
+    Args:
+        carrier (str): Only consider this carrier's stock; defaults to all carriers.
+
+    Returns:
+        list: DeliverableCargo tuples ordered by site, commodity and carrier.
+    """
+    stock = {}
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            if carrier is None:
+                cursor = conn.execute("SELECT commodity, carrier, quantity FROM carrier_stock WHERE quantity > 0")
+            else:
+                cursor = conn.execute("SELECT commodity, carrier, quantity FROM carrier_stock "
+                                      "WHERE carrier = ? AND quantity > 0", (carrier,))
+            for commodity, holder, quantity in cursor:
+                stock.setdefault(commodity, []).append((holder, quantity))
+    except sqlite3.Error as e:
+        logger.error(f"Database error reading carrier stock: {e}")
+        return []
+    if not stock:
+        return []
+
+    commodities = sorted(stock)
+    placeholders = ", ".join("?" * len(commodities))
+    results = []
+    for site in sorted(fetch_construction_sites()):
+        path = site_registry.path_for(site)
+        if path is None or not os.path.exists(path):
+            continue
+        try:
+            with site_connection(site) as conn:
+                cursor = conn.execute(f'''
+                    SELECT commodity, MAX(amount_required) - SUM(quantity) AS remaining
+                    FROM deliveries WHERE commodity IN ({placeholders})
+                    GROUP BY commodity HAVING remaining > 0
+                ''', commodities)
+                for commodity, remaining in cursor:
+                    for holder, quantity in sorted(stock[commodity]):
+                        results.append(DeliverableCargo(site, commodity, remaining, holder, quantity,
+                                                        min(remaining, quantity)))
+        except sqlite3.Error as e:
+            logger.error(f"Database error checking deliverable cargo for {site}: {e}")
+    logger.debug(f"Found {len(results)} deliverable carrier cargo entries")
+    return results
@@ -0,0 +1,141 @@
+"""
+This module resolves the many spellings of a commodity name to the canonical names used in
+the items table.
+
+Game data, spreadsheets and market dumps all name commodities differently: the journal uses
+internal symbols such as "$FruitAndVegetables_Name;", localised names such as
+"Fruit and Vegetables", and players use their own spellings. The resolver compiles the
+alias table below into a single dict keyed by a normalized form of the name, so resolving
+is one dict lookup, with an optional fuzzy fallback for names that are still unknown.
+"""
+
+import difflib
+import re
+
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('CommodityAliases')
+
+# Aliases for each canonical commodity name: internal game symbols (without the "$" and
+# "_name;" decoration), journal localised names and common alternative spellings.
+# Spacing, case and punctuation are ignored when matching, so only genuinely different
+# spellings need to be listed.
+COMMODITY_ALIASES = {
+    "Advance Catalysers": ["advancedcatalysers", "Advanced Catalysers", "Advanced Catalyzers"],
+    "Agri-Medicines": ["agriculturalmedicines", "Agricultural Medicines", "Agri Medicines"],
+    "Aluminium": ["Aluminum"],
+    "Animal Meat": ["animalmeat"],
+    "Basic Medicines": ["basicmedicines"],
+    "Battle Weapons": ["battleweapons"],
+    "Bioreducing Lichen": ["bioreducinglichen", "Bio-reducing Lichen"],
+    "Ceramic Composites": ["ceramiccomposites", "Ceramic Composite"],
+    "CMM Composites": ["cmmcomposite", "CMM Composite"],
+    "Combat Stabilisers": ["combatstabilisers", "Combat Stabilizers"],
+    "Computer Components": ["computercomponents", "Computer Parts"],
+    "Crop Harvesters": ["cropharvesters", "Crop Harvester"],
+    "Emergency Power Cells": ["emergencypowercells", "Power Cells", "EPC"],
+    "Evacuation Shelter": ["evacuationshelter", "Evacuation Shelters"],
+    "Food Cartridges": ["foodcartridges", "Food Cartridge"],
+    "Fruit & Veg": ["fruitandvegetables", "Fruit and Vegetables", "Fruits and Vegetables",
+                    "Fruit & Vegetables", "Fruit and Veg", "Fruit/Veg"],
+    "Geological Equipment": ["geologicalequipment"],
+    "H.E. Suits": ["hazardousenvironmentsuits", "Hazardous Environment Suits", "HE Suit", "H.E. Suit"],
+    "Insulating Membranes": ["insulatingmembrane", "Insulating Membrane"],
+    "Land Enrichment Systems": ["terrainenrichmentsystems", "Terrain Enrichment Systems",
+                                "Land Enrichment System"],
+    "Liquid Oxygen": ["liquidoxygen", "LOX"],
+    "Medical Diag. Equip.": ["medicaldiagnosticequipment", "Medical Diagnostic Equipment",
+                             "Medical Diag Equipment", "Med Diag Equip"],
+    "Micro Controllers": ["microcontrollers", "Microcontroller", "Micro Controller"],
+    "Military Grade Fabrics": ["militarygradefabrics", "Military-Grade Fabrics", "Military Fabrics"],
+    "Muon Imager": ["mutomimager", "Muon Imagers"],
+    "Non-Lethal Weapon": ["nonlethalweapons", "Non-Lethal Weapons", "Non Lethal Weapons"],
+    "Pesticides": ["Pesticide"],
+    "Polymers": ["Polymer"],
+    "Power Generators": ["powergenerators", "Power Generator"],
+    "Reactive Armour": ["reactivearmour", "Reactive Armor"],
+    "Resonating Separators": ["resonatingseparators", "Resonating Separator"],
+    "Semiconductors": ["Semiconductor", "Semi-conductors"],
+    "Structural Regulators": ["structuralregulators", "Structural Regulator"],
+    "Surface Stabilisers": ["surfacestabilisers", "Surface Stabilizers"],
+    "Survival Equipment": ["survivalequipment"],
+    "Superconductors": ["Superconductor", "Super Conductors"],
+    "Water Purifiers": ["waterpurifiers", "Water Purifier"],
+}
+
+# Minimum similarity ratio for a fuzzy match to be accepted
+FUZZY_CUTOFF = 0.85
+
+# Raw names remembered by the resolver before its exact-string cache is reset
+RAW_CACHE_LIMIT = 100000
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+def normalize_key(name):
+    """
+    Reduce a commodity name to the key used for alias lookups.
+
+    Case, whitespace and punctuation are dropped, "&" is read as "and", and the journal's
+    "$..._Name;" symbol decoration is removed.
+    """
+    key = name.strip().lower()
+    if key.startswith('$'):
+        key = key[1:]
+    if key.endswith('_name;'):
+        key = key[:-6]
+    return _NON_ALNUM.sub('', key.replace('&', 'and'))
+
+class CommodityResolver:
+    """
+    Resolve arbitrary commodity names to canonical names.
+
+    The canonical names and every alias are compiled into one normalized-key dict when the
+    resolver is built. Names seen before are answered from an exact-string cache without
+    normalizing them again, and fuzzy matches (including misses) are cached per normalized
+    key, so streams with many repeated names stay O(1) per name.
+    """
+
+    def __init__(self, canonical_names, aliases=None, fuzzy=True):
+        self.fuzzy = fuzzy
+        self._keys = {}
+        self._raw = {}
+        self._fuzzy_cache = {}
+        for name in canonical_names:
+            self._keys[normalize_key(name)] = name
+        canonical = set(canonical_names)
+        for name, alias_list in (aliases if aliases is not None else COMMODITY_ALIASES).items():
+            if name not in canonical:
+                continue
+            for alias in alias_list:
+                self._keys.setdefault(normalize_key(alias), name)
+        self._key_list = list(self._keys)
+        logger.debug(f"Compiled commodity resolver with {len(self._keys)} keys")
+
+    def resolve(self, name):
+        """Return the canonical name for a commodity, or None if it cannot be resolved."""
+        if not name:
+            return None
+        resolved = self._raw.get(name)
+        if resolved is not None or name in self._raw:
+            return resolved
+
+        key = normalize_key(name)
+        resolved = self._keys.get(key)
+        if resolved is None and self.fuzzy:
+            resolved = self._fuzzy_match(key)
+
+        if len(self._raw) >= RAW_CACHE_LIMIT:
+            self._raw.clear()
+        self._raw[name] = resolved
+        return resolved
+
+    def _fuzzy_match(self, key):
+        if key in self._fuzzy_cache:
+            return self._fuzzy_cache[key]
+        matches = difflib.get_close_matches(key, self._key_list, n=1, cutoff=FUZZY_CUTOFF)
+        resolved = self._keys[matches[0]] if matches else None
+        self._fuzzy_cache[key] = resolved
+        if resolved:
+            logger.info(f"Fuzzy matched commodity key '{key}' to '{resolved}'")
+        return resolved
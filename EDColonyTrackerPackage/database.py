@@ -5,6 +5,17 @@ items, and construction sites.
 
 import sqlite3
 import os
+import re
+import struct
+import sys
+import time
+import threading
+import uuid
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager
+from commodity_aliases import CommodityResolver
+from events import (publish, SiteAdded, SiteRemoved, SiteRenamed, RequirementChanged,
+                    RequirementRemoved, DeliveryRecorded, DeliveriesCleared)
 from utils import get_logger, BASE_DIR
 
 # Get a logger for this module
@@ -13,6 +24,154 @@ logger = get_logger('Database')
 # Define the database directory path
 DB_DIR = os.path.join(BASE_DIR, "databases")
 
+# Upper bound on the estimated memory held by cached fetch_deliveries results
+DELIVERY_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# Source recorded in delivery_log when a delivery does not name one
+DEFAULT_SOURCE = "manual"
+
+# How long removing a site waits for other threads to finish with its database file
+HANDLE_RELEASE_TIMEOUT_SECONDS = 5.0
+
+class DeliveryRecord(namedtuple('DeliveryRecord',
+                                ['commodity', 'amount_required', 'remaining_amount', 'total_delivered'])):
+    """A single fetch_deliveries row; still unpacks and indexes like the plain tuple it replaces."""
+    __slots__ = ()
+
+class DeliveryCache:
+    """
+    LRU cache of fetch_deliveries results, keyed by construction site.
+
+    Entries are evicted least recently used first once their estimated size exceeds
+    max_bytes. The write functions in this module invalidate the affected site after
+    they commit, so cached results never outlive a change made through this module.
+
+    Each invalidation bumps a per-site generation number. Readers capture it with
+    generation() before querying and pass it to put(), which discards the result if a
+    write was invalidated in between, so a read racing a commit on another thread is
+    never cached.
+
+    Other processes, such as a journal import run from the command line, write without
+    invalidating. Each entry therefore also stores the file change counter read from the
+    site database's header before the query, and get() treats an entry as a miss once
+    the file's counter has moved on.
+    """
+
+    def __init__(self, max_bytes=DELIVERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        # Bumped by invalidate; _epoch covers invalidating every site at once
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _estimate_size(records):
+        size = sys.getsizeof(records)
+        for record in records:
+            size += sys.getsizeof(record) + sys.getsizeof(record.commodity)
+        return size
+
+    def get(self, construction_site, change_counter=None):
+        """
+        Return the cached records for a site, or None on a miss.
+
+        An entry cached under a different change_counter was made before another write to
+        the file, so it is dropped and reported as a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(construction_site)
+            if entry is not None and entry[1] != change_counter:
+                logger.debug(f"Dropping cached deliveries for {construction_site}: the file changed")
+                self._discard(construction_site)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(construction_site)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, construction_site):
+        """Return a token that changes whenever the site is invalidated."""
+        with self._lock:
+            return self._epoch, self._generations.get(construction_site, 0)
+
+    def put(self, construction_site, records, generation=None, change_counter=None):
+        """
+        Cache the records for a site, evicting older entries to stay under the cap.
+
+        If generation is given and the site has been invalidated since it was taken, the
+        records may predate that write and are not cached. change_counter is the file
+        change counter read before the query; get() must be given the same value to hit.
+        """
+        records = tuple(records)
+        size = self._estimate_size(records)
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(construction_site, 0)):
+                logger.debug(f"Not caching deliveries for {construction_site}: invalidated during the read")
+                return
+            self._discard(construction_site)
+            if size > self.max_bytes:
+                return
+            self._entries[construction_site] = (records, change_counter)
+            self._sizes[construction_site] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                logger.debug(f"Evicted cached deliveries for {oldest}")
+
+    def invalidate(self, construction_site=None):
+        """Drop the cached records for one site, or for every site if none is given."""
+        with self._lock:
+            if construction_site is None:
+                self._entries.clear()
+                self._sizes.clear()
+                self._total_bytes = 0
+                self._epoch += 1
+            else:
+                self._discard(construction_site)
+                self._generations[construction_site] = self._generations.get(construction_site, 0) + 1
+
+    def stats(self):
+        """Return a dict of hit/miss counters and current cache occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _discard(self, construction_site):
+        if construction_site in self._entries:
+            del self._entries[construction_site]
+            self._total_bytes -= self._sizes.pop(construction_site)
+
+def read_change_counter(path):
+    """Return the SQLite file change counter from a database header, or None if unreadable."""
+    try:
+        with open(path, mode='rb') as file:
+            header = file.read(28)
+        if len(header) < 28 or not header.startswith(b"SQLite format 3\x00"):
+            return None
+        return struct.unpack(">I", header[24:28])[0]
+    except OSError:
+        return None
+
+# Shared cache used by fetch_deliveries and invalidated by the write functions
+delivery_cache = DeliveryCache()
+
+def get_delivery_cache_stats():
+    """Return hit/miss counters and occupancy for the fetch_deliveries cache."""
+    return delivery_cache.stats()
+
 def ensure_db_directory_exists():
     """Ensure the database directory exists, creating it if necessary."""
     if not os.path.exists(DB_DIR):
@@ -24,12 +183,176 @@ def get_db_path(db_name):
     ensure_db_directory_exists()
     return os.path.join(DB_DIR, db_name)
 
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9_-]+')
+
+def site_file_name(construction_site):
+    """
+    Return a new, unique database file name for a construction site.
+
+    The name is a filesystem-safe slug of the site name, for readability, plus a random
+    suffix. It does not depend on the name alone, so a site renamed away from a name
+    never shares its file with a new site that takes the old name.
+    """
+    slug = _UNSAFE_FILENAME_CHARS.sub('_', construction_site).strip('_')[:40] or 'site'
+    return f"site_{slug}_{uuid.uuid4().hex[:12]}.db"
+
+class SiteRegistry:
+    """
+    Map construction sites to their database files and track every open connection.
+
+    The file for each site is recorded in the db_file column of construction_sites, which
+    is unique, so a site can be renamed without touching its file. Connections opened
+    through open_connection are tracked per file, which lets a caller wait until a file
+    has no open handles before deleting it.
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._loaded_dir = None
+        self._handles = defaultdict(set)
+        self._lock = threading.RLock()
+        self._released = threading.Condition(self._lock)
+
+    def load(self):
+        """(Re)load the site to file mapping from cargo_tracker.db."""
+        files = {}
+        try:
+            with open_connection(get_db_path("cargo_tracker.db")) as conn:
+                cursor = conn.execute("SELECT name, db_file FROM construction_sites WHERE db_file IS NOT NULL")
+                files = dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            logger.debug(f"Site registry not loaded: {e}")
+        with self._lock:
+            self._files = files
+            self._loaded_dir = DB_DIR
+
+    def file_for(self, construction_site):
+        """Return the database file name registered for a site, or None if it is not registered."""
+        with self._lock:
+            stale = self._loaded_dir != DB_DIR
+            db_file = None if stale else self._files.get(construction_site)
+        if db_file is None:
+            # Another process may have added or renamed the site since we last loaded
+            self.load()
+            with self._lock:
+                db_file = self._files.get(construction_site)
+        return db_file
+
+    def path_for(self, construction_site):
+        """Return the full database path for a site, or None if it is not registered."""
+        db_file = self.file_for(construction_site)
+        return get_db_path(db_file) if db_file else None
+
+    def register(self, construction_site, db_file):
+        """Record the file of a site, refusing a file that belongs to another site."""
+        with self._lock:
+            for name, registered in self._files.items():
+                if registered == db_file and name != construction_site:
+                    raise ValueError(f"{db_file} is already registered to construction site {name}")
+            self._files[construction_site] = db_file
+
+    def unregister(self, construction_site):
+        with self._lock:
+            self._files.pop(construction_site, None)
+
+    def rename(self, construction_site, new_name):
+        with self._lock:
+            db_file = self._files.pop(construction_site, None)
+            if db_file is not None:
+                self._files[new_name] = db_file
+
+    def track(self, db_path, conn):
+        with self._lock:
+            self._handles[db_path].add(conn)
+
+    def release(self, db_path, conn):
+        """Close a connection and stop tracking it."""
+        conn.close()
+        with self._lock:
+            self._handles[db_path].discard(conn)
+            if not self._handles[db_path]:
+                del self._handles[db_path]
+            self._released.notify_all()
+
+    def wait_for_release(self, db_path, timeout=HANDLE_RELEASE_TIMEOUT_SECONDS):
+        """
+        Wait until every tracked connection to a database file has been released.
+
+        Tracked connections only live for the length of an open_connection block, so they
+        are left to the threads using them and closed when those blocks exit.
+
+        Returns:
+            bool: True once the file has no open handles, False if some are still in use
+            after timeout seconds.
+        """
+        with self._lock:
+            released = self._released.wait_for(lambda: db_path not in self._handles, timeout)
+            if not released:
+                logger.warning(f"{len(self._handles[db_path])} handles to {db_path} still open "
+                               f"after {timeout} s")
+            return released
+
+    def open_handle_count(self, db_path=None):
+        """Return the number of tracked open connections, for one file or in total."""
+        with self._lock:
+            if db_path is not None:
+                return len(self._handles.get(db_path, ()))
+            return sum(len(handles) for handles in self._handles.values())
+
+# Shared registry of site files and open connections
+site_registry = SiteRegistry()
+
+@contextmanager
+def open_connection(db_path):
+    """
+    Open a tracked connection that commits on success, rolls back on error and is always
+    closed on exit, so no file handle outlives the block.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    site_registry.track(db_path, conn)
+    try:
+        with conn:
+            yield conn
+    finally:
+        site_registry.release(db_path, conn)
+
+def site_connection(construction_site):
+    """
+    Open a tracked connection to a construction site's database.
+
+    Raises:
+        sqlite3.OperationalError: If the site is not registered, so no file is created
+        for it.
+    """
+    site_db_path = site_registry.path_for(construction_site)
+    if site_db_path is None:
+        raise sqlite3.OperationalError(f"unknown construction site: {construction_site}")
+    return open_connection(site_db_path)
+
+# Resolver built from the items table on first use and rebuilt when new items are added
+_commodity_resolver = None
+
+def get_commodity_resolver():
+    """Return the shared commodity resolver, compiling it from the items table if needed."""
+    global _commodity_resolver
+    if _commodity_resolver is None:
+        _commodity_resolver = CommodityResolver(fetch_items())
+    return _commodity_resolver
+
+def resolve_commodity(commodity):
+    """Map a commodity name to its canonical items name, keeping unknown names as entered."""
+    resolved = get_commodity_resolver().resolve(commodity)
+    if resolved is None:
+        logger.debug(f"Unrecognised commodity name kept as entered: {commodity}")
+        return commodity.strip()
+    return resolved
+
 def create_tables(db_name="cargo_tracker.db"):
     """Create necessary database tables if they don't exist."""
     logger.debug("create_tables function called")
     db_path = get_db_path(db_name)
     try:
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
 
             # Create table for deliveries if it doesn't exist
@@ -65,10 +388,75 @@ def create_tables(db_name="cargo_tracker.db"):
             # Create table for construction sites if it doesn't exist
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS construction_sites (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT UNIQUE,
+                    db_file TEXT
+                )
+            ''')
+
+            # Fleet carriers, their current stock and a ledger of purchases and transfers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS carriers (
                     id INTEGER PRIMARY KEY,
                     name TEXT UNIQUE
                 )
             ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS carrier_stock (
+                    carrier TEXT NOT NULL,
+                    commodity TEXT NOT NULL,
+                    quantity INTEGER NOT NULL DEFAULT 0 CHECK (quantity >= 0),
+                    PRIMARY KEY (carrier, commodity)
+                ) WITHOUT ROWID
+            ''')
+            # Finds every carrier holding a commodity without scanning empty stock rows
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_carrier_stock_commodity
+                ON carrier_stock (commodity, carrier, quantity) WHERE quantity > 0
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS carrier_ledger (
+                    id INTEGER PRIMARY KEY,
+                    carrier TEXT,
+                    commodity TEXT,
+                    quantity INTEGER,
+                    construction_site TEXT,
+                    recorded_at REAL
+                )
+            ''')
+
+            # Register database files for sites created before the site registry existed
+            cursor.execute("PRAGMA table_info(construction_sites)")
+            if 'db_file' not in [info[1] for info in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE construction_sites ADD COLUMN db_file TEXT")
+                logger.info(f"Added db_file column to {db_name}")
+            cursor.execute("PRAGMA index_list(construction_sites)")
+            if 'idx_construction_sites_db_file' not in [index[1] for index in cursor.fetchall()]:
+                # Sites renamed before files were named independently of the site name can
+                # share a file with a newer site that took the old name. The oldest site
+                # keeps the file and each newer one gets a fresh, empty file.
+                cursor.execute("SELECT id, name, db_file FROM construction_sites WHERE db_file IS NOT NULL ORDER BY id")
+                claimed = set()
+                for site_id, name, db_file in cursor.fetchall():
+                    if db_file in claimed:
+                        new_file = site_file_name(name)
+                        cursor.execute("UPDATE construction_sites SET db_file = ? WHERE id = ?", (new_file, site_id))
+                        logger.warning(f"Construction site {name} shared {db_file} with an older site; "
+                                       f"moved it to {new_file}")
+                    claimed.add(db_file)
+                cursor.execute("DROP INDEX IF EXISTS idx_construction_sites_unregistered")
+            # No two sites may share a database file. Also finds unregistered sites below
+            # without scanning the table at startup.
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_construction_sites_db_file
+                ON construction_sites (db_file)
+            ''')
+            cursor.execute("SELECT id, name FROM construction_sites WHERE db_file IS NULL")
+            for site_id, name in cursor.fetchall():
+                legacy_file = f"{name}.db"
+                db_file = legacy_file if os.path.exists(get_db_path(legacy_file)) else site_file_name(name)
+                cursor.execute("UPDATE construction_sites SET db_file = ? WHERE id = ?", (db_file, site_id))
+                logger.info(f"Registered {db_file} for construction site {name}")
             logger.info(f"Database tables created/verified in {db_name}")
     except sqlite3.Error as e:
         logger.error(f"Database error in create_tables: {e}")
@@ -77,46 +465,114 @@ def add_item(item_name):
     """Add a new item to the items table."""
     try:
         db_path = get_db_path("cargo_tracker.db")
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT OR IGNORE INTO items (name) VALUES (?)", (item_name,))
             if cursor.rowcount > 0:
+                global _commodity_resolver
+                _commodity_resolver = None
                 logger.debug(f"Added item: {item_name}")
     except sqlite3.Error as e:
         logger.error(f"Database error in add_item: {e}")
 
+def create_site_tables(cursor):
+    """Create the tables used by a per-site database if they don't exist."""
+    # Create deliveries table directly (not relying on create_tables)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS deliveries (
+            id INTEGER PRIMARY KEY,
+            commodity TEXT,
+            quantity INTEGER DEFAULT 0,
+            construction_site TEXT,
+            amount_required INTEGER DEFAULT 0
+        )
+    ''')
+    # One row per recorded delivery, used for progress history charts and analytics
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS delivery_log (
+            id INTEGER PRIMARY KEY,
+            commodity TEXT,
+            quantity INTEGER,
+            delivered_at REAL,
+            source TEXT DEFAULT 'manual'
+        )
+    ''')
+    cursor.execute("PRAGMA table_info(delivery_log)")
+    if "source" not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE delivery_log ADD COLUMN source TEXT DEFAULT 'manual'")
+    # Per-commodity lookups, updates and deletes, and the GROUP BY in fetch_deliveries
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_commodity ON deliveries (commodity)")
+    # Removing a requirement deletes its log rows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_delivery_log_commodity ON delivery_log (commodity)")
+    # Newest write-behind spool sequence number committed to this site
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS spool_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            applied_seq INTEGER
+        )
+    ''')
+    # Byte offset up to which each journal file's contributions are committed to this site
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS journal_state (
+            path TEXT PRIMARY KEY,
+            offset INTEGER
+        )
+    ''')
+
+def add_construction_sites(construction_site_names, db_files=None):
+    """
+    Register several construction sites in the main database in one transaction.
+
+    Args:
+        construction_site_names (list): Names of the sites to register. Sites that are
+            already registered are skipped.
+        db_files (dict): Optional file names for new sites whose databases were already
+            written, as by write_site_requirements. Other new sites get a fresh file.
+    """
+    db_files = db_files or {}
+    try:
+        db_path = get_db_path("cargo_tracker.db")
+        with open_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM construction_sites")
+            existing = {row[0] for row in cursor.fetchall()}
+            new_sites = {name: db_files.get(name) or site_file_name(name)
+                         for name in construction_site_names if name not in existing}
+            cursor.executemany("INSERT INTO construction_sites (name, db_file) VALUES (?, ?)", new_sites.items())
+            logger.info(f"Registered {len(new_sites)} new construction sites")
+    except sqlite3.Error as e:
+        logger.error(f"Database error in add_construction_sites: {e}")
+        return False
+    for name, db_file in new_sites.items():
+        site_registry.register(name, db_file)
+        publish(SiteAdded(name))
+    return True
+
 def add_construction_site(construction_site_name):
     """Add a new construction site to the construction sites table."""
     try:
         # Add to main database
         db_path = get_db_path("cargo_tracker.db")
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("INSERT OR IGNORE INTO construction_sites (name) VALUES (?)", (construction_site_name,))
-            if cursor.rowcount > 0:
+            db_file = site_file_name(construction_site_name)
+            cursor.execute("INSERT OR IGNORE INTO construction_sites (name, db_file) VALUES (?, ?)",
+                           (construction_site_name, db_file))
+            added = cursor.rowcount > 0
+            if added:
+                site_registry.register(construction_site_name, db_file)
                 logger.info(f"Added construction site: {construction_site_name}")
         
         # Create a separate database for the construction site with required tables
-        site_db_path = get_db_path(f"{construction_site_name}.db")
-        with sqlite3.connect(site_db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create deliveries table directly (not relying on create_tables)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS deliveries (
-                    id INTEGER PRIMARY KEY,
-                    commodity TEXT,
-                    quantity INTEGER DEFAULT 0,
-                    construction_site TEXT,
-                    amount_required INTEGER DEFAULT 0
-                )
-            ''')
+        with site_connection(construction_site_name) as conn:
+            create_site_tables(conn.cursor())
             logger.info(f"Created deliveries table for {construction_site_name}")
-            
-        return True
     except sqlite3.Error as e:
         logger.error(f"Database error in add_construction_site: {e}")
         return False
+    if added:
+        publish(SiteAdded(construction_site_name))
+    return True
 
 def populate_items():
     """Populate the items table with a predefined list of commodities."""
@@ -154,7 +610,7 @@ def fetch_items():
     items = []
     try:
         db_path = get_db_path("cargo_tracker.db")
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM items")
             items = [row[0] for row in cursor.fetchall()]
@@ -168,7 +624,7 @@ def fetch_construction_sites():
     construction_sites = []
     try:
         db_path = get_db_path("cargo_tracker.db")
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM construction_sites")
             construction_sites = [row[0] for row in cursor.fetchall()]
@@ -178,11 +634,24 @@ def fetch_construction_sites():
     return construction_sites
 
 def fetch_deliveries(construction_site):
-    """Fetch deliveries for a specific construction site."""
+    """
+    Fetch deliveries for a specific construction site.
+
+    Results are served from the delivery cache when possible. Each row is a DeliveryRecord
+    of (commodity, amount_required, remaining_amount, total_delivered).
+    """
+    # Writes committed by other processes advance the change counter without invalidating
+    site_db_path = site_registry.path_for(construction_site)
+    change_counter = read_change_counter(site_db_path) if site_db_path else None
+    cached = delivery_cache.get(construction_site, change_counter)
+    if cached is not None:
+        return list(cached)
+    # Taken before the query so a write committed meanwhile keeps this result out of the cache
+    generation = delivery_cache.generation(construction_site)
+
     deliveries = []
     try:
-        db_path = get_db_path(f"{construction_site}.db")
-        with sqlite3.connect(db_path) as conn:
+        with site_connection(construction_site) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT commodity, amount_required, SUM(quantity) FROM deliveries GROUP BY commodity")
             rows = cursor.fetchall()
@@ -192,37 +661,183 @@ def fetch_deliveries(construction_site):
                 amount_required = amount_required if amount_required is not None else 0
                 total_delivered = total_delivered if total_delivered is not None else 0
                 remaining_amount = amount_required - total_delivered
-                deliveries.append((commodity, amount_required, remaining_amount, total_delivered))
+                deliveries.append(DeliveryRecord(commodity, amount_required, remaining_amount, total_delivered))
+        delivery_cache.put(construction_site, deliveries, generation, change_counter)
         logger.debug(f"Fetched {len(deliveries)} deliveries for {construction_site}")
     except sqlite3.Error as e:
         logger.error(f"Database error in fetch_deliveries: {e}")
     return deliveries
 
-def add_delivery(construction_site, commodity, quantity):
+def fetch_delivery_history(construction_site, after_id=0):
+    """
+    Fetch logged deliveries for a site in the order they were recorded.
+
+    Args:
+        after_id (int): Only return log entries with a larger id, for incremental reads.
+
+    Returns:
+        list: (id, delivered_at, quantity) tuples, delivered_at being a Unix timestamp.
+    """
+    history = []
+    try:
+        with site_connection(construction_site) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, delivered_at, quantity FROM delivery_log WHERE id > ? ORDER BY id",
+                           (after_id,))
+            history = cursor.fetchall()
+        logger.debug(f"Fetched {len(history)} delivery log entries for {construction_site}")
+    except sqlite3.Error as e:
+        # Sites that have not recorded a delivery since logging was added have no log yet
+        logger.debug(f"No delivery history for {construction_site}: {e}")
+    return history
+
+def apply_delivery(cursor, construction_site, commodity, quantity, delivered_at, source):
+    """
+    Log a delivery and add it to a site's totals using an open site cursor.
+
+    The caller owns the transaction. Returns True if a new deliveries row was inserted.
+    """
+    cursor.execute("INSERT INTO delivery_log (commodity, quantity, delivered_at, source) VALUES (?, ?, ?, ?)",
+                   (commodity, quantity, delivered_at, source))
+    # Increment in a single statement so concurrent writers cannot lose each other's updates
+    cursor.execute("""
+        UPDATE deliveries SET quantity = COALESCE(quantity, 0) + ?
+        WHERE id = (SELECT MIN(id) FROM deliveries WHERE commodity = ?)
+    """, (quantity, commodity))
+    if cursor.rowcount > 0:
+        return False
+    cursor.execute("INSERT INTO deliveries (commodity, quantity, construction_site) VALUES (?, ?, ?)",
+                   (commodity, quantity, construction_site))
+    return True
+
+def add_delivery(construction_site, commodity, quantity, source=DEFAULT_SOURCE):
     """Add a delivery to the database for a specific construction site."""
+    commodity = resolve_commodity(commodity)
     try:
-        db_path = get_db_path(f"{construction_site}.db")
-        with sqlite3.connect(db_path) as conn:
+        with site_connection(construction_site) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT quantity FROM deliveries WHERE commodity = ?", (commodity,))
-            result = cursor.fetchone()
-            if result:
-                new_quantity = (result[0] if result[0] is not None else 0) + quantity
-                cursor.execute("UPDATE deliveries SET quantity = ? WHERE commodity = ?", (new_quantity, commodity))
-                logger.info(f"Updated delivery: {quantity} units of {commodity} to {construction_site}, new total: {new_quantity}")
-            else:
-                cursor.execute("INSERT INTO deliveries (commodity, quantity, construction_site) VALUES (?, ?, ?)", 
-                              (commodity, quantity, construction_site))
+            create_site_tables(cursor)
+            if apply_delivery(cursor, construction_site, commodity, quantity, time.time(), source):
                 logger.info(f"Added new delivery: {quantity} units of {commodity} to {construction_site}")
+            else:
+                cursor.execute("SELECT SUM(quantity) FROM deliveries WHERE commodity = ?", (commodity,))
+                new_quantity = cursor.fetchone()[0]
+                logger.info(f"Updated delivery: {quantity} units of {commodity} to {construction_site}, new total: {new_quantity}")
     except sqlite3.Error as e:
         logger.error(f"Database error in add_delivery: {e}")
+        return
+    finally:
+        delivery_cache.invalidate(construction_site)
+    publish(DeliveryRecorded(construction_site, commodity, quantity))
+
+def add_deliveries(construction_site, deliveries, applied_seq=None, source=DEFAULT_SOURCE, journal_offset=None):
+    """
+    Add several deliveries to a construction site in a single transaction.
+
+    Either every delivery is recorded or, on a database error, none of them are.
+
+    Args:
+        construction_site (str): The site receiving the deliveries.
+        deliveries (list): (commodity, quantity), (commodity, quantity, source) or
+            (commodity, quantity, source, delivered_at) tuples, where delivered_at is a Unix
+            timestamp; None or a missing value means now. Repeated commodities are
+            recorded as separate deliveries.
+        applied_seq (int): Optional write-behind spool sequence number stored in the same
+            transaction, so a spool replay can skip deliveries that were already committed.
+        source (str): Where deliveries without their own source came from.
+        journal_offset (tuple): Optional (path, offset) of the journal file the deliveries
+            were read from, stored in the same transaction so a re-read can skip them.
+
+    Returns:
+        int: Number of deliveries recorded, or None if the transaction failed.
+    """
+    now = time.time()
+    deliveries = [(resolve_commodity(delivery[0]), delivery[1],
+                   delivery[2] if len(delivery) > 2 else source,
+                   delivery[3] if len(delivery) > 3 and delivery[3] is not None else now)
+                  for delivery in deliveries]
+    if not deliveries:
+        return 0
+    try:
+        with site_connection(construction_site) as conn:
+            cursor = conn.cursor()
+            create_site_tables(cursor)
+            for commodity, quantity, delivery_source, delivered_at in deliveries:
+                apply_delivery(cursor, construction_site, commodity, quantity, delivered_at, delivery_source)
+            if applied_seq is not None:
+                cursor.execute("""
+                    INSERT INTO spool_state (id, applied_seq) VALUES (1, ?)
+                    ON CONFLICT(id) DO UPDATE SET applied_seq = MAX(applied_seq, excluded.applied_seq)
+                """, (applied_seq,))
+            if journal_offset is not None:
+                cursor.execute("""
+                    INSERT INTO journal_state (path, offset) VALUES (?, ?)
+                    ON CONFLICT(path) DO UPDATE SET offset = MAX(offset, excluded.offset)
+                """, journal_offset)
+        logger.info(f"Added {len(deliveries)} deliveries to {construction_site} in one transaction")
+    except sqlite3.Error as e:
+        logger.error(f"Database error in add_deliveries: {e}")
+        return None
+    finally:
+        delivery_cache.invalidate(construction_site)
+    # One event per commodity keeps large batches cheap for subscribers
+    totals = {}
+    for commodity, quantity, _, _ in deliveries:
+        totals[commodity] = totals.get(commodity, 0) + quantity
+    for commodity, quantity in totals.items():
+        publish(DeliveryRecorded(construction_site, commodity, quantity))
+    return len(deliveries)
+
+def fetch_applied_spool_seq(construction_site):
+    """Return the newest write-behind spool sequence number committed to a site, or 0."""
+    site_db_path = site_registry.path_for(construction_site)
+    if site_db_path is None or not os.path.exists(site_db_path):
+        return 0
+    try:
+        with open_connection(site_db_path) as conn:
+            row = conn.execute("SELECT applied_seq FROM spool_state WHERE id = 1").fetchone()
+            return row[0] if row else 0
+    except sqlite3.Error as e:
+        # Sites that never received a buffered delivery have no spool_state table yet
+        logger.debug(f"No spool state for {construction_site}: {e}")
+        return 0
+
+def fetch_journal_offset(construction_site, path):
+    """Return the journal byte offset up to which contributions are committed to a site, or 0."""
+    site_db_path = site_registry.path_for(construction_site)
+    if site_db_path is None or not os.path.exists(site_db_path):
+        return 0
+    try:
+        with open_connection(site_db_path) as conn:
+            row = conn.execute("SELECT offset FROM journal_state WHERE path = ?", (path,)).fetchone()
+            return row[0] if row else 0
+    except sqlite3.Error as e:
+        # Sites that never received a journal contribution have no journal_state table yet
+        logger.debug(f"No journal state for {construction_site}: {e}")
+        return 0
 
 def remove_construction_site(construction_site):
-    """Remove a construction site from the database."""
-    # First remove from the main database
+    """Remove a construction site and its database file."""
+    site_db_path = site_registry.path_for(construction_site)
+    if site_db_path is None:
+        logger.warning(f"Cannot remove unknown construction site: {construction_site}")
+        return False
+    # Wait for other threads to finish with the file so it can be deleted on any platform
+    if not site_registry.wait_for_release(site_db_path):
+        logger.error(f"Could not remove database file for {construction_site}: it is still in use")
+        return False
+    try:
+        for path in (site_db_path, site_db_path + "-journal"):
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info(f"Removed database file for {construction_site}")
+    except OSError as e:
+        logger.error(f"Could not remove database file for {construction_site}: {e}")
+        return False
+
     try:
         db_path = get_db_path("cargo_tracker.db")
-        with sqlite3.connect(db_path) as conn:
+        with open_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM construction_sites WHERE name = ?", (construction_site,))
             if cursor.rowcount > 0:
@@ -230,38 +845,59 @@ def remove_construction_site(construction_site):
     except sqlite3.Error as e:
         logger.error(f"Database error in remove_construction_site: {e}")
         return False
-        
-    # Then try to remove the file
-    site_db_path = get_db_path(f"{construction_site}.db")
-    if os.path.exists(site_db_path):
-        try:
-            # Try to close any connections to the file
-            import gc
-            gc.collect()  # Force garbage collection to release file handles
-            
-            # Try to delete the file
-            os.remove(site_db_path)
-            logger.info(f"Removed database file for {construction_site}")
-            return True
-        except OSError as e:
-            # If deletion fails, log it but don't fail the operation
-            logger.warning(f"Could not remove database file for {construction_site}: {e}")
-            logger.warning("The file may be in use by another application and will need to be removed manually.")
-            
-            # Return True anyway since the site was removed from the main database
-            return True
+    site_registry.unregister(construction_site)
+    delivery_cache.invalidate(construction_site)
+    publish(SiteRemoved(construction_site))
+    return True
+
+def rename_construction_site(construction_site, new_name):
+    """
+    Rename a construction site.
+
+    The site keeps its database file, so renaming only updates the registry row. The
+    construction_site column inside the site's deliveries table keeps the name each row
+    was written under.
+
+    Returns:
+        bool: True if the site was renamed, False if it does not exist, the new name is
+        already taken, or a database error occurred.
+    """
+    try:
+        db_path = get_db_path("cargo_tracker.db")
+        with open_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE construction_sites SET name = ? WHERE name = ?", (new_name, construction_site))
+            if cursor.rowcount == 0:
+                logger.warning(f"Cannot rename unknown construction site: {construction_site}")
+                return False
+    except sqlite3.IntegrityError:
+        logger.warning(f"Cannot rename {construction_site}: a site named {new_name} already exists")
+        return False
+    except sqlite3.Error as e:
+        logger.error(f"Database error in rename_construction_site: {e}")
+        return False
+    site_registry.rename(construction_site, new_name)
+    delivery_cache.invalidate(construction_site)
+    delivery_cache.invalidate(new_name)
+    logger.info(f"Renamed construction site {construction_site} to {new_name}")
+    publish(SiteRenamed(construction_site, new_name))
     return True
 
 def clear_deliveries(construction_site):
     """Clear all deliveries for a specific construction site."""
     try:
-        db_path = get_db_path(f"{construction_site}.db")
-        with sqlite3.connect(db_path) as conn:
+        with site_connection(construction_site) as conn:
             cursor = conn.cursor()
+            create_site_tables(cursor)
             cursor.execute("DELETE FROM deliveries")
+            cursor.execute("DELETE FROM delivery_log")
             logger.info(f"Cleared all deliveries for {construction_site}")
     except sqlite3.Error as e:
         logger.error(f"Database error in clear_deliveries: {e}")
+        return
+    finally:
+        delivery_cache.invalidate(construction_site)
+    publish(DeliveriesCleared(construction_site))
 
 def import_from_csv_to_db(csv_data):
     """Import data from CSV into the database."""
@@ -290,19 +926,17 @@ def import_from_csv_to_db(csv_data):
 
 def add_commodity_requirement(construction_site, commodity, amount_required):
     """Add a commodity requirement to a construction site."""
+    commodity = resolve_commodity(commodity)
     try:
-        db_path = get_db_path(f"{construction_site}.db")
-        with sqlite3.connect(db_path) as conn:
+        with site_connection(construction_site) as conn:
             cursor = conn.cursor()
             
-            # Check if the commodity already exists
-            cursor.execute("SELECT id FROM deliveries WHERE commodity = ?", (commodity,))
-            result = cursor.fetchone()
+            # Update the existing record, if any, before deciding to insert, so the write lock
+            # is held from the first statement and concurrent writers cannot both insert
+            cursor.execute("UPDATE deliveries SET amount_required = ? WHERE commodity = ?", 
+                         (amount_required, commodity))
             
-            if result:
-                # Update existing record
-                cursor.execute("UPDATE deliveries SET amount_required = ? WHERE commodity = ?", 
-                             (amount_required, commodity))
+            if cursor.rowcount > 0:
                 logger.info(f"Updated requirement: {amount_required} units of {commodity} for {construction_site}")
             else:
                 # Create new record
@@ -311,6 +945,10 @@ def add_commodity_requirement(construction_site, commodity, amount_required):
                 logger.info(f"Added new requirement: {amount_required} units of {commodity} for {construction_site}")
     except sqlite3.Error as e:
         logger.error(f"Database error in add_commodity_requirement: {e}")
+        return
+    finally:
+        delivery_cache.invalidate(construction_site)
+    publish(RequirementChanged(construction_site, commodity, amount_required))
 
 def update_commodity_requirements(construction_site, requirements_list):
     """Update all commodity requirements for a construction site."""
@@ -321,14 +959,55 @@ def update_commodity_requirements(construction_site, requirements_list):
     except Exception as e:
         logger.error(f"Error in update_commodity_requirements: {e}")
 
+def write_site_requirements(construction_site, requirements_list, db_file=None):
+    """
+    Write commodity requirements for a site in a single transaction.
+
+    Unlike update_commodity_requirements, this creates the site database if needed, does
+    not register the site in cargo_tracker.db, and commits all rows at once, which makes
+    it safe to call from worker processes for independent sites.
+
+    Args:
+        db_file (str): File to write, for a site that is not registered yet. Pass the
+            same name to add_construction_sites to register the site with it.
+
+    Returns:
+        int: The number of requirements written, or 0 on error.
+    """
+    try:
+        connection = open_connection(get_db_path(db_file)) if db_file else site_connection(construction_site)
+        with connection as conn:
+            cursor = conn.cursor()
+            create_site_tables(cursor)
+            for commodity, amount_required in requirements_list:
+                commodity = resolve_commodity(commodity)
+                cursor.execute("UPDATE deliveries SET amount_required = ? WHERE commodity = ?",
+                               (amount_required, commodity))
+                if cursor.rowcount == 0:
+                    cursor.execute("INSERT INTO deliveries (commodity, quantity, construction_site, amount_required) VALUES (?, 0, ?, ?)",
+                                   (commodity, construction_site, amount_required))
+        logger.info(f"Wrote {len(requirements_list)} commodity requirements for {construction_site}")
+    except sqlite3.Error as e:
+        logger.error(f"Database error in write_site_requirements: {e}")
+        return 0
+    finally:
+        delivery_cache.invalidate(construction_site)
+    publish(RequirementChanged(construction_site, None, None))
+    return len(requirements_list)
+
 def remove_commodity_requirement(construction_site, commodity):
     """Remove a commodity requirement from a construction site."""
     try:
-        db_path = get_db_path(f"{construction_site}.db")
-        with sqlite3.connect(db_path) as conn:
+        with site_connection(construction_site) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM deliveries WHERE commodity = ?", (commodity,))
             if cursor.rowcount > 0:
                 logger.info(f"Removed requirement for {commodity} from {construction_site}")
+            create_site_tables(cursor)
+            cursor.execute("DELETE FROM delivery_log WHERE commodity = ?", (commodity,))
     except sqlite3.Error as e:
-        logger.error(f"Database error in remove_commodity_requirement: {e}")
\ No newline at end of file
+        logger.error(f"Database error in remove_commodity_requirement: {e}")
+        return
+    finally:
+        delivery_cache.invalidate(construction_site)
+    publish(RequirementRemoved(construction_site, commodity))
\ No newline at end of file
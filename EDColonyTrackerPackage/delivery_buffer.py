@@ -0,0 +1,284 @@
+"""
+This module buffers delivery writes so bursts of deliveries are committed together.
+
+Deliveries are accepted immediately: each one is appended to a small spool file and added
+to an in-memory table that sums quantities per site, commodity and source. A background
+thread commits the buffered totals every FLUSH_MS milliseconds, or as soon as MAX_EVENTS
+deliveries are waiting, using one transaction per site. Each transaction also stores the
+sequence number of the newest delivery it covers, so replaying the spool after a crash
+never applies a delivery twice. Deliveries that cannot be written (for example while the
+database is locked) stay buffered and spooled, and are retried on the next flush.
+Buffered deliveries follow their site when it is renamed and are dropped when it is removed.
+Deliveries for a site that is not registered are rejected before they are accepted. If a
+site disappears without a site event reaching the buffer, for example because another
+process removed it, its deliveries are moved to a dead-letter file once the registry has
+been missing the site for ORPHAN_GRACE_SECONDS, instead of being retried forever.
+
+Spool appends are flushed to the operating system straight away, so an application crash
+loses nothing; the compacted spool written after each flush is also fsynced.
+"""
+
+import json
+import os
+import threading
+import time
+
+import database
+from database import (DEFAULT_SOURCE, add_deliveries, fetch_applied_spool_seq,
+                      fetch_construction_sites, resolve_commodity)
+from events import subscribe, SiteRemoved, SiteRenamed
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('DeliveryBuffer')
+
+# Commit buffered deliveries at least this often, in milliseconds
+FLUSH_MS = 250
+
+# Commit early once this many deliveries are waiting
+MAX_EVENTS = 500
+
+# Spool file name, stored next to the databases
+SPOOL_NAME = "delivery_spool.jsonl"
+
+# Deliveries for sites that no longer exist are appended here, in the spool's line format
+DEAD_LETTER_NAME = "delivery_dead_letter.jsonl"
+
+# Seconds a site may be missing from the registry before its deliveries are dead-lettered,
+# leaving time for the rename or removal event to move or drop them
+ORPHAN_GRACE_SECONDS = 10
+
+class DeliveryBuffer:
+    """
+    Write-behind buffer for deliveries with group commit and a crash-safe spool.
+
+    Call start() before adding deliveries; it replays anything left in the spool by a
+    previous run. Call stop() on shutdown to commit whatever is still buffered.
+    """
+
+    def __init__(self, spool_path=None, flush_ms=FLUSH_MS, max_events=MAX_EVENTS, dead_letter_path=None):
+        self.spool_path = spool_path or database.get_db_path(SPOOL_NAME)
+        self.dead_letter_path = dead_letter_path or database.get_db_path(DEAD_LETTER_NAME)
+        self.flush_ms = flush_ms
+        self.max_events = max_events
+        # Guards the pending table, sequence counter and spool file
+        self._lock = threading.Lock()
+        # Only one flush runs at a time
+        self._flush_lock = threading.Lock()
+        # site -> [{(commodity, source): summed quantity}, newest sequence number, delivery count]
+        self._pending = {}
+        self._waiting = 0
+        self._last_seq = 0
+        # Registered site names, refreshed from the database when an unknown name is added
+        self._known_sites = set()
+        # Buffered site -> monotonic time it was first found missing from the registry
+        self._missing_since = {}
+        self._spool = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._unsubscribe = None
+
+    def start(self):
+        """Replay the spool from a previous run and start the background flush thread."""
+        replayed = self._load_spool()
+        # Compact the spool so applied entries and torn lines from a crash are not kept
+        with self._lock:
+            self._rewrite_spool()
+            self._spool = open(self.spool_path, mode='a', encoding='utf-8')
+        if replayed:
+            logger.info(f"Replaying {replayed} spooled deliveries from {self.spool_path}")
+            self.flush()
+        self._unsubscribe = subscribe(self._on_site_events, SiteRemoved, SiteRenamed)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="DeliveryBuffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread, commit everything still buffered and close the spool."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def add(self, construction_site, commodity, quantity, source=DEFAULT_SOURCE):
+        """
+        Accept a delivery; it is committed by the next flush.
+
+        Raises:
+            ValueError: If the construction site is not registered.
+        """
+        if self._spool is None:
+            raise RuntimeError("DeliveryBuffer.start() must be called before adding deliveries")
+        if construction_site not in self._known_sites:
+            # The site may have been added since the names were last read
+            self._known_sites = set(fetch_construction_sites())
+            if construction_site not in self._known_sites:
+                raise ValueError(f"Unknown construction site: {construction_site}")
+        commodity = resolve_commodity(commodity)
+        with self._lock:
+            self._last_seq = max(self._last_seq + 1, time.time_ns())
+            self._spool.write(json.dumps([self._last_seq, construction_site, commodity, quantity, source]) + "\n")
+            self._spool.flush()
+            self._buffer(self._last_seq, construction_site, (commodity, source), quantity)
+            full = self._waiting >= self.max_events
+        if full:
+            self._wake.set()
+
+    def pending_count(self):
+        """Return the number of deliveries waiting to be committed."""
+        with self._lock:
+            return self._waiting
+
+    def _buffer(self, seq, construction_site, key, quantity, count=1):
+        entry = self._pending.setdefault(construction_site, [{}, 0, 0])
+        entry[0][key] = entry[0].get(key, 0) + quantity
+        entry[1] = max(entry[1], seq)
+        entry[2] += count
+        self._waiting += count
+
+    def _on_site_events(self, events):
+        # Wait for any flush in progress so its leftovers are moved too
+        with self._flush_lock, self._lock:
+            for event in events:
+                self._known_sites.discard(event.site)
+                self._missing_since.pop(event.site, None)
+                if isinstance(event, SiteRenamed):
+                    self._known_sites.add(event.new_name)
+                entry = self._pending.pop(event.site, None)
+                if entry is None:
+                    continue
+                if isinstance(event, SiteRenamed):
+                    for i, (key, quantity) in enumerate(entry[0].items()):
+                        self._buffer(entry[1], event.new_name, key, quantity, entry[2] if i == 0 else 0)
+                else:
+                    logger.info(f"Dropped {entry[2]} buffered deliveries for removed site {event.site}")
+                self._waiting -= entry[2]
+            self._rewrite_spool()
+
+    def _load_spool(self):
+        self._known_sites = set(fetch_construction_sites())
+        applied = {site: fetch_applied_spool_seq(site) for site in self._known_sites}
+        # Continue after every committed sequence number, even if the clock has gone back
+        self._last_seq = max(applied.values(), default=0)
+        if not os.path.exists(self.spool_path):
+            return 0
+        entries = []
+        with open(self.spool_path, mode='r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    seq, construction_site, commodity, quantity, source = json.loads(line)
+                except (ValueError, TypeError):
+                    # A crash mid-append can leave a torn last line
+                    logger.warning(f"Skipping damaged spool line: {line.strip()[:80]}")
+                    continue
+                entries.append((seq, construction_site, (commodity, source), quantity))
+
+        replayed = 0
+        orphaned = {}
+        for seq, construction_site, key, quantity in entries:
+            self._last_seq = max(self._last_seq, seq)
+            if construction_site not in self._known_sites:
+                # Removed while its deliveries were spooled; keep them out of the new spool
+                deltas, newest, count = orphaned.get(construction_site, ({}, 0, 0))
+                deltas[key] = deltas.get(key, 0) + quantity
+                orphaned[construction_site] = (deltas, max(newest, seq), count + 1)
+            elif seq > applied[construction_site]:
+                self._buffer(seq, construction_site, key, quantity)
+                replayed += 1
+        if orphaned:
+            self._dead_letter(orphaned)
+        return replayed
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_ms / 1000)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing delivery buffer: {e}", exc_info=True)
+
+    def flush(self):
+        """
+        Commit all buffered deliveries, one transaction per site.
+
+        Returns:
+            int: Number of buffered deliveries committed.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._waiting = 0
+            if not batch:
+                return 0
+
+            known_sites = set(fetch_construction_sites())
+            now = time.monotonic()
+            committed = 0
+            failed = {}
+            orphaned = {}
+            for construction_site, (deltas, seq, count) in batch.items():
+                if construction_site not in known_sites:
+                    # Renamed or removed; the site event normally moves or drops them
+                    missing_since = self._missing_since.setdefault(construction_site, now)
+                    if now - missing_since < ORPHAN_GRACE_SECONDS:
+                        failed[construction_site] = (deltas, seq, count)
+                    else:
+                        orphaned[construction_site] = (deltas, seq, count)
+                    continue
+                self._missing_since.pop(construction_site, None)
+                deliveries = [(commodity, quantity, source) for (commodity, source), quantity in deltas.items() if quantity]
+                if add_deliveries(construction_site, deliveries, applied_seq=seq) is None:
+                    failed[construction_site] = (deltas, seq, count)
+                else:
+                    committed += count
+
+            if orphaned:
+                self._dead_letter(orphaned)
+            with self._lock:
+                for construction_site, (deltas, seq, count) in failed.items():
+                    for i, (key, quantity) in enumerate(deltas.items()):
+                        self._buffer(seq, construction_site, key, quantity, count if i == 0 else 0)
+                self._rewrite_spool()
+            if failed:
+                logger.warning(f"Could not commit buffered deliveries for {len(failed)} sites; will retry")
+            logger.debug(f"Committed {committed} buffered deliveries for "
+                         f"{len(batch) - len(failed) - len(orphaned)} sites")
+            return committed
+
+    def _dead_letter(self, orphaned):
+        """Append buffered deliveries for sites that no longer exist to the dead-letter file."""
+        with open(self.dead_letter_path, mode='a', encoding='utf-8') as file:
+            for construction_site, (deltas, seq, count) in orphaned.items():
+                for (commodity, source), quantity in deltas.items():
+                    file.write(json.dumps([seq, construction_site, commodity, quantity, source]) + "\n")
+                self._missing_since.pop(construction_site, None)
+                logger.warning(f"Moved {count} buffered deliveries for missing site {construction_site} "
+                               f"to {self.dead_letter_path}")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _rewrite_spool(self):
+        # Replace the spool with just the still-pending totals; called with the lock held
+        temp_path = self.spool_path + ".tmp"
+        with open(temp_path, mode='w', encoding='utf-8') as file:
+            for construction_site, (deltas, seq, _) in self._pending.items():
+                for (commodity, source), quantity in deltas.items():
+                    file.write(json.dumps([seq, construction_site, commodity, quantity, source]) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        if self._spool is not None:
+            self._spool.close()
+        os.replace(temp_path, self.spool_path)
+        if self._spool is not None:
+            self._spool = open(self.spool_path, mode='a', encoding='utf-8')
@@ -0,0 +1,121 @@
+"""
+In-process publish/subscribe bus for data change events.
+
+The write functions in database.py publish a typed event for every change they commit, so
+views can update just the site or commodity that changed instead of reloading everything.
+Once a Tk root is attached, events are queued and delivered in one batch per idle cycle;
+without one (scripts, worker processes), each event is delivered as soon as it is published.
+"""
+
+import threading
+from collections import namedtuple
+
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('Events')
+
+# Milliseconds between checks for events published from background threads
+THREAD_POLL_MS = 100
+
+# Event types. Every event has a site field; a commodity of None means any or all of the
+# site's commodities may have changed.
+SiteAdded = namedtuple('SiteAdded', ['site'])
+SiteRemoved = namedtuple('SiteRemoved', ['site'])
+SiteRenamed = namedtuple('SiteRenamed', ['site', 'new_name'])
+RequirementChanged = namedtuple('RequirementChanged', ['site', 'commodity', 'amount_required'])
+RequirementRemoved = namedtuple('RequirementRemoved', ['site', 'commodity'])
+DeliveryRecorded = namedtuple('DeliveryRecorded', ['site', 'commodity', 'quantity'])
+DeliveriesCleared = namedtuple('DeliveriesCleared', ['site'])
+
+SITE_EVENTS = (SiteAdded, SiteRemoved, SiteRenamed)
+SITE_DATA_EVENTS = (RequirementChanged, RequirementRemoved, DeliveryRecorded, DeliveriesCleared)
+
+# Fleet carrier events have a carrier field instead; a commodity of None means the carrier
+# itself was added or removed.
+CarrierChanged = namedtuple('CarrierChanged', ['carrier', 'commodity'])
+
+class EventBus:
+    """Deliver published events to subscribers, batched per Tk idle cycle when attached."""
+
+    def __init__(self):
+        self._subscribers = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._root = None
+        self._flush_scheduled = False
+
+    def attach(self, root):
+        """Batch delivery through the given Tk root's idle callbacks from now on."""
+        self._root = root
+        self._root.after(THREAD_POLL_MS, self._poll)
+
+    def _poll(self):
+        # Events published off the main thread cannot schedule Tk callbacks themselves
+        if self._pending and not self._flush_scheduled:
+            self.flush()
+        self._root.after(THREAD_POLL_MS, self._poll)
+
+    def subscribe(self, callback, *event_types):
+        """
+        Register callback(events) to receive a list of events per batch.
+
+        If event types are given, only events of those types are delivered and batches
+        with none of them are skipped. Returns a function that unsubscribes the callback.
+        """
+        subscriber = (callback, tuple(event_types))
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+        def unsubscribe():
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+        return unsubscribe
+
+    def publish(self, event):
+        """
+        Queue an event for delivery.
+
+        Events published from background threads are picked up by the main loop within
+        THREAD_POLL_MS rather than scheduling a Tk callback from the wrong thread.
+        """
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        with self._lock:
+            self._pending.append(event)
+            schedule = self._root is not None and on_main_thread and not self._flush_scheduled
+            if schedule:
+                self._flush_scheduled = True
+        if self._root is None:
+            self.flush()
+        elif schedule:
+            self._root.after_idle(self.flush)
+
+    def flush(self):
+        """Deliver all pending events to subscribers in one batch."""
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._flush_scheduled = False
+            subscribers = list(self._subscribers)
+        if not events:
+            return
+        logger.debug(f"Delivering batch of {len(events)} events to {len(subscribers)} subscribers")
+        for callback, event_types in subscribers:
+            matching = [event for event in events if isinstance(event, event_types)] if event_types else events
+            if not matching:
+                continue
+            try:
+                callback(matching)
+            except Exception as e:
+                logger.error(f"Error in event subscriber {callback}: {e}", exc_info=True)
+
+# Shared bus used by the database module and the GUI
+event_bus = EventBus()
+
+def publish(event):
+    """Publish an event on the shared bus."""
+    event_bus.publish(event)
+
+def subscribe(callback, *event_types):
+    """Subscribe to events on the shared bus; returns an unsubscribe function."""
+    return event_bus.subscribe(callback, *event_types)
@@ -5,5 +5,11 @@ GUI package for Elite Dangerous Cargo Tracker.
 from .main_window import MainWindow
 from .delivery_ui import create_delivery_table
 from .site_manager import open_construction_site_manager
+from .market_view import open_market_view
+from .progress_chart import ProgressChart
+from .batch_delivery import open_batch_delivery
+from .analytics_view import open_analytics_view
+from .carrier_view import open_carrier_manager
 
-__all__ = ['MainWindow', 'create_delivery_table', 'open_construction_site_manager']
\ No newline at end of file
+__all__ = ['MainWindow', 'create_delivery_table', 'open_construction_site_manager', 'open_market_view',
+           'ProgressChart', 'open_batch_delivery', 'open_analytics_view', 'open_carrier_manager']
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+UI components for the analytics report across all construction sites.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analytics
+from gui.batch_delivery import parse_delivery_text
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('AnalyticsView')
+
+def _create_table(parent, columns, widths):
+    """Create a striped Treeview with a vertical scrollbar inside parent."""
+    table = ttk.Treeview(parent, columns=columns, show="headings")
+    for column, width in zip(columns, widths):
+        table.heading(column, text=column)
+        table.column(column, width=width, minwidth=60)
+    table.tag_configure('evenrow', background='lightgrey')
+    table.tag_configure('oddrow', background='white')
+    scrollbar = ttk.Scrollbar(parent, orient="vertical", command=table.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    table.configure(yscrollcommand=scrollbar.set)
+    table.pack(fill=tk.BOTH, expand=True)
+    return table
+
+def _fill_table(table, rows):
+    table.delete(*table.get_children())
+    for i, row in enumerate(rows):
+        table.insert("", tk.END, values=row, tags=('evenrow' if i % 2 == 0 else 'oddrow',))
+
+def open_analytics_view(parent):
+    """Open a window with completion, hauling effort, source and what-if reports."""
+    if not analytics.numpy_available():
+        logger.warning("Analytics requested but NumPy is not installed")
+        messagebox.showerror("Error", "The analytics report needs NumPy.\n\nInstall it with: pip install numpy")
+        return None
+
+    logger.info("Opening analytics report")
+    matrix = analytics.load_delivery_matrix()
+
+    report_window = tk.Toplevel(parent)
+    report_window.title("Analytics Report")
+    report_window.geometry("750x450")
+    notebook = ttk.Notebook(report_window)
+    notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    # Completion of each commodity across all sites
+    commodity_tab = tk.Frame(notebook)
+    notebook.add(commodity_tab, text="Commodities")
+    commodity_table = _create_table(commodity_tab, ("Commodity", "Required", "Delivered", "Complete %", "Sites Remaining"),
+                                    (200, 100, 100, 100, 120))
+    _fill_table(commodity_table, [(row.commodity, f"{row.required:,}", f"{row.delivered:,}", f"{row.percent:.1f}",
+                                   row.sites_remaining) for row in analytics.commodity_completion(matrix)])
+
+    # Sites ranked by the hauling still needed
+    effort_tab = tk.Frame(notebook)
+    notebook.add(effort_tab, text="Hauling Effort")
+    tk.Label(effort_tab, text=f"Trips assume {analytics.CARGO_CAPACITY} t of cargo per trip.").pack(anchor=tk.W)
+    effort_table = _create_table(effort_tab, ("Construction Site", "Remaining", "Trips", "Complete %"),
+                                 (250, 120, 80, 100))
+    _fill_table(effort_table, [(row.name, f"{row.remaining:,}", row.trips, f"{row.percent_complete:.1f}")
+                               for row in analytics.site_hauling_effort(matrix)])
+
+    # Delivered amounts by where they came from
+    source_tab = tk.Frame(notebook)
+    notebook.add(source_tab, text="Sources")
+    source_table = _create_table(source_tab, ("Source", "Delivered", "Share %"), (200, 120, 100))
+    _fill_table(source_table, [(source, f"{quantity:,}", f"{share:.1f}")
+                               for source, quantity, share in analytics.contribution_by_source(matrix.sites)])
+
+    # Which sites a load of cargo would complete
+    what_if_tab = tk.Frame(notebook)
+    notebook.add(what_if_tab, text="What If")
+    tk.Label(what_if_tab, text="Enter or paste cargo, one commodity and quantity per line:").pack(anchor=tk.W)
+    cargo_text = tk.Text(what_if_tab, height=6)
+    cargo_text.pack(fill=tk.X)
+    result_label = tk.Label(what_if_tab, text="")
+    result_frame = tk.Frame(what_if_tab)
+
+    def evaluate():
+        cargo = {}
+        for commodity, quantity, _ in parse_delivery_text(cargo_text.get("1.0", tk.END)):
+            amount = quantity.replace(",", "").strip()
+            if amount.isdigit():
+                cargo[commodity] = cargo.get(commodity, 0) + int(amount)
+        sites = analytics.what_if(matrix, cargo)
+        result_label.config(text=f"{len(sites)} sites would be completed by this cargo:")
+        _fill_table(what_if_table, [(site, f"{used:,}") for site, used in sites])
+
+    tk.Button(what_if_tab, text="Evaluate", command=evaluate, width=15).pack(pady=5)
+    result_label.pack(anchor=tk.W)
+    result_frame.pack(fill=tk.BOTH, expand=True)
+    what_if_table = _create_table(result_frame, ("Construction Site", "Cargo Used"), (300, 120))
+
+    logger.debug(f"Analytics report built for {len(matrix.sites)} sites and {len(matrix.commodities)} commodities")
+    return report_window
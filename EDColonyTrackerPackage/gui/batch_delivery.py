@@ -0,0 +1,260 @@
+"""
+UI components for recording many deliveries at once, typed into a grid or pasted from the
+clipboard, and committing them with one transaction per construction site.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+import re
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import add_deliveries, fetch_construction_sites, get_commodity_resolver
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('BatchDelivery')
+
+# Number of empty rows shown when the window opens
+INITIAL_ROWS = 10
+
+# A number with comma thousands separators, such as 1,200, in comma-separated text
+_GROUPED_NUMBER = re.compile(r"(?<![\w.])\d{1,3}(?:,\d{3})+(?![\w.])")
+
+COLUMNS = ("Commodity", "Quantity", "Construction Site", "Status")
+EDITABLE_COLUMNS = COLUMNS[:3]
+
+def _parse_quantity(text):
+    text = text.strip().replace(",", "").replace(" ", "")
+    return int(text) if text.isdigit() else None
+
+def parse_delivery_text(text):
+    """
+    Split pasted text into delivery rows.
+
+    Each line holds a commodity and a quantity, optionally followed by a construction site,
+    separated by tabs (spreadsheets, in-game cargo lists) or commas. The quantity may come
+    first, and may use comma thousands separators even in comma-separated lines. A first
+    line without any quantity is treated as a header and skipped.
+
+    Returns:
+        list: (commodity, quantity text, construction site) tuples of strings.
+    """
+    rows = []
+    for line_number, line in enumerate(text.splitlines()):
+        if not line.strip():
+            continue
+        if "\t" in line:
+            fields = line.split("\t")
+        else:
+            # Drop thousands separators first so "Steel, 1,200" keeps 1200 in one field
+            fields = _GROUPED_NUMBER.sub(lambda match: match.group().replace(",", ""), line).split(",")
+        fields = [field.strip() for field in fields]
+        fields += [""] * (3 - len(fields))
+        commodity, quantity, site = fields[:3]
+        if _parse_quantity(commodity) is not None and _parse_quantity(quantity) is None:
+            commodity, quantity = quantity, commodity
+        if line_number == 0 and _parse_quantity(quantity) is None:
+            continue
+        rows.append((commodity, quantity, site))
+    return rows
+
+def validate_delivery_row(commodity, quantity, site, known_sites):
+    """
+    Check one grid row against the commodity catalog and the list of sites.
+
+    Returns:
+        tuple: ((canonical commodity, quantity, site), None) for a valid row, or
+        (None, error message) otherwise.
+    """
+    resolved = get_commodity_resolver().resolve(commodity)
+    if resolved is None:
+        return None, f"Unknown commodity '{commodity}'" if commodity else "Missing commodity"
+    amount = _parse_quantity(quantity)
+    if not amount:
+        return None, "Quantity must be a positive whole number"
+    if site not in known_sites:
+        return None, f"Unknown construction site '{site}'" if site else "Missing construction site"
+    return (resolved, amount, site), None
+
+class BatchDeliveryWindow:
+    """
+    Editable grid of deliveries with clipboard paste.
+
+    Double-click a cell to edit it, or paste tab- or comma-separated rows with Ctrl+V.
+    Rows without a construction site go to the site selected when the window was opened.
+    """
+
+    def __init__(self, parent, construction_site):
+        self.default_site = construction_site
+        self.window = tk.Toplevel(parent)
+        self.window.title("Batch Delivery Entry")
+        self.window.geometry("700x420")
+        self._editor = None
+
+        tk.Label(self.window, text="Double-click a cell to edit it, or paste rows copied from a "
+                                   "spreadsheet or cargo list (Ctrl+V).").pack(pady=5)
+
+        grid_frame = tk.Frame(self.window)
+        grid_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.grid = ttk.Treeview(grid_frame, columns=COLUMNS, show="headings", selectmode="extended")
+        for column, width in zip(COLUMNS, (180, 80, 180, 220)):
+            self.grid.heading(column, text=column)
+            self.grid.column(column, width=width, minwidth=60)
+        self.grid.tag_configure('invalid', foreground='#c0392b')
+        scrollbar = ttk.Scrollbar(grid_frame, orient="vertical", command=self.grid.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.grid.configure(yscrollcommand=scrollbar.set)
+        self.grid.pack(fill=tk.BOTH, expand=True)
+
+        button_frame = tk.Frame(self.window)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Row", command=self.add_row, width=12).grid(row=0, column=0, padx=5)
+        tk.Button(button_frame, text="Remove Selected", command=self.remove_selected, width=15).grid(row=0, column=1, padx=5)
+        tk.Button(button_frame, text="Paste", command=self.paste, width=12).grid(row=0, column=2, padx=5)
+        tk.Button(button_frame, text="Record Deliveries", command=self.submit, width=17).grid(row=0, column=3, padx=5)
+
+        self.grid.bind("<Double-1>", self._start_edit)
+        self.grid.bind("<Delete>", lambda event: self.remove_selected())
+        for sequence in ("<Control-v>", "<Control-V>", "<<Paste>>"):
+            self.grid.bind(sequence, lambda event: self.paste() or "break")
+
+        for _ in range(INITIAL_ROWS):
+            self.add_row()
+        self.grid.focus_set()
+
+    def add_row(self, commodity="", quantity="", site=""):
+        """Append a row to the grid and validate it if it has any content."""
+        item_id = self.grid.insert("", tk.END, values=(commodity, quantity, site, ""))
+        if commodity or quantity:
+            self._validate(item_id, set(fetch_construction_sites()))
+        return item_id
+
+    def remove_selected(self):
+        for item_id in self.grid.selection():
+            self.grid.delete(item_id)
+
+    def paste(self):
+        """Fill empty rows with rows parsed from the clipboard, adding rows as needed."""
+        try:
+            text = self.window.clipboard_get()
+        except tk.TclError:
+            logger.debug("Clipboard is empty or does not contain text")
+            return
+        rows = parse_delivery_text(text)
+        empty_rows = [item_id for item_id in self.grid.get_children() if not any(self._row_text(item_id)[:2])]
+        known_sites = set(fetch_construction_sites())
+        for commodity, quantity, site in rows:
+            if empty_rows:
+                item_id = empty_rows.pop(0)
+                self.grid.item(item_id, values=(commodity, quantity, site, ""))
+            else:
+                item_id = self.grid.insert("", tk.END, values=(commodity, quantity, site, ""))
+            self._validate(item_id, known_sites)
+        logger.info(f"Pasted {len(rows)} delivery rows from the clipboard")
+
+    def _row_text(self, item_id):
+        # Treeview hands back numeric-looking values as numbers, so normalise to strings
+        return [str(value) for value in self.grid.item(item_id, "values")]
+
+    def _validate(self, item_id, known_sites):
+        commodity, quantity, site = self._row_text(item_id)[:3]
+        if not commodity and not quantity:
+            self.grid.item(item_id, values=(commodity, quantity, site, ""), tags=())
+            return None
+        row, error = validate_delivery_row(commodity, quantity, site or self.default_site, known_sites)
+        if error:
+            self.grid.item(item_id, values=(commodity, quantity, site, error), tags=('invalid',))
+            return None
+        status = "OK" if row[0] == commodity else f"OK: {row[0]}"
+        self.grid.item(item_id, values=(commodity, quantity, site, status), tags=())
+        return row
+
+    def _start_edit(self, event):
+        item_id = self.grid.identify_row(event.y)
+        column = self.grid.identify_column(event.x)
+        index = int(column.lstrip("#") or 0) - 1
+        if not item_id or not 0 <= index < len(EDITABLE_COLUMNS):
+            return
+        x, y, width, height = self.grid.bbox(item_id, column)
+        self._finish_edit()
+        editor = tk.Entry(self.grid)
+        self._editor = (editor, item_id, index)
+        editor.insert(0, self.grid.item(item_id, "values")[index])
+        editor.select_range(0, tk.END)
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        editor.bind("<Return>", lambda e: self._finish_edit())
+        editor.bind("<Tab>", lambda e: self._finish_edit() or "break")
+        editor.bind("<FocusOut>", lambda e: self._finish_edit())
+        editor.bind("<Escape>", lambda e: self._finish_edit(commit=False))
+
+    def _finish_edit(self, commit=True):
+        """Close the cell editor, storing its text unless the edit was cancelled."""
+        if self._editor is None:
+            return
+        (editor, item_id, index), self._editor = self._editor, None
+        if commit and self.grid.exists(item_id):
+            values = self._row_text(item_id)
+            values[index] = editor.get().strip()
+            self.grid.item(item_id, values=values)
+            self._validate(item_id, set(fetch_construction_sites()))
+        editor.destroy()
+
+    def submit(self):
+        """Validate every row and record the deliveries, one transaction per site."""
+        self._finish_edit()
+        known_sites = set(fetch_construction_sites())
+        by_site = {}
+        invalid = 0
+        for item_id in self.grid.get_children():
+            values = self._row_text(item_id)
+            if not values[0] and not values[1]:
+                continue
+            row = self._validate(item_id, known_sites)
+            if row is None:
+                invalid += 1
+                continue
+            commodity, quantity, site = row
+            by_site.setdefault(site, []).append((commodity, quantity))
+
+        if invalid:
+            messagebox.showerror("Error", f"{invalid} rows are invalid. Fix or remove the highlighted rows "
+                                          "and try again.", parent=self.window)
+            return
+        if not by_site:
+            messagebox.showerror("Error", "There are no deliveries to record!", parent=self.window)
+            return
+
+        recorded = {}
+        failed = []
+        for site, deliveries in by_site.items():
+            count = add_deliveries(site, deliveries, source="batch")
+            if count is None:
+                failed.append(site)
+            else:
+                recorded[site] = deliveries
+
+        summary = "\n".join(f"{site}: {len(deliveries)} deliveries, {sum(q for _, q in deliveries):,} units"
+                            for site, deliveries in recorded.items())
+        if failed:
+            logger.error(f"Batch delivery failed for sites: {', '.join(failed)}")
+            messagebox.showerror("Error", f"Could not record deliveries for: {', '.join(failed)}\n\n"
+                                          f"Recorded:\n{summary or 'nothing'}", parent=self.window)
+            # Keep only the rows that still need recording
+            for item_id in self.grid.get_children():
+                site = self._row_text(item_id)[2] or self.default_site
+                if site not in failed:
+                    self.grid.delete(item_id)
+            return
+        logger.info(f"Recorded batch deliveries for {len(recorded)} sites")
+        messagebox.showinfo("Success", f"Recorded deliveries:\n{summary}", parent=self.window)
+        self.window.destroy()
+
+def open_batch_delivery(parent, construction_site):
+    """Open the batch delivery entry window for the selected construction site."""
+    logger.info(f"Opening batch delivery entry for {construction_site}")
+    return BatchDeliveryWindow(parent, construction_site)
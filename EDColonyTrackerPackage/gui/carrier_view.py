@@ -0,0 +1,238 @@
+"""
+UI components for fleet carrier stock, purchases and transfers to construction sites.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from carriers import (add_carrier, remove_carrier, fetch_carriers, fetch_carrier_stock,
+                      record_purchase, transfer_to_site, fetch_deliverable_cargo)
+from database import fetch_items, fetch_construction_sites
+from events import subscribe, CarrierChanged, SITE_EVENTS
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('CarrierView')
+
+def _parse_amount(parent, text):
+    """Return a positive integer amount, or None after telling the user it is invalid."""
+    try:
+        amount = int(text)
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+        return amount
+    except ValueError:
+        logger.warning(f"Invalid amount entered: {text}")
+        messagebox.showerror("Invalid Input", "Please enter a positive number for the amount", parent=parent)
+        return None
+
+def open_carrier_manager(parent, flush=None):
+    """
+    Open the fleet carrier window.
+
+    flush, if given, is called before the deliverable cargo is read, so buffered
+    deliveries count against what each site still needs.
+    """
+    logger.info("Opening fleet carrier window")
+    carrier_window = tk.Toplevel(parent)
+    carrier_window.title("Fleet Carriers")
+    carrier_window.geometry("700x500")
+    carrier_window.minsize(650, 450)
+
+    left_frame = tk.Frame(carrier_window, padx=10, pady=10)
+    left_frame.pack(side=tk.LEFT, fill=tk.Y)
+    right_frame = tk.Frame(carrier_window, padx=10, pady=10)
+    right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+    # --- LEFT SIDE: CARRIERS ---
+    tk.Label(left_frame, text="Fleet Carriers:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
+    carrier_listbox = tk.Listbox(left_frame, height=15, exportselection=False)
+    carrier_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+
+    carrier_name_var = tk.StringVar()
+    tk.Entry(left_frame, textvariable=carrier_name_var).pack(fill=tk.X, pady=2)
+
+    def selected_carrier():
+        selection = carrier_listbox.curselection()
+        return carrier_listbox.get(selection[0]) if selection else None
+
+    def refresh_carriers():
+        current = selected_carrier()
+        carriers = fetch_carriers()
+        carrier_listbox.delete(0, tk.END)
+        if carriers:
+            carrier_listbox.insert(tk.END, *carriers)
+        if current in carriers:
+            carrier_listbox.selection_set(carriers.index(current))
+        refresh_stock()
+
+    def on_add_carrier():
+        name = carrier_name_var.get().strip()
+        if not name:
+            messagebox.showwarning("Input Required", "Please enter a carrier name", parent=carrier_window)
+            return
+        add_carrier(name)
+        carrier_name_var.set("")
+
+    def on_remove_carrier():
+        carrier = selected_carrier()
+        if not carrier:
+            messagebox.showwarning("Selection Required", "Please select a carrier to remove", parent=carrier_window)
+            return
+        if messagebox.askyesno("Confirm Deletion", f"Are you sure you want to delete {carrier} and its stock?",
+                               parent=carrier_window):
+            remove_carrier(carrier)
+
+    tk.Button(left_frame, text="Add Carrier", command=on_add_carrier).pack(fill=tk.X, pady=2)
+    tk.Button(left_frame, text="Remove Carrier", command=on_remove_carrier).pack(fill=tk.X, pady=2)
+
+    # --- RIGHT SIDE: STOCK, PURCHASES AND TRANSFERS ---
+    tk.Label(right_frame, text="Carrier Stock:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
+    stock_frame = tk.Frame(right_frame)
+    stock_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+    stock_tree = ttk.Treeview(stock_frame, columns=("Commodity", "Quantity"), show="headings", height=8)
+    stock_tree.heading("Commodity", text="Commodity")
+    stock_tree.heading("Quantity", text="Quantity")
+    stock_tree.column("Commodity", width=200)
+    stock_tree.column("Quantity", width=100)
+    stock_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    stock_scrollbar = ttk.Scrollbar(stock_frame, orient="vertical", command=stock_tree.yview)
+    stock_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    stock_tree.configure(yscrollcommand=stock_scrollbar.set)
+
+    def refresh_stock():
+        stock_tree.delete(*stock_tree.get_children())
+        carrier = selected_carrier()
+        if not carrier:
+            return
+        stock = fetch_carrier_stock(carrier)
+        for commodity, quantity in stock:
+            stock_tree.insert("", tk.END, values=(commodity, quantity))
+        transfer_commodity_dropdown['values'] = [commodity for commodity, _ in stock]
+
+    carrier_listbox.bind('<<ListboxSelect>>', lambda event: refresh_stock())
+
+    # Purchase into the selected carrier
+    purchase_frame = tk.LabelFrame(right_frame, text="Record Purchase", padx=5, pady=5)
+    purchase_frame.pack(fill=tk.X, pady=5)
+    tk.Label(purchase_frame, text="Commodity:").grid(row=0, column=0, sticky=tk.W)
+    purchase_commodity_var = tk.StringVar()
+    ttk.Combobox(purchase_frame, textvariable=purchase_commodity_var, values=fetch_items()).grid(
+        row=0, column=1, padx=5, sticky=tk.EW)
+    tk.Label(purchase_frame, text="Quantity:").grid(row=0, column=2, sticky=tk.W)
+    purchase_amount_var = tk.StringVar()
+    tk.Entry(purchase_frame, textvariable=purchase_amount_var, width=10).grid(row=0, column=3, padx=5)
+    purchase_frame.columnconfigure(1, weight=1)
+
+    def on_purchase():
+        carrier = selected_carrier()
+        commodity = purchase_commodity_var.get()
+        if not carrier or not commodity:
+            messagebox.showwarning("Input Required", "Please select a carrier and a commodity", parent=carrier_window)
+            return
+        amount = _parse_amount(carrier_window, purchase_amount_var.get())
+        if amount is None:
+            return
+        if record_purchase(carrier, commodity, amount):
+            purchase_amount_var.set("")
+        else:
+            messagebox.showerror("Error", "Could not record the purchase. See the log for details.", parent=carrier_window)
+
+    tk.Button(purchase_frame, text="Record Purchase", command=on_purchase).grid(row=0, column=4, padx=5)
+
+    # Transfer from the selected carrier to a site
+    transfer_frame = tk.LabelFrame(right_frame, text="Transfer to Site", padx=5, pady=5)
+    transfer_frame.pack(fill=tk.X, pady=5)
+    tk.Label(transfer_frame, text="Site:").grid(row=0, column=0, sticky=tk.W)
+    transfer_site_var = tk.StringVar()
+    transfer_site_dropdown = ttk.Combobox(transfer_frame, textvariable=transfer_site_var, state="readonly",
+                                          values=fetch_construction_sites())
+    transfer_site_dropdown.grid(row=0, column=1, columnspan=3, padx=5, sticky=tk.EW)
+    tk.Label(transfer_frame, text="Commodity:").grid(row=1, column=0, sticky=tk.W)
+    transfer_commodity_var = tk.StringVar()
+    transfer_commodity_dropdown = ttk.Combobox(transfer_frame, textvariable=transfer_commodity_var, state="readonly")
+    transfer_commodity_dropdown.grid(row=1, column=1, padx=5, sticky=tk.EW)
+    tk.Label(transfer_frame, text="Quantity:").grid(row=1, column=2, sticky=tk.W)
+    transfer_amount_var = tk.StringVar()
+    tk.Entry(transfer_frame, textvariable=transfer_amount_var, width=10).grid(row=1, column=3, padx=5)
+    transfer_frame.columnconfigure(1, weight=1)
+
+    def on_transfer():
+        carrier = selected_carrier()
+        site = transfer_site_var.get()
+        commodity = transfer_commodity_var.get()
+        if not carrier or not site or not commodity:
+            messagebox.showwarning("Input Required", "Please select a carrier, a site and a commodity",
+                                   parent=carrier_window)
+            return
+        amount = _parse_amount(carrier_window, transfer_amount_var.get())
+        if amount is None:
+            return
+        try:
+            transferred = transfer_to_site(carrier, site, commodity, amount)
+        except ValueError as e:
+            logger.warning(f"Transfer rejected: {e}")
+            messagebox.showerror("Error", f"{e}. Choose a site from the list.", parent=carrier_window)
+            return
+        if transferred:
+            transfer_amount_var.set("")
+        else:
+            messagebox.showerror("Error", f"Could not transfer {amount} units of {commodity}. "
+                                          f"Check that {carrier} holds enough.", parent=carrier_window)
+
+    tk.Button(transfer_frame, text="Transfer", command=on_transfer).grid(row=1, column=4, padx=5)
+
+    tk.Button(right_frame, text="What Can I Deliver?", command=lambda: open_deliverable_view(carrier_window, flush),
+              bg="#4CAF50", fg="white", font=("Arial", 10, "bold")).pack(fill=tk.X, pady=5)
+
+    # Keep carriers, stock and the site list current
+    def on_events(events):
+        if any(isinstance(event, SITE_EVENTS) for event in events):
+            transfer_site_dropdown['values'] = fetch_construction_sites()
+        carrier_events = [event for event in events if isinstance(event, CarrierChanged)]
+        if any(event.commodity is None for event in carrier_events):
+            refresh_carriers()
+        elif any(event.carrier == selected_carrier() for event in carrier_events):
+            refresh_stock()
+
+    unsubscribe = subscribe(on_events, CarrierChanged, *SITE_EVENTS)
+
+    def on_destroy(event):
+        if event.widget is carrier_window:
+            unsubscribe()
+
+    carrier_window.bind("<Destroy>", on_destroy)
+    refresh_carriers()
+    return carrier_window
+
+def open_deliverable_view(parent, flush=None):
+    """Show what each site could receive right now from carrier stock."""
+    if flush:
+        flush()
+    rows = fetch_deliverable_cargo()
+    deliverable_window = tk.Toplevel(parent)
+    deliverable_window.title("Deliverable from Carrier Stock")
+    deliverable_window.geometry("700x350")
+
+    columns = ("Construction Site", "Commodity", "Remaining", "Carrier", "In Stock", "Deliverable")
+    tree = ttk.Treeview(deliverable_window, columns=columns, show="headings")
+    for column in columns:
+        tree.heading(column, text=column)
+        tree.column(column, minwidth=60, width=110)
+    tree.tag_configure('evenrow', background='lightgrey')
+    tree.tag_configure('oddrow', background='white')
+    scrollbar = ttk.Scrollbar(deliverable_window, orient="vertical", command=tree.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(fill=tk.BOTH, expand=True)
+
+    for i, row in enumerate(rows):
+        tree.insert("", tk.END, values=row, tags=('evenrow' if i % 2 == 0 else 'oddrow',))
+    if not rows:
+        tree.insert("", tk.END, values=("-", "Nothing in carrier stock is needed", "", "", "", ""))
+    logger.debug(f"Deliverable view populated with {len(rows)} rows")
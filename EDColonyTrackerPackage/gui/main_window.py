@@ -7,14 +7,26 @@ from tkinter import ttk, messagebox, filedialog
 import csv
 import sys
 import os
+import threading
 
 # Add parent directory to path to allow imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import (fetch_items, fetch_construction_sites, fetch_deliveries,
-                     add_delivery, clear_deliveries)
+from database import fetch_items, fetch_construction_sites, fetch_deliveries, clear_deliveries
 from gui.site_manager import open_construction_site_manager
 from gui.delivery_ui import create_delivery_table
+from gui.market_view import open_market_view
+from gui.progress_chart import ProgressChart
+from gui.batch_delivery import open_batch_delivery
+from gui.analytics_view import open_analytics_view
+from gui.carrier_view import open_carrier_manager
+from market_data import ingest_market_dump
+from parallel_import import import_csv_files_parallel
+from maintenance import MaintenanceScheduler
+from delivery_buffer import DeliveryBuffer
+from events import (event_bus, subscribe, SITE_EVENTS, SITE_DATA_EVENTS, SiteRemoved,
+                    SiteRenamed, DeliveriesCleared, RequirementRemoved)
+from progress_history import discard_progress_series
 from utils import get_logger
 
 # Get a logger for this module
@@ -24,17 +36,39 @@ class MainWindow:
     def __init__(self, root):
         self.root = root
         self.root.title("Elite Dangerous Cargo Tracker")
-        self.root.geometry("800x400")
-        self.root.minsize(800, 400)
+        self.root.geometry("800x600")
+        self.root.minsize(800, 550)
         
         # Create variables
         self.item_var = tk.StringVar()
         self.construction_site_var = tk.StringVar()
         self.quantity_var = tk.StringVar()
         self.show_completed = False
+        self._delivery_rows = {}
         
         logger.info("Initializing main application window")
         self._create_ui()
+
+        # Apply data changes published by the database module, batched per idle cycle
+        event_bus.attach(self.root)
+        subscribe(self._on_data_events, *(SITE_EVENTS + SITE_DATA_EVENTS))
+
+        # Run database maintenance in the background while the user is idle
+        self.maintenance = MaintenanceScheduler(self.root, on_corrupt=self.show_alert)
+        self.maintenance.start()
+
+        # Accept deliveries immediately and commit them in groups, replaying any left
+        # over from a previous run
+        self.delivery_buffer = DeliveryBuffer()
+        self.delivery_buffer.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        """Commit buffered deliveries and stop background work before closing."""
+        logger.info("Closing main window")
+        self.maintenance.stop()
+        self.delivery_buffer.stop()
+        self.root.destroy()
         
     def _create_ui(self):
         # Create the top frame with input controls
@@ -45,6 +79,9 @@ class MainWindow:
         
         # Create the deliveries table
         self.deliveries_list = create_delivery_table(self.root)
+
+        # Create the delivery progress chart below the table
+        self.progress_chart = ProgressChart(self.root)
         logger.debug("UI components created successfully")
         
     def _create_input_frame(self):
@@ -114,8 +151,8 @@ class MainWindow:
         export_button.grid(row=0, column=1, padx=5, sticky=tk.EW)
 
         # Button to import deliveries from CSV
-        import_button = tk.Button(bottom_center_frame, text="Import from CSV", command=self.import_from_csv, width=15)
-        import_button.grid(row=0, column=2, padx=5, sticky=tk.EW)
+        self.import_button = tk.Button(bottom_center_frame, text="Import from CSV", command=self.import_from_csv, width=15)
+        self.import_button.grid(row=0, column=2, padx=5, sticky=tk.EW)
 
         # Button to open the construction site manager
         edit_sites_button = tk.Button(bottom_center_frame, text="Edit Construction Sites", 
@@ -132,6 +169,31 @@ class MainWindow:
                                    command=self.clear_database, width=15)
         clear_db_button.grid(row=0, column=4, padx=5, sticky=tk.EW)
 
+        # Button to manage fleet carrier stock and transfers
+        carriers_button = tk.Button(bottom_center_frame, text="Fleet Carriers",
+                                    command=self.open_carrier_manager, width=20)
+        carriers_button.grid(row=1, column=0, padx=10, pady=5, sticky=tk.EW)
+
+        # Button to ingest a local market data dump
+        self.import_market_button = tk.Button(bottom_center_frame, text="Import Market Data",
+                                              command=self.import_market_data, width=17)
+        self.import_market_button.grid(row=1, column=1, padx=5, pady=5, sticky=tk.EW)
+
+        # Button to show stations selling the remaining commodities
+        where_to_buy_button = tk.Button(bottom_center_frame, text="Where to Buy",
+                                        command=self.open_market_view, width=15)
+        where_to_buy_button.grid(row=1, column=2, padx=5, pady=5, sticky=tk.EW)
+
+        # Button to record many deliveries at once
+        batch_delivery_button = tk.Button(bottom_center_frame, text="Batch Delivery",
+                                          command=self.open_batch_delivery, width=15)
+        batch_delivery_button.grid(row=1, column=3, padx=5, pady=5, sticky=tk.EW)
+
+        # Button to open the analytics report across all sites
+        analytics_button = tk.Button(bottom_center_frame, text="Analytics",
+                                     command=self.open_analytics_view, width=15)
+        analytics_button.grid(row=1, column=4, padx=5, pady=5, sticky=tk.EW)
+
         # Configure column weights for dynamic resizing
         bottom_center_frame.columnconfigure(0, weight=1)
         bottom_center_frame.columnconfigure(1, weight=1)
@@ -139,6 +201,19 @@ class MainWindow:
         bottom_center_frame.columnconfigure(3, weight=1)
         bottom_center_frame.columnconfigure(4, weight=1)
         
+    def show_alert(self, file_name, message):
+        """Show a non-blocking warning about a database file that failed its integrity check."""
+        logger.warning(f"Showing corruption alert for {file_name}")
+        alert = tk.Toplevel(self.root)
+        alert.title("Database Problem Detected")
+        alert.resizable(False, False)
+        tk.Label(alert, text=f"{file_name} failed its integrity check:", font=("Arial", 10, "bold"),
+                 padx=10, pady=5).pack(anchor=tk.W)
+        tk.Label(alert, text=message, wraplength=400, justify=tk.LEFT, padx=10).pack(anchor=tk.W)
+        tk.Label(alert, text="Consider restoring this file from a backup or re-importing its data.",
+                 padx=10, pady=5).pack(anchor=tk.W)
+        tk.Button(alert, text="OK", command=alert.destroy, width=10).pack(pady=5)
+
     def update_deliveries_list(self, show_completed=None):
         """Update the deliveries list in the GUI."""
         if show_completed is None:
@@ -150,18 +225,83 @@ class MainWindow:
 
         logger.debug(f"Updating deliveries list for {construction_site}")
         self.deliveries_list.delete(*self.deliveries_list.get_children())
+        self._delivery_rows = {}
         for delivery in fetch_deliveries(construction_site):
             if not show_completed and delivery[2] <= 0:
                 continue
-            remaining_amount = '✅' if delivery[2] <= 0 else delivery[2]
-            self.deliveries_list.insert("", "end", values=(delivery[0], delivery[1], remaining_amount, delivery[3]))
+            self._delivery_rows[delivery[0]] = self.deliveries_list.insert("", "end", values=self._row_values(delivery))
 
+        self._apply_row_stripes()
+        self.progress_chart.set_site(construction_site)
+
+    def _row_values(self, delivery):
+        remaining_amount = '✅' if delivery[2] <= 0 else delivery[2]
+        return (delivery[0], delivery[1], remaining_amount, delivery[3])
+
+    def _apply_row_stripes(self):
         # Apply alternating row colors
         for i, item in enumerate(self.deliveries_list.get_children()):
             if i % 2 == 0:
                 self.deliveries_list.item(item, tags=('evenrow',))
             else:
                 self.deliveries_list.item(item, tags=('oddrow',))
+
+    def _update_delivery_rows(self, commodities):
+        """Update, insert or remove only the table rows for the given commodities."""
+        construction_site = self.construction_site_var.get()
+        records = {delivery[0]: delivery for delivery in fetch_deliveries(construction_site)}
+        for commodity in commodities:
+            record = records.get(commodity)
+            item_id = self._delivery_rows.get(commodity)
+            if record is None or (not self.show_completed and record[2] <= 0):
+                if item_id:
+                    self.deliveries_list.delete(item_id)
+                    del self._delivery_rows[commodity]
+                continue
+            if item_id:
+                self.deliveries_list.item(item_id, values=self._row_values(record))
+            else:
+                # Keep the commodity ordering used by fetch_deliveries
+                index = sum(1 for existing in self._delivery_rows if existing < commodity)
+                self._delivery_rows[commodity] = self.deliveries_list.insert("", index, values=self._row_values(record))
+        self._apply_row_stripes()
+        logger.debug(f"Updated {len(commodities)} delivery rows for {construction_site}")
+
+    def _on_data_events(self, events):
+        """Apply a batch of data change events to the dropdown and deliveries table."""
+        if any(isinstance(event, SITE_EVENTS) for event in events):
+            self.update_construction_site_dropdown()
+            for event in events:
+                if isinstance(event, (SiteRemoved, SiteRenamed)):
+                    self.progress_chart.forget_site(event.site)
+
+        construction_site = self.construction_site_var.get()
+        site_events = [event for event in events if event.site == construction_site]
+        if not construction_site or not site_events:
+            return
+        if any(isinstance(event, SiteRemoved) for event in site_events):
+            self.construction_site_var.set("")
+            self.deliveries_list.delete(*self.deliveries_list.get_children())
+            self._delivery_rows = {}
+            return
+        for event in site_events:
+            if isinstance(event, SiteRenamed):
+                # The rows are unchanged; only the selected name moves
+                self.construction_site_var.set(event.new_name)
+                self.progress_chart.set_site(event.new_name)
+                return
+
+        commodities = {event.commodity for event in site_events if isinstance(event, SITE_DATA_EVENTS)
+                       and not isinstance(event, DeliveriesCleared)}
+        cleared = any(isinstance(event, DeliveriesCleared) for event in site_events)
+        if None in commodities or cleared:
+            if cleared:
+                discard_progress_series(construction_site)
+            self.update_deliveries_list()
+        elif commodities:
+            self._update_delivery_rows(commodities)
+            # Removing a requirement also drops its logged deliveries from the history
+            self.progress_chart.refresh(reload=any(isinstance(event, RequirementRemoved) for event in site_events))
                 
     def add_delivery(self):
         """Add a delivery to the database."""
@@ -182,10 +322,15 @@ class MainWindow:
             return
 
         logger.info(f"Adding delivery: {quantity} units of {commodity} to {construction_site}")
-        add_delivery(construction_site, commodity, quantity)
+        try:
+            self.delivery_buffer.add(construction_site, commodity, quantity)
+        except ValueError:
+            logger.warning(f"Rejected delivery for unknown construction site: {construction_site}")
+            messagebox.showerror("Error", f"{construction_site} is not a construction site. "
+                                          "Add it with Edit Construction Sites first.")
+            return
 
         messagebox.showinfo("Success", f"Added {quantity} units of {commodity} to {construction_site}!")
-        self.update_deliveries_list()
         
     def export_to_csv(self):
         """Export deliveries to a CSV file."""
@@ -195,6 +340,8 @@ class MainWindow:
             return
 
         logger.info(f"Exporting data to CSV: {file_path}")
+        # Include deliveries that are still buffered
+        self.delivery_buffer.flush()
         construction_sites = fetch_construction_sites()
         try:
             with open(file_path, mode='w', newline='') as file:
@@ -213,14 +360,18 @@ class MainWindow:
             messagebox.showerror("Error", f"Failed to export data: {e}")
         
     def import_from_csv(self):
-        """Import deliveries from a CSV file."""
+        """Import deliveries from one CSV file, or from several in parallel."""
         from database import import_from_csv_to_db
         
-        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-        if not file_path:
+        file_paths = filedialog.askopenfilenames(filetypes=[("CSV files", "*.csv")])
+        if not file_paths:
             logger.debug("Import from CSV cancelled by user")
             return
+        if len(file_paths) > 1:
+            self.import_csv_files(list(file_paths))
+            return
 
+        file_path = file_paths[0]
         try:
             logger.info(f"Importing data from CSV: {file_path}")
             with open(file_path, mode='r') as file:
@@ -229,18 +380,112 @@ class MainWindow:
                 deliveries = [row for row in reader]
 
             import_from_csv_to_db(deliveries)
-            self.update_construction_site_dropdown()
-            self.update_deliveries_list()
             logger.info(f"Successfully imported {len(deliveries)} records from {file_path}")
             messagebox.showinfo("Success", f"Data imported from {file_path}")
         except Exception as e:
             logger.error(f"Error importing from CSV: {e}")
             messagebox.showerror("Error", f"Failed to import data: {e}")
         
+    def import_csv_files(self, file_paths):
+        """Import many CSV files in the background using the parallel importer."""
+        result = {}
+
+        def worker():
+            try:
+                result['counts'] = import_csv_files_parallel(file_paths)
+            except Exception as e:
+                result['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(200, poll)
+                return
+            self.import_button.config(state=tk.NORMAL, text="Import from CSV")
+            if 'error' in result:
+                logger.error(f"Error importing from CSV files: {result['error']}")
+                messagebox.showerror("Error", f"Failed to import data: {result['error']}")
+                return
+            sites, rows, failures = result['counts']
+            if failures:
+                failed = "\n".join(f"{site}: {error}" for site, error in sorted(failures.items())[:10])
+                messagebox.showwarning("Partial Import", f"Imported {rows} requirements for {sites} sites, "
+                                                         f"but {len(failures)} sites failed:\n{failed}")
+                return
+            messagebox.showinfo("Success", f"Imported {rows} requirements for {sites} sites "
+                                           f"from {len(file_paths)} files")
+
+        logger.info(f"Importing data from {len(file_paths)} CSV files in parallel")
+        self.import_button.config(state=tk.DISABLED, text="Importing...")
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.root.after(200, poll)
+
+    def import_market_data(self):
+        """Ingest a local market data dump in the background."""
+        file_path = filedialog.askopenfilename(filetypes=[("Market data", "*.jsonl *.json *.csv *.gz"),
+                                                          ("All files", "*.*")])
+        if not file_path:
+            logger.debug("Market data import cancelled by user")
+            return
+
+        result = {}
+
+        def worker():
+            try:
+                result['count'] = ingest_market_dump(file_path)
+            except Exception as e:
+                result['error'] = e
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(200, poll)
+                return
+            self.import_market_button.config(state=tk.NORMAL, text="Import Market Data")
+            if 'error' in result:
+                logger.error(f"Error importing market data: {result['error']}")
+                messagebox.showerror("Error", f"Failed to import market data: {result['error']}")
+            else:
+                messagebox.showinfo("Success", f"Imported {result['count']} market listings from {file_path}")
+
+        logger.info(f"Importing market data from {file_path}")
+        self.import_market_button.config(state=tk.DISABLED, text="Importing...")
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.root.after(200, poll)
+
+    def open_market_view(self):
+        """Show stations selling the commodities the selected site still needs."""
+        construction_site = self.construction_site_var.get()
+        if not construction_site:
+            logger.warning("Attempted to open market view without selecting a construction site")
+            messagebox.showerror("Error", "Please select a construction site first!")
+            return
+        open_market_view(self.root, construction_site, flush=self.delivery_buffer.flush)
+
+    def open_batch_delivery(self):
+        """Open the batch entry window for recording many deliveries at once."""
+        construction_site = self.construction_site_var.get()
+        if not construction_site:
+            logger.warning("Attempted to open batch delivery without selecting a construction site")
+            messagebox.showerror("Error", "Please select a construction site first!")
+            return
+        open_batch_delivery(self.root, construction_site)
+
+    def open_analytics_view(self):
+        """Open the analytics report for all construction sites."""
+        # Include deliveries that are still buffered
+        self.delivery_buffer.flush()
+        open_analytics_view(self.root)
+
+    def open_carrier_manager(self):
+        """Open the fleet carrier stock and transfer window."""
+        logger.debug("Opening fleet carrier manager")
+        open_carrier_manager(self.root, flush=self.delivery_buffer.flush)
+
     def open_site_manager(self):
         """Open the construction site manager."""
         logger.debug("Opening construction site manager")
-        open_construction_site_manager(self.root, self.update_construction_site_dropdown)
+        open_construction_site_manager(self.root)
         
     def update_construction_site_dropdown(self):
         """Update the construction site dropdown with fresh data."""
@@ -265,8 +510,9 @@ class MainWindow:
                                       f"Are you sure you want to clear all deliveries for {construction_site}?")
         if response:
             logger.info(f"Clearing all deliveries for {construction_site}")
+            # Commit buffered deliveries first so they are cleared too
+            self.delivery_buffer.flush()
             clear_deliveries(construction_site)
-            self.update_deliveries_list()
             messagebox.showinfo("Success", f"All deliveries for {construction_site} have been cleared.")
         else:
             logger.debug("Clear operation cancelled by user")
\ No newline at end of file
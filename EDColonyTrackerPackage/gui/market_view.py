@@ -0,0 +1,87 @@
+"""
+UI components for showing where to buy the commodities a construction site still needs.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_data import find_sellers_for_site, parse_origin
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('MarketView')
+
+def open_market_view(parent, construction_site, limit=5, flush=None):
+    """
+    Open a window listing stations that sell the remaining commodities for a site.
+
+    Sellers are ordered by price until a system or coordinates are entered in the Near
+    field, after which the nearest sellers are listed with their distance. flush, if
+    given, is called before each read so buffered deliveries count against what remains.
+    """
+    logger.info(f"Opening market view for {construction_site}")
+    market_window = tk.Toplevel(parent)
+    market_window.title(f"Where to Buy - {construction_site}")
+    market_window.geometry("800x420")
+
+    origin_frame = tk.Frame(market_window, padx=5, pady=5)
+    origin_frame.pack(fill=tk.X)
+    tk.Label(origin_frame, text="Near (system or x, y, z):").pack(side=tk.LEFT)
+    origin_var = tk.StringVar()
+    origin_entry = tk.Entry(origin_frame, textvariable=origin_var, width=40)
+    origin_entry.pack(side=tk.LEFT, padx=5)
+
+    columns = ("Commodity", "System", "Station", "Price", "Stock", "Distance (ly)", "Updated")
+    sellers_tree = ttk.Treeview(market_window, columns=columns, show="headings")
+    for column in columns:
+        sellers_tree.heading(column, text=column)
+        sellers_tree.column(column, minwidth=60, width=110)
+    sellers_tree.tag_configure('evenrow', background='lightgrey')
+    sellers_tree.tag_configure('oddrow', background='white')
+
+    tree_scrollbar = ttk.Scrollbar(market_window, orient="vertical", command=sellers_tree.yview)
+    tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    sellers_tree.configure(yscrollcommand=tree_scrollbar.set)
+    sellers_tree.pack(fill=tk.BOTH, expand=True)
+
+    def show_sellers(origin=None):
+        sellers_tree.delete(*sellers_tree.get_children())
+        if flush:
+            flush()
+        results = find_sellers_for_site(construction_site, origin=origin, limit=limit)
+        row = 0
+        for commodity, sellers in sorted(results.items()):
+            if not sellers:
+                sellers_tree.insert("", tk.END, values=(commodity, "-", "No known sellers", "", "", "", ""),
+                                    tags=('evenrow' if row % 2 == 0 else 'oddrow',))
+                row += 1
+                continue
+            for system, station, price, stock, distance_ly, updated_at in sellers:
+                distance = f"{distance_ly:,.1f}" if distance_ly is not None else ""
+                sellers_tree.insert("", tk.END, values=(commodity, system, station, price, stock, distance, updated_at),
+                                    tags=('evenrow' if row % 2 == 0 else 'oddrow',))
+                row += 1
+        logger.debug(f"Market view populated with {row} rows for {construction_site}")
+
+    def on_find_nearest(event=None):
+        text = origin_var.get().strip()
+        if not text:
+            show_sellers()
+            return
+        origin = parse_origin(text)
+        if origin is None:
+            logger.warning(f"Unknown origin entered in market view: {text}")
+            messagebox.showerror("Unknown Location", f"'{text}' is not a system in the market data "
+                                                     "or a set of x, y, z coordinates.", parent=market_window)
+            return
+        show_sellers(origin)
+
+    tk.Button(origin_frame, text="Find Nearest", command=on_find_nearest).pack(side=tk.LEFT)
+    origin_entry.bind("<Return>", on_find_nearest)
+    show_sellers()
+    return market_window
@@ -0,0 +1,121 @@
+"""
+Canvas chart of delivered versus required amounts over time for a construction site.
+"""
+
+import tkinter as tk
+import time
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from progress_history import get_progress_series, discard_progress_series
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('ProgressChart')
+
+# Space reserved around the plot area for labels, in pixels
+PADDING_LEFT = 60
+PADDING_RIGHT = 15
+PADDING_Y = 20
+
+class ProgressChart:
+    """
+    Line chart of a site's cumulative deliveries against its total requirement.
+
+    Scrolling the mouse wheel over the chart zooms in and out on the most recent part of
+    the history. Only downsampled points are drawn, so long histories stay fast.
+    """
+
+    def __init__(self, parent, height=160):
+        tk.Label(parent, text="Delivery Progress:").pack()
+        self.canvas = tk.Canvas(parent, height=height, bg='white', highlightthickness=0)
+        self.canvas.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self.construction_site = None
+        self.zoom = 1.0
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", lambda event: self._zoom(event.delta > 0))
+        self.canvas.bind("<Button-4>", lambda event: self._zoom(True))
+        self.canvas.bind("<Button-5>", lambda event: self._zoom(False))
+
+    def set_site(self, construction_site):
+        """Show a site's history, appending any deliveries logged since it was last shown."""
+        if construction_site != self.construction_site:
+            self.construction_site = construction_site
+            self.zoom = 1.0
+        self.refresh()
+
+    def refresh(self, reload=False):
+        """Pick up new deliveries for the current site; reload rebuilds the whole series."""
+        if not self.construction_site:
+            return
+        series = get_progress_series(self.construction_site)
+        if reload:
+            series.reload()
+        else:
+            series.refresh()
+        self.redraw()
+
+    def forget_site(self, construction_site):
+        """Drop cached history for a site that was removed or renamed."""
+        discard_progress_series(construction_site)
+        if construction_site == self.construction_site:
+            self.construction_site = None
+            self.redraw()
+
+    def _zoom(self, zoom_in):
+        self.zoom = max(0.001, min(1.0, self.zoom * (0.5 if zoom_in else 2.0)))
+        self.redraw()
+
+    def redraw(self):
+        """Draw the chart for the current site and zoom level."""
+        canvas = self.canvas
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        if not self.construction_site or width <= PADDING_LEFT + PADDING_RIGHT:
+            return
+
+        series = get_progress_series(self.construction_site)
+        if not series.times:
+            canvas.create_text(width // 2, height // 2, text="No delivery history yet", fill="grey")
+            return
+
+        t_end = series.times[-1]
+        span = max(t_end - series.times[0], 60.0) * self.zoom
+        t_start = t_end - span
+        plot_width = width - PADDING_LEFT - PADDING_RIGHT
+        points = series.downsample(t_start, t_end, plot_width)
+
+        y_max = max([series.required] + [value for _, value in points]) or 1
+        def x_of(t):
+            return PADDING_LEFT + (t - t_start) / span * plot_width
+        def y_of(value):
+            return height - PADDING_Y - value / y_max * (height - 2 * PADDING_Y)
+
+        # Axes and labels
+        canvas.create_line(PADDING_LEFT, PADDING_Y, PADDING_LEFT, height - PADDING_Y, fill="grey")
+        canvas.create_line(PADDING_LEFT, height - PADDING_Y, width - PADDING_RIGHT, height - PADDING_Y, fill="grey")
+        canvas.create_text(PADDING_LEFT - 5, y_of(y_max), text=f"{y_max:,}", anchor=tk.E)
+        canvas.create_text(PADDING_LEFT - 5, y_of(0), text="0", anchor=tk.E)
+        time_format = "%Y-%m-%d" if span > 2 * 86400 else "%m-%d %H:%M"
+        canvas.create_text(PADDING_LEFT, height - PADDING_Y + 3, anchor=tk.NW,
+                           text=time.strftime(time_format, time.localtime(t_start)))
+        canvas.create_text(width - PADDING_RIGHT, height - PADDING_Y + 3, anchor=tk.NE,
+                           text=time.strftime(time_format, time.localtime(t_end)))
+
+        # Required total and delivered amount, clipped to the plot area
+        if series.required:
+            canvas.create_line(PADDING_LEFT, y_of(series.required), width - PADDING_RIGHT, y_of(series.required),
+                               fill="#c0392b", dash=(4, 2))
+        coords = []
+        for t, value in points:
+            coords.extend((max(PADDING_LEFT, x_of(t)), y_of(value)))
+        if len(coords) >= 4:
+            canvas.create_line(*coords, fill="#2e86c1", width=2)
+        elif coords:
+            canvas.create_oval(coords[0] - 2, coords[1] - 2, coords[0] + 2, coords[1] + 2, fill="#2e86c1", outline="")
+        logger.debug(f"Drew {len(points)} of {len(series.times)} history points for {self.construction_site}")
@@ -6,277 +6,441 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
 import os
+from bisect import bisect_left, insort
 
 # Add parent directory to path to allow imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import (fetch_construction_sites, add_construction_site, 
-                     remove_construction_site, fetch_items, fetch_deliveries,
-                     update_commodity_requirements)
+from database import (fetch_construction_sites, add_construction_site,
+                     remove_construction_site, rename_construction_site, fetch_items,
+                     fetch_deliveries, update_commodity_requirements)
+from events import (subscribe, SiteAdded, SiteRemoved, SiteRenamed, RequirementChanged,
+                    RequirementRemoved, DeliveriesCleared)
 from utils import get_logger
 
 # Get a logger for this module
 logger = get_logger('SiteManager')
 
-def open_construction_site_manager(parent, update_callback=None):
-    """Open the construction site management window."""
-    logger.info("Opening construction site manager window")
-    manager_window = tk.Toplevel(parent)
-    manager_window.title("Manage Construction Sites")
-    manager_window.geometry("650x500")
-    manager_window.minsize(650, 500)
-
-    # Split the window into left and right frames
-    left_frame = tk.Frame(manager_window, padx=10, pady=10)
-    left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    
-    right_frame = tk.Frame(manager_window, padx=10, pady=10)
-    right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+# Number of sites whose requirements are kept after they were last viewed
+REQUIREMENT_CACHE_SIZE = 64
+
+class SiteManagerWindow:
+    """
+    Window for adding, renaming and removing sites and editing their requirements.
+
+    The window is built once and hidden when closed; reopening it only shows it again.
+    The site list follows site events with targeted inserts and deletes, can be filtered
+    by name, and each site's requirements are loaded only when the site is selected.
+    """
+
+    def __init__(self, parent, update_callback=None):
+        self.update_callback = update_callback
+        self.selected_site = None
+        self._sites = sorted(fetch_construction_sites())
+        self._visible = []
+        self._requirements = {}
+        self._items = fetch_items()
+        self._dirty = False
+        logger.debug(f"Loaded {len(self._sites)} construction sites and {len(self._items)} items")
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Manage Construction Sites")
+        self.window.geometry("650x500")
+        self.window.minsize(650, 500)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        # Split the window into left and right frames
+        left_frame = tk.Frame(self.window, padx=10, pady=10)
+        left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        right_frame = tk.Frame(self.window, padx=10, pady=10)
+        right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+        self._create_site_panel(left_frame)
+        self._create_requirements_panel(right_frame)
+
+        # Clearing a site's deliveries also deletes its requirement rows
+        self._unsubscribe = subscribe(self._on_events, SiteAdded, SiteRemoved, SiteRenamed,
+                                      RequirementChanged, RequirementRemoved, DeliveriesCleared)
+        self.window.bind("<Destroy>", self._on_destroy)
+        self._apply_filter()
+        logger.debug("Construction site manager UI setup complete")
 
     # --- LEFT SIDE: SITE MANAGEMENT ---
-    tk.Label(left_frame, text="Construction Sites:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
-
-    construction_site_listbox = tk.Listbox(left_frame, height=15)
-    construction_site_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
-    
-    # Add scrollbar to listbox
-    scrollbar = tk.Scrollbar(construction_site_listbox)
-    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-    construction_site_listbox.config(yscrollcommand=scrollbar.set)
-    scrollbar.config(command=construction_site_listbox.yview)
-
-    # Populate with existing sites
-    sites = fetch_construction_sites()
-    logger.debug(f"Loaded {len(sites)} construction sites")
-    for site in sites:
-        construction_site_listbox.insert(tk.END, site)
-
-    # Site entry and buttons frame
-    site_entry_frame = tk.Frame(left_frame)
-    site_entry_frame.pack(fill=tk.X, pady=5)
-    
-    new_site_var = tk.StringVar()
-    tk.Label(site_entry_frame, text="Site Name:").pack(side=tk.LEFT)
-    tk.Entry(site_entry_frame, textvariable=new_site_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-    
-    def add_site():
-        new_site = new_site_var.get()
+
+    def _create_site_panel(self, left_frame):
+        tk.Label(left_frame, text="Construction Sites:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
+
+        filter_frame = tk.Frame(left_frame)
+        filter_frame.pack(fill=tk.X)
+        tk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self._apply_filter())
+        tk.Entry(filter_frame, textvariable=self.filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        self.site_listbox = tk.Listbox(left_frame, height=15, exportselection=False)
+        self.site_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        # Add scrollbar to listbox
+        scrollbar = tk.Scrollbar(self.site_listbox)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.site_listbox.config(yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.site_listbox.yview)
+        self.site_listbox.bind('<<ListboxSelect>>', self._on_site_select)
+
+        # Site entry and buttons frame
+        site_entry_frame = tk.Frame(left_frame)
+        site_entry_frame.pack(fill=tk.X, pady=5)
+
+        self.new_site_var = tk.StringVar()
+        tk.Label(site_entry_frame, text="Site Name:").pack(side=tk.LEFT)
+        tk.Entry(site_entry_frame, textvariable=self.new_site_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        buttons_frame = tk.Frame(left_frame)
+        buttons_frame.pack(fill=tk.X, pady=5)
+
+        tk.Button(buttons_frame, text="Add Site", command=self.add_site).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        tk.Button(buttons_frame, text="Rename Site", command=self.rename_site).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        tk.Button(buttons_frame, text="Remove Site", command=self.remove_site).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+
+    def _matches(self, site):
+        text = self.filter_var.get().strip().lower()
+        return not text or text in site.lower()
+
+    def _apply_filter(self):
+        """Show only the sites matching the filter text, in one Listbox call."""
+        self._visible = [site for site in self._sites if self._matches(site)]
+        self.site_listbox.delete(0, tk.END)
+        if self._visible:
+            self.site_listbox.insert(tk.END, *self._visible)
+        self._select_in_list(self.selected_site)
+
+    def _select_in_list(self, site):
+        self.site_listbox.selection_clear(0, tk.END)
+        index = bisect_left(self._visible, site) if site else len(self._visible)
+        if index < len(self._visible) and self._visible[index] == site:
+            self.site_listbox.selection_set(index)
+            self.site_listbox.see(index)
+
+    def _insert_site(self, site):
+        if site in self._sites:
+            return
+        insort(self._sites, site)
+        if self._matches(site):
+            index = bisect_left(self._visible, site)
+            self._visible.insert(index, site)
+            self.site_listbox.insert(index, site)
+
+    def _delete_site(self, site):
+        index = bisect_left(self._sites, site)
+        if index < len(self._sites) and self._sites[index] == site:
+            del self._sites[index]
+        index = bisect_left(self._visible, site)
+        if index < len(self._visible) and self._visible[index] == site:
+            del self._visible[index]
+            self.site_listbox.delete(index)
+
+    def add_site(self):
+        new_site = self.new_site_var.get()
         if not new_site:
             logger.warning("Attempted to add site with empty name")
-            messagebox.showwarning("Input Required", "Please enter a site name")
+            messagebox.showwarning("Input Required", "Please enter a site name", parent=self.window)
             return
-            
+
         logger.info(f"Adding new construction site: {new_site}")
         add_construction_site(new_site)
-        construction_site_listbox.insert(tk.END, new_site)
-        new_site_var.set("")
-        if update_callback:
-            update_callback()
-    
-    def remove_site():
-        selected_site = construction_site_listbox.get(tk.ACTIVE)
+        self.new_site_var.set("")
+        if self.update_callback:
+            self.update_callback()
+
+    def remove_site(self):
+        selected_site = self.selected_site
         if not selected_site:
             logger.warning("Attempted to remove site without selecting one")
-            messagebox.showwarning("Selection Required", "Please select a site to remove")
+            messagebox.showwarning("Selection Required", "Please select a site to remove", parent=self.window)
             return
-            
-        confirm = messagebox.askyesno("Confirm Deletion", 
-                                      f"Are you sure you want to delete {selected_site}?\nThis will delete all delivery records for this site.")
+
+        confirm = messagebox.askyesno("Confirm Deletion",
+                                      f"Are you sure you want to delete {selected_site}?\nThis will delete all delivery records for this site.",
+                                      parent=self.window)
         if confirm:
             logger.info(f"Removing construction site: {selected_site}")
-            remove_construction_site(selected_site)
-            construction_site_listbox.delete(tk.ACTIVE)
-            if update_callback:
-                update_callback()
+            if not remove_construction_site(selected_site):
+                messagebox.showerror("Error", f"Could not remove {selected_site}. See the log for details.",
+                                     parent=self.window)
+                return
+            if self.update_callback:
+                self.update_callback()
         else:
             logger.debug(f"Canceled removal of site: {selected_site}")
 
-    buttons_frame = tk.Frame(left_frame)
-    buttons_frame.pack(fill=tk.X, pady=5)
-    
-    tk.Button(buttons_frame, text="Add Site", command=add_site).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
-    tk.Button(buttons_frame, text="Remove Site", command=remove_site).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+    def rename_site(self):
+        selected_site = self.selected_site
+        new_name = self.new_site_var.get()
+        if not selected_site or not new_name:
+            logger.warning("Attempted to rename site without a selection or new name")
+            messagebox.showwarning("Input Required", "Please select a site and enter its new name", parent=self.window)
+            return
+
+        logger.info(f"Renaming construction site {selected_site} to {new_name}")
+        if not rename_construction_site(selected_site, new_name):
+            messagebox.showerror("Error", f"Could not rename {selected_site} to {new_name}. "
+                                          "The name may already be in use.", parent=self.window)
+            return
+        self.new_site_var.set("")
+        if self.update_callback:
+            self.update_callback()
 
     # --- RIGHT SIDE: COMMODITY REQUIREMENTS ---
-    tk.Label(right_frame, text="Commodity Requirements:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
-    
-    # Requirements listbox frame
-    requirements_frame = tk.Frame(right_frame)
-    requirements_frame.pack(fill=tk.BOTH, expand=True, pady=5)
-    
-    # Commodity requirements listbox with headers
-    columns = ("Commodity", "Amount Required")
-    requirements_tree = ttk.Treeview(requirements_frame, columns=columns, show="headings", height=10)
-    
-    requirements_tree.heading("Commodity", text="Commodity")
-    requirements_tree.heading("Amount Required", text="Amount Required")
-    
-    requirements_tree.column("Commodity", width=150)
-    requirements_tree.column("Amount Required", width=100)
-    
-    requirements_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    
-    # Add scrollbar to treeview
-    tree_scrollbar = ttk.Scrollbar(requirements_frame, orient="vertical", command=requirements_tree.yview)
-    tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-    requirements_tree.configure(yscrollcommand=tree_scrollbar.set)
-    
-    # Add commodity frame
-    add_commodity_frame = tk.LabelFrame(right_frame, text="Add Commodity", padx=5, pady=5)
-    add_commodity_frame.pack(fill=tk.X, pady=10)
-    
-    # Commodity dropdown
-    tk.Label(add_commodity_frame, text="Commodity:").grid(row=0, column=0, sticky=tk.W)
-    
-    commodity_var = tk.StringVar()
-    commodity_dropdown = ttk.Combobox(add_commodity_frame, textvariable=commodity_var)
-    items = fetch_items()
-    logger.debug(f"Loaded {len(items)} items for commodity dropdown")
-    commodity_dropdown['values'] = items
-    commodity_dropdown.grid(row=0, column=1, padx=5, sticky=tk.EW)
-    
-    # Enable autocomplete for commodity dropdown
-    def on_commodity_entry(event):
+
+    def _create_requirements_panel(self, right_frame):
+        tk.Label(right_frame, text="Commodity Requirements:", font=("Arial", 11, "bold")).pack(anchor=tk.W)
+
+        # Requirements listbox frame
+        requirements_frame = tk.Frame(right_frame)
+        requirements_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        # Commodity requirements listbox with headers
+        columns = ("Commodity", "Amount Required")
+        self.requirements_tree = ttk.Treeview(requirements_frame, columns=columns, show="headings", height=10)
+
+        self.requirements_tree.heading("Commodity", text="Commodity")
+        self.requirements_tree.heading("Amount Required", text="Amount Required")
+
+        self.requirements_tree.column("Commodity", width=150)
+        self.requirements_tree.column("Amount Required", width=100)
+
+        self.requirements_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Add scrollbar to treeview
+        tree_scrollbar = ttk.Scrollbar(requirements_frame, orient="vertical", command=self.requirements_tree.yview)
+        tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.requirements_tree.configure(yscrollcommand=tree_scrollbar.set)
+
+        # Add commodity frame
+        add_commodity_frame = tk.LabelFrame(right_frame, text="Add Commodity", padx=5, pady=5)
+        add_commodity_frame.pack(fill=tk.X, pady=10)
+
+        # Commodity dropdown
+        tk.Label(add_commodity_frame, text="Commodity:").grid(row=0, column=0, sticky=tk.W)
+
+        self.commodity_var = tk.StringVar()
+        self.commodity_dropdown = ttk.Combobox(add_commodity_frame, textvariable=self.commodity_var)
+        self.commodity_dropdown['values'] = self._items
+        self.commodity_dropdown.grid(row=0, column=1, padx=5, sticky=tk.EW)
+
+        # Enable autocomplete for commodity dropdown
+        self.commodity_dropdown.bind('<KeyRelease>', self._on_commodity_entry)
+
+        # Amount required entry
+        tk.Label(add_commodity_frame, text="Amount Required:").grid(row=0, column=2, padx=5, sticky=tk.W)
+        self.amount_var = tk.StringVar()
+        amount_entry = tk.Entry(add_commodity_frame, textvariable=self.amount_var, width=10)
+        amount_entry.grid(row=0, column=3, padx=5, sticky=tk.W)
+
+        add_commodity_frame.columnconfigure(1, weight=1)
+
+        # Add buttons for commodity management
+        buttons_frame2 = tk.Frame(right_frame)
+        buttons_frame2.pack(fill=tk.X, pady=5)
+
+        tk.Button(buttons_frame2, text="Add Commodity", command=self.add_commodity_requirement_to_tree).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        tk.Button(buttons_frame2, text="Remove Commodity", command=self.remove_commodity_requirement_from_tree).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+
+        # Save all button
+        tk.Button(right_frame, text="Save All Requirements", command=self.save_all_requirements,
+                 bg="#4CAF50", fg="white", font=("Arial", 10, "bold")).pack(fill=tk.X, pady=10)
+
+    def _on_commodity_entry(self, event):
         value = event.widget.get()
         if value == '':
-            commodity_dropdown['values'] = fetch_items()
+            self.commodity_dropdown['values'] = self._items
         else:
-            data = []
-            for item in fetch_items():
-                if value.lower() in item.lower():
-                    data.append(item)
-            commodity_dropdown['values'] = data
+            data = [item for item in self._items if value.lower() in item.lower()]
+            self.commodity_dropdown['values'] = data
             logger.debug(f"Filtered commodity dropdown to {len(data)} items matching '{value}'")
 
-    commodity_dropdown.bind('<KeyRelease>', on_commodity_entry)
-    
-    # Amount required entry
-    tk.Label(add_commodity_frame, text="Amount Required:").grid(row=0, column=2, padx=5, sticky=tk.W)
-    amount_var = tk.StringVar()
-    amount_entry = tk.Entry(add_commodity_frame, textvariable=amount_var, width=10)
-    amount_entry.grid(row=0, column=3, padx=5, sticky=tk.W)
-    
-    add_commodity_frame.columnconfigure(1, weight=1)
-    
-    # Action buttons for commodity requirements
-    def add_commodity_requirement_to_tree():
-        selected_site = construction_site_listbox.get(tk.ACTIVE)
+    def _load_requirements(self, site):
+        """Return a site's (commodity, amount) requirements, fetching them on first use."""
+        requirements = self._requirements.pop(site, None)
+        if requirements is None:
+            logger.debug(f"Loading requirements for site: {site}")
+            requirements = [(commodity, amount_required) for commodity, amount_required, _, _ in fetch_deliveries(site)
+                            if amount_required > 0]  # Only show items with requirements
+        # Re-insert so the most recently viewed sites are kept
+        self._requirements[site] = requirements
+        while len(self._requirements) > REQUIREMENT_CACHE_SIZE:
+            del self._requirements[next(iter(self._requirements))]
+        return requirements
+
+    def _show_requirements(self, site):
+        self.requirements_tree.delete(*self.requirements_tree.get_children())
+        self._dirty = False
+        if not site:
+            return
+        try:
+            requirements = self._load_requirements(site)
+            for commodity, amount_required in requirements:
+                self.requirements_tree.insert("", tk.END, values=(commodity, amount_required))
+            logger.debug(f"Showing {len(requirements)} requirements for {site}")
+        except Exception as e:
+            logger.error(f"Error loading requirements for {site}: {e}")
+
+    def _on_site_select(self, event):
+        selection = self.site_listbox.curselection()
+        if not selection:
+            return
+        self.selected_site = self._visible[selection[0]]
+        self._show_requirements(self.selected_site)
+
+    def add_commodity_requirement_to_tree(self):
+        selected_site = self.selected_site
         if not selected_site:
             logger.warning("Attempted to add commodity without selecting a site")
-            messagebox.showwarning("Selection Required", "Please select a construction site first")
+            messagebox.showwarning("Selection Required", "Please select a construction site first", parent=self.window)
             return
-        
-        commodity = commodity_var.get()
-        amount = amount_var.get()
-        
+
+        commodity = self.commodity_var.get()
+        amount = self.amount_var.get()
+
         if not commodity or not amount:
             logger.warning("Attempted to add commodity with missing information")
-            messagebox.showwarning("Input Required", "Please select a commodity and enter an amount")
+            messagebox.showwarning("Input Required", "Please select a commodity and enter an amount", parent=self.window)
             return
-            
+
         try:
             amount = int(amount)
             if amount <= 0:
                 raise ValueError("Amount must be positive")
-        except ValueError as e:
-            logger.warning(f"Invalid amount entered: {amount_var.get()}")
-            messagebox.showerror("Invalid Input", "Please enter a positive number for the amount")
+        except ValueError:
+            logger.warning(f"Invalid amount entered: {self.amount_var.get()}")
+            messagebox.showerror("Invalid Input", "Please enter a positive number for the amount", parent=self.window)
             return
-        
+
         # Check if the commodity already exists in the treeview
         existing_item_id = None
-        for item_id in requirements_tree.get_children():
-            item = requirements_tree.item(item_id)
+        for item_id in self.requirements_tree.get_children():
+            item = self.requirements_tree.item(item_id)
             if item['values'][0] == commodity:
                 existing_item_id = item_id
                 break
-        
+
         if existing_item_id:
             # Update existing item
             logger.info(f"Updating commodity requirement: {commodity} to {amount} for {selected_site}")
-            requirements_tree.item(existing_item_id, values=(commodity, amount))
+            self.requirements_tree.item(existing_item_id, values=(commodity, amount))
         else:
             # Add new item
             logger.info(f"Adding new commodity requirement: {commodity} ({amount}) for {selected_site}")
-            requirements_tree.insert("", tk.END, values=(commodity, amount))
-        
+            self.requirements_tree.insert("", tk.END, values=(commodity, amount))
+        self._dirty = True
+
         # Clear the entry fields
-        commodity_var.set("")
-        amount_var.set("")
+        self.commodity_var.set("")
+        self.amount_var.set("")
 
-    def remove_commodity_requirement_from_tree():
-        selected_item = requirements_tree.selection()
+    def remove_commodity_requirement_from_tree(self):
+        selected_item = self.requirements_tree.selection()
         if not selected_item:
             logger.warning("Attempted to remove commodity without selecting one")
-            messagebox.showwarning("Selection Required", "Please select a commodity to remove")
+            messagebox.showwarning("Selection Required", "Please select a commodity to remove", parent=self.window)
             return
-            
-        selected_values = requirements_tree.item(selected_item)['values']
+
+        selected_values = self.requirements_tree.item(selected_item)['values']
         logger.info(f"Removing commodity requirement: {selected_values[0]}")
-        requirements_tree.delete(selected_item)
+        self.requirements_tree.delete(selected_item)
+        self._dirty = True
 
-    def save_all_requirements():
-        selected_site = construction_site_listbox.get(tk.ACTIVE)
+    def save_all_requirements(self):
+        selected_site = self.selected_site
         if not selected_site:
             logger.warning("Attempted to save requirements without selecting a site")
-            messagebox.showwarning("Selection Required", "Please select a construction site")
+            messagebox.showwarning("Selection Required", "Please select a construction site", parent=self.window)
             return
-            
+
         # Get all items from the treeview
         requirements = []
-        for item_id in requirements_tree.get_children():
-            item = requirements_tree.item(item_id)
+        for item_id in self.requirements_tree.get_children():
+            item = self.requirements_tree.item(item_id)
             commodity, amount = item['values']
-            requirements.append((commodity, int(amount)))
-            
+            requirements.append((str(commodity), int(amount)))
+
         if not requirements:
             logger.warning("Attempted to save empty requirements list")
-            messagebox.showwarning("No Requirements", "Please add at least one commodity requirement")
+            messagebox.showwarning("No Requirements", "Please add at least one commodity requirement", parent=self.window)
             return
-            
+
         # Save all requirements using the database function
         logger.info(f"Saving {len(requirements)} commodity requirements for {selected_site}")
         try:
             update_commodity_requirements(selected_site, requirements)
-            messagebox.showinfo("Success", f"Requirements saved for {selected_site}")
-            if update_callback:
-                update_callback()
+            self._dirty = False
+            messagebox.showinfo("Success", f"Requirements saved for {selected_site}", parent=self.window)
+            if self.update_callback:
+                self.update_callback()
         except Exception as e:
             logger.error(f"Error saving requirements: {e}")
-            messagebox.showerror("Error", f"Failed to save requirements: {e}")
-
-    # When a site is selected, load its requirements
-    def on_site_select(event):
-        selected_site = construction_site_listbox.get(tk.ACTIVE)
-        if selected_site:
-            # Clear the requirements tree
-            requirements_tree.delete(*requirements_tree.get_children())
-            
-            # Load requirements for the selected site
-            logger.debug(f"Loading requirements for site: {selected_site}")
-            try:
-                deliveries = fetch_deliveries(selected_site)
-                count = 0
-                for delivery in deliveries:
-                    commodity, amount_required, _, _ = delivery
-                    if amount_required > 0:  # Only show items with requirements
-                        requirements_tree.insert("", tk.END, values=(commodity, amount_required))
-                        count += 1
-                logger.debug(f"Loaded {count} requirements for {selected_site}")
-            except Exception as e:
-                logger.error(f"Error loading requirements for {selected_site}: {e}")
-
-    construction_site_listbox.bind('<<ListboxSelect>>', on_site_select)
-    
-    # Add buttons for commodity management
-    buttons_frame2 = tk.Frame(right_frame)
-    buttons_frame2.pack(fill=tk.X, pady=5)
-    
-    tk.Button(buttons_frame2, text="Add Commodity", command=add_commodity_requirement_to_tree).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
-    tk.Button(buttons_frame2, text="Remove Commodity", command=remove_commodity_requirement_from_tree).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
-    
-    # Save all button
-    tk.Button(right_frame, text="Save All Requirements", command=save_all_requirements, 
-             bg="#4CAF50", fg="white", font=("Arial", 10, "bold")).pack(fill=tk.X, pady=10)
-    
-    logger.debug("Construction site manager UI setup complete")
\ No newline at end of file
+            messagebox.showerror("Error", f"Failed to save requirements: {e}", parent=self.window)
+
+    # --- SYNCHRONISATION AND VISIBILITY ---
+
+    def _on_events(self, events):
+        """Keep the site list and cached requirements in sync with changes made anywhere."""
+        reload_selected = False
+        for event in events:
+            if isinstance(event, SiteAdded):
+                self._insert_site(event.site)
+            elif isinstance(event, SiteRemoved):
+                self._delete_site(event.site)
+                self._requirements.pop(event.site, None)
+                if event.site == self.selected_site:
+                    self.selected_site = None
+                    self._show_requirements(None)
+            elif isinstance(event, SiteRenamed):
+                self._delete_site(event.site)
+                self._insert_site(event.new_name)
+                if event.site in self._requirements:
+                    self._requirements[event.new_name] = self._requirements.pop(event.site)
+                if event.site == self.selected_site:
+                    self.selected_site = event.new_name
+                    self._select_in_list(event.new_name)
+            else:
+                # RequirementChanged, RequirementRemoved or DeliveriesCleared
+                self._requirements.pop(event.site, None)
+                reload_selected = reload_selected or event.site == self.selected_site
+        # Refresh the shown requirements unless they hold unsaved edits
+        if reload_selected and not self._dirty:
+            self._show_requirements(self.selected_site)
+
+    def show(self):
+        """Show the window again, picking up any commodities added since it was hidden."""
+        items = fetch_items()
+        if items != self._items:
+            self._items = items
+            self.commodity_dropdown['values'] = items
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_set()
+
+    def hide(self):
+        """Hide the window; it keeps its state and is shown again by the next open."""
+        logger.debug("Hiding construction site manager window")
+        self.window.withdraw()
+
+    def _on_destroy(self, event):
+        if event.widget is self.window:
+            self._unsubscribe()
+
+_site_manager = None
+
+def open_construction_site_manager(parent, update_callback=None):
+    """Show the construction site management window, creating it on first use."""
+    global _site_manager
+    if _site_manager is not None and _site_manager.window.winfo_exists():
+        logger.info("Showing construction site manager window")
+        _site_manager.update_callback = update_callback
+        _site_manager.show()
+        return _site_manager
+    logger.info("Opening construction site manager window")
+    _site_manager = SiteManagerWindow(parent, update_callback)
+    return _site_manager
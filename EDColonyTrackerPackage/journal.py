@@ -0,0 +1,343 @@
+"""
+This module reads Elite Dangerous journal files (JSON-lines) and records colonisation
+contributions as deliveries, and generates synthetic journals for benchmarking.
+
+Journals are read in binary and each line's event name is matched with a regular
+expression before any JSON is decoded, so the many events the tracker ignores cost almost
+nothing. A ColonisationContribution is credited to the construction site the commander
+is docked at, taken from the last Docked event whose StationName is a known site.
+Contributions are written with add_deliveries in batches per site, keeping each one's
+journal timestamp, and each batch stores the journal offset it reached in the site's
+journal_state table in the same transaction. The offset reached in every file is also
+kept in the journal_files table of cargo_tracker.db, so a live journal can be re-read as
+it grows, and an ingest interrupted between batches skips what was already committed,
+so old journals are never counted twice.
+"""
+
+import json
+import os
+import random
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from database import (add_deliveries, fetch_construction_sites, fetch_items, fetch_journal_offset,
+                      get_db_path, open_connection)
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('Journal')
+
+# Source recorded in delivery_log for deliveries read from a journal
+JOURNAL_SOURCE = "journal"
+
+# Number of contributions written per add_deliveries call during ingest
+BATCH_SIZE = 5000
+
+# Events that affect deliveries; everything else is skipped before decoding
+RELEVANT_EVENTS = frozenset((b"Docked", b"Undocked", b"ColonisationContribution"))
+
+_EVENT_PATTERN = re.compile(rb'"event"\s*:\s*"([A-Za-z]+)"')
+
+# Relative frequency of each event type written by generate_journal_file
+DEFAULT_EVENT_MIX = {
+    "Music": 12, "ReceiveText": 14, "FSDJump": 6, "FuelScoop": 6, "Scan": 12,
+    "Docked": 4, "Undocked": 4, "MarketBuy": 8, "MarketSell": 4, "Cargo": 10,
+    "ColonisationConstructionDepot": 8, "ColonisationContribution": 12,
+}
+
+def create_journal_table():
+    """Create the table recording how far each journal file has been read."""
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS journal_files (
+                    path TEXT PRIMARY KEY,
+                    offset INTEGER,
+                    docked_at TEXT
+                )
+            ''')
+    except sqlite3.Error as e:
+        logger.error(f"Database error in create_journal_table: {e}")
+
+def _read_progress(path):
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            row = conn.execute("SELECT offset, docked_at FROM journal_files WHERE path = ?", (path,)).fetchone()
+            return row if row else (0, None)
+    except sqlite3.Error as e:
+        logger.error(f"Database error reading journal progress for {path}: {e}")
+        return 0, None
+
+def _save_progress(path, offset, docked_at):
+    try:
+        with open_connection(get_db_path("cargo_tracker.db")) as conn:
+            conn.execute("INSERT OR REPLACE INTO journal_files (path, offset, docked_at) VALUES (?, ?, ?)",
+                         (path, offset, docked_at))
+    except sqlite3.Error as e:
+        logger.error(f"Database error saving journal progress for {path}: {e}")
+
+class JournalLines:
+    """
+    Iterate over the newline-terminated lines of a binary file, stopping before a partly
+    written last line. consumed holds the number of bytes yielded so far.
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self.consumed = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._file.readline()
+        if not line.endswith(b"\n"):
+            raise StopIteration
+        self.consumed += len(line)
+        return line
+
+def event_name(line):
+    """Return the event name of a raw journal line as bytes, or None."""
+    match = _EVENT_PATTERN.search(line)
+    return match.group(1) if match else None
+
+def iter_relevant_events(lines):
+    """Decode only the lines whose event affects deliveries."""
+    for line in lines:
+        if event_name(line) in RELEVANT_EVENTS:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A live journal can end in a partly written line
+                logger.debug(f"Skipping undecodable journal line: {line[:80]!r}")
+
+def iter_contributions(events, known_sites, docked_at=None):
+    """
+    Turn decoded events into (site, commodity, amount, timestamp) contributions.
+
+    A contribution without a readable timestamp takes the last good one, or None (now)
+    if there has not been one. The docked site is updated as events are consumed; the
+    generator returns the site docked at when the events run out, so incremental reads
+    can continue from it.
+    """
+    last_timestamp = None
+    for event in events:
+        name = event.get("event")
+        if name == "Docked":
+            station = event.get("StationName")
+            docked_at = station if station in known_sites else None
+        elif name == "Undocked":
+            docked_at = None
+        elif name == "ColonisationContribution" and docked_at:
+            timestamp = _parse_timestamp(event.get("timestamp"))
+            if timestamp is None:
+                logger.warning(f"Contribution at {docked_at} has no valid timestamp: {event.get('timestamp')!r}")
+                timestamp = last_timestamp
+            last_timestamp = timestamp
+            for contribution in event.get("Contributions", []):
+                commodity = contribution.get("Name_Localised") or contribution.get("Name")
+                amount = contribution.get("Amount") or 0
+                if commodity and amount > 0:
+                    yield docked_at, commodity, amount, timestamp
+    return docked_at
+
+def _parse_timestamp(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def ingest_journal(path, from_start=False):
+    """
+    Record the colonisation contributions in a journal file as deliveries.
+
+    Only the part of the file added since the last ingest is read. Complete lines are
+    consumed; a trailing partial line is left for the next call. Batches end on a line
+    boundary and the offset reached is saved after each one, so an ingest that fails
+    part-way resumes after the last committed batch. With from_start, the whole file is
+    read and every contribution recorded again.
+
+    Returns:
+        int: Number of contributions recorded.
+    """
+    create_journal_table()
+    path = os.path.abspath(path)
+    offset, docked_at = (0, None) if from_start else _read_progress(path)
+    known_sites = set(fetch_construction_sites())
+
+    # Offset each site already holds contributions up to, read when the site first appears
+    committed = {}
+    batches = {}
+    pending = 0
+    recorded = 0
+    batch_end, batch_site = offset, docked_at
+    with open(path, mode='rb') as file:
+        file.seek(offset)
+        lines = JournalLines(file)
+        contributions = iter_contributions(iter_relevant_events(lines), known_sites, docked_at)
+        while True:
+            try:
+                site, commodity, amount, timestamp = next(contributions)
+            except StopIteration as stop:
+                docked_at = stop.value
+                break
+            line_end = offset + lines.consumed
+            if pending >= BATCH_SIZE and line_end != batch_end:
+                count = _write_batches(path, batches, batch_end)
+                if count is None:
+                    return recorded
+                recorded += count
+                _save_progress(path, batch_end, batch_site)
+                batches, pending = {}, 0
+            if site not in committed:
+                committed[site] = 0 if from_start else fetch_journal_offset(site, path)
+            if line_end <= committed[site]:
+                # Already committed by an ingest that stopped before saving its progress
+                continue
+            batches.setdefault(site, []).append((commodity, amount, JOURNAL_SOURCE, timestamp))
+            pending += 1
+            batch_end, batch_site = line_end, site
+        count = _write_batches(path, batches, batch_end)
+        if count is None:
+            return recorded
+        recorded += count
+
+    _save_progress(path, offset + lines.consumed, docked_at)
+    logger.info(f"Ingested {recorded} contributions ({lines.consumed:,} bytes) from {path}")
+    return recorded
+
+def _write_batches(path, batches, end):
+    """Commit each site's batch with the journal offset it reaches. Returns None on failure."""
+    recorded = 0
+    for site, deliveries in batches.items():
+        count = add_deliveries(site, deliveries, journal_offset=(path, end))
+        if count is None:
+            logger.error(f"Could not record journal contributions for {site}; stopping at offset {end}")
+            return None
+        recorded += count
+    return recorded
+
+def generate_journal_file(path, events=None, size_mb=None, mix=None, seed=None, commodities=None, sites=None):
+    """
+    Write a synthetic journal for testing ingestion.
+
+    Writing stops after the given number of events or once the file reaches size_mb,
+    whichever comes first (10,000 events if neither is given).
+
+    Args:
+        path (str): Output file path.
+        events (int): Number of events to write.
+        size_mb (float): Approximate file size to write, in megabytes.
+        mix (dict): Event name -> relative frequency, defaulting to DEFAULT_EVENT_MIX.
+        seed (int): Optional random seed for reproducible output.
+        commodities (list): Commodity names to use, defaulting to the items table.
+        sites (list): Station names to dock at, defaulting to the construction sites.
+
+    Returns:
+        tuple: (events written, bytes written)
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_EVENT_MIX
+    commodities = commodities or fetch_items()
+    sites = sites or fetch_construction_sites() or [f"Synthetic Depot {i}" for i in range(10)]
+    if events is None and size_mb is None:
+        events = 10000
+    max_bytes = int(size_mb * 1024 * 1024) if size_mb else None
+    names, weights = list(mix), list(mix.values())
+    start = datetime(2025, 4, 1, tzinfo=timezone.utc)
+    market_ids = {site: 3700000000 + i for i, site in enumerate(sites)}
+    docked = None
+    written = 0
+    size = 0
+
+    def symbol(name):
+        return f"${re.sub(r'[^A-Za-z0-9]', '', name)}_name;"
+
+    with open(path, mode='w', encoding='utf-8', newline='\n') as file:
+        while (events is None or written < events) and (max_bytes is None or size < max_bytes):
+            name = rng.choices(names, weights)[0]
+            if name in ("ColonisationContribution", "ColonisationConstructionDepot", "Undocked") and not docked:
+                name = "Docked"
+            elif name == "Docked" and docked:
+                name = "Undocked"
+            record = {"timestamp": (start + timedelta(seconds=written * 7)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                      "event": name}
+            if name == "Docked":
+                docked = rng.choice(sites)
+                record.update({"StationName": docked, "StationType": "PlanetaryConstructionDepot",
+                               "StarSystem": f"Synthetic {market_ids[docked] % 997:03d}",
+                               "MarketID": market_ids[docked], "DistFromStarLS": round(rng.uniform(5, 9000), 3)})
+            elif name == "Undocked":
+                record.update({"StationName": docked, "MarketID": market_ids[docked]})
+                docked = None
+            elif name == "ColonisationContribution":
+                record.update({"MarketID": market_ids[docked], "Contributions": [
+                    {"Name": symbol(commodity), "Name_Localised": commodity, "Amount": rng.randint(1, 784)}
+                    for commodity in rng.sample(commodities, k=rng.randint(1, 4))]})
+            elif name == "ColonisationConstructionDepot":
+                record.update({"MarketID": market_ids[docked], "ConstructionProgress": round(rng.random(), 6),
+                               "ConstructionComplete": False, "ConstructionFailed": False,
+                               "ResourcesRequired": [
+                                   {"Name": symbol(commodity), "Name_Localised": commodity,
+                                    "RequiredAmount": rng.randint(100, 20000), "ProvidedAmount": rng.randint(0, 100),
+                                    "Payment": rng.randint(500, 9000)} for commodity in commodities[:20]]})
+            elif name in ("MarketBuy", "MarketSell"):
+                commodity = rng.choice(commodities)
+                count = rng.randint(1, 784)
+                price = rng.randint(100, 9000)
+                record.update({"MarketID": rng.randint(3200000000, 3800000000), "Type": symbol(commodity).lower(),
+                               "Type_Localised": commodity, "Count": count,
+                               "BuyPrice" if name == "MarketBuy" else "SellPrice": price,
+                               "TotalCost" if name == "MarketBuy" else "TotalSale": count * price})
+            elif name == "Cargo":
+                inventory = [{"Name": symbol(commodity).lower(), "Name_Localised": commodity,
+                              "Count": rng.randint(1, 200), "Stolen": 0}
+                             for commodity in rng.sample(commodities, k=rng.randint(0, 6))]
+                record.update({"Vessel": "Ship", "Count": sum(item["Count"] for item in inventory),
+                               "Inventory": inventory})
+            elif name == "FSDJump":
+                record.update({"StarSystem": f"Synthetic {rng.randint(0, 99999):05d}",
+                               "SystemAddress": rng.randint(1, 2 ** 48),
+                               "StarPos": [round(rng.uniform(-1000, 1000), 5) for _ in range(3)],
+                               "JumpDist": round(rng.uniform(5, 70), 3), "FuelUsed": round(rng.uniform(0.5, 8), 6),
+                               "FuelLevel": round(rng.uniform(1, 32), 6)})
+            elif name == "FuelScoop":
+                record.update({"Scooped": round(rng.uniform(0.1, 5), 6), "Total": round(rng.uniform(5, 32), 6)})
+            elif name == "Scan":
+                record.update({"ScanType": "AutoScan", "BodyName": f"Synthetic {rng.randint(0, 99999):05d} A {rng.randint(1, 12)}",
+                               "BodyID": rng.randint(1, 60), "DistanceFromArrivalLS": round(rng.uniform(0, 90000), 6),
+                               "WasDiscovered": True, "WasMapped": rng.random() < 0.3})
+            elif name == "ReceiveText":
+                record.update({"From": "", "Message": "$COMMS_entered:#name=Synthetic;",
+                               "Message_Localised": "Entered Channel: Synthetic", "Channel": "npc"})
+            else:
+                record["MusicTrack"] = rng.choice(["Exploration", "Supercruise", "Starport", "NoTrack"])
+            line = json.dumps(record, separators=(', ', ':')) + "\n"
+            file.write(line)
+            size += len(line.encode('utf-8'))
+            written += 1
+    logger.info(f"Generated synthetic journal with {written} events ({size / 1024 / 1024:.1f} MB) at {path}")
+    return written, size
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest or generate Elite Dangerous journal files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Record colonisation contributions from a journal")
+    ingest_parser.add_argument("path")
+    ingest_parser.add_argument("--from-start", action="store_true", help="Re-read the whole file")
+
+    generate_parser = subparsers.add_parser("generate", help="Write a synthetic journal")
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--events", type=int)
+    generate_parser.add_argument("--size-mb", type=float)
+    generate_parser.add_argument("--seed", type=int)
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        print(f"Recorded {ingest_journal(args.path, from_start=args.from_start)} contributions")
+    else:
+        generate_journal_file(args.path, events=args.events, size_mb=args.size_mb, seed=args.seed)
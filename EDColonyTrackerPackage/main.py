@@ -5,6 +5,7 @@ This application tracks cargo deliveries for construction sites in Elite Dangero
 """
 
 import tkinter as tk
+import multiprocessing
 import sys
 from database import initialize_database, fetch_construction_sites
 from gui.main_window import MainWindow
@@ -57,4 +58,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Required for process pools in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,353 @@
+"""
+This module runs background maintenance (integrity checks, ANALYZE, PRAGMA optimize and
+incremental vacuum) over the database files in DB_DIR.
+
+Files are prioritised by how many write transactions they have seen since their last
+maintenance, read straight from the SQLite header's file change counter, so quiet files
+cost nothing. Work is split into steps that a background worker thread runs only while the
+user has been idle for a while, checking for activity between steps. Integrity checks and
+the one-off VACUUM can take seconds on large files and may wait on locks held by other
+writers, so none of it runs on the Tk thread; the Tk event loop only watches for activity,
+starts the worker and reports its results. Results are recorded in the db_maintenance
+table of cargo_tracker.db.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import database
+from database import read_change_counter
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('Maintenance')
+
+# Seconds without keyboard or mouse input before maintenance may run
+IDLE_SECONDS = 30
+
+# Milliseconds of work per run_slice call, and the delay between idle checks on the Tk thread
+SLICE_MS = 40
+TICK_MS = 1000
+
+# Seconds between rescans of DB_DIR for files that need maintenance
+RESCAN_SECONDS = 300
+
+# Write transactions a maintained file must see before it is maintained again
+MIN_CHANGES = 5
+
+# Re-run the integrity check on unchanged files after this many seconds
+RECHECK_SECONDS = 7 * 24 * 3600
+
+# Files larger than this are analysed but skip the full integrity check and vacuum
+MAX_CHECK_BYTES = 64 * 1024 * 1024
+
+# Vacuum once this fraction of a file's pages are free, releasing this many pages per step
+FREELIST_RATIO = 0.25
+VACUUM_PAGES_PER_STEP = 64
+
+# Primary SQLite result codes, which the sqlite3 module only exposes from Python 3.11
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+SQLITE_CORRUPT = 11
+SQLITE_NOTADB = 26
+
+def sqlite_error_code(error):
+    """
+    Return the primary SQLite result code of a sqlite3 error, or None if unknown.
+
+    Python 3.11 and later attach the code to the exception; on older versions it is
+    recognised from the message.
+    """
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xFF
+    message = str(error)
+    if "is locked" in message:
+        return SQLITE_BUSY
+    if "malformed" in message:
+        return SQLITE_CORRUPT
+    if "not a database" in message:
+        return SQLITE_NOTADB
+    return None
+
+def create_maintenance_table():
+    """Create the table recording maintenance results if it doesn't exist."""
+    try:
+        with database.open_connection(database.get_db_path("cargo_tracker.db")) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS db_maintenance (
+                    file TEXT PRIMARY KEY,
+                    change_counter INTEGER,
+                    last_maintained TEXT,
+                    last_maintained_ts REAL,
+                    integrity TEXT,
+                    freelist_before INTEGER,
+                    freelist_after INTEGER,
+                    duration_ms REAL
+                )
+            ''')
+    except sqlite3.Error as e:
+        logger.error(f"Database error in create_maintenance_table: {e}")
+
+def fetch_maintenance_records():
+    """Fetch recorded maintenance state keyed by file name."""
+    records = {}
+    try:
+        with database.open_connection(database.get_db_path("cargo_tracker.db")) as conn:
+            cursor = conn.execute("SELECT file, change_counter, last_maintained_ts, integrity FROM db_maintenance")
+            for file, change_counter, last_ts, integrity in cursor:
+                records[file] = (change_counter, last_ts, integrity)
+    except sqlite3.Error as e:
+        logger.error(f"Database error in fetch_maintenance_records: {e}")
+    return records
+
+def _record_result(file, result):
+    try:
+        with database.open_connection(database.get_db_path("cargo_tracker.db")) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO db_maintenance
+                    (file, change_counter, last_maintained, last_maintained_ts, integrity,
+                     freelist_before, freelist_after, duration_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (file, result['change_counter'], datetime.now(timezone.utc).isoformat(), time.time(),
+                  result['integrity'], result['freelist_before'], result['freelist_after'],
+                  result['duration_ms']))
+    except sqlite3.Error as e:
+        logger.error(f"Database error recording maintenance for {file}: {e}")
+
+def plan_maintenance():
+    """
+    Walk DB_DIR and list the files due for maintenance, most changed first.
+
+    Returns:
+        list: (priority, file name) tuples sorted by descending priority, where priority
+        is the number of write transactions since the file was last maintained. Files
+        with fewer than MIN_CHANGES writes are only included once RECHECK_SECONDS pass.
+    """
+    records = fetch_maintenance_records()
+    now = time.time()
+    plan = []
+    for name in os.listdir(database.DB_DIR):
+        if not name.endswith(".db"):
+            continue
+        counter = read_change_counter(os.path.join(database.DB_DIR, name))
+        if counter is None:
+            continue
+        last_counter, last_ts, _ = records.get(name, (None, None, None))
+        if last_counter is None:
+            priority = counter + 1
+        else:
+            # The counter is 32 bits and wraps around
+            priority = (counter - last_counter) % (1 << 32)
+            if priority < MIN_CHANGES:
+                priority = 1 if last_ts is None or now - last_ts > RECHECK_SECONDS else 0
+        if priority > 0:
+            plan.append((priority, name))
+    plan.sort(reverse=True)
+    return plan
+
+def maintain_file(name):
+    """
+    Generator that maintains one database file a step at a time.
+
+    Each next() performs one bounded piece of work and yields its name; the generator
+    returns the result dict when finished. A result with 'skipped' set, because the file
+    was locked by another writer or another error stopped the run, is not recorded, so
+    the file is tried again on the next scan.
+    """
+    path = os.path.join(database.DB_DIR, name)
+    started = time.perf_counter()
+    result = {'change_counter': read_change_counter(path), 'integrity': None, 'skipped': False,
+              'freelist_before': None, 'freelist_after': None, 'duration_ms': 0.0}
+    if not os.path.exists(path):
+        return result
+    large = os.path.getsize(path) > MAX_CHECK_BYTES
+
+    try:
+        # A tracked connection, so removing the site waits for the current step to finish
+        with database.open_connection(path) as conn:
+            if not large:
+                rows = conn.execute("PRAGMA integrity_check").fetchall()
+                result['integrity'] = "; ".join(row[0] for row in rows)
+                yield "integrity_check"
+                if result['integrity'] != "ok":
+                    logger.error(f"Integrity check failed for {name}: {result['integrity']}")
+                    return result
+
+            conn.execute("PRAGMA analysis_limit=400")
+            conn.execute("ANALYZE")
+            conn.commit()
+            yield "analyze"
+
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            result['freelist_before'] = freelist
+            if page_count and freelist / page_count >= FREELIST_RATIO and not large:
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    # Switching to incremental mode needs one full VACUUM; small files only
+                    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    conn.execute("VACUUM")
+                    yield "vacuum"
+                while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+                    conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+                    conn.commit()
+                    yield "incremental_vacuum"
+            result['freelist_after'] = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+            conn.execute("PRAGMA optimize")
+            yield "optimize"
+    except sqlite3.DatabaseError as e:
+        code = sqlite_error_code(e)
+        if not os.path.exists(path):
+            logger.info(f"Stopped maintenance of {name}: the file was removed")
+        elif code in (SQLITE_CORRUPT, SQLITE_NOTADB):
+            # A malformed file usually fails here rather than in integrity_check
+            result['integrity'] = f"error: {e}"
+            logger.error(f"Maintenance failed for {name}: {e}")
+        elif code in (SQLITE_BUSY, SQLITE_LOCKED):
+            result['skipped'] = True
+            logger.info(f"Skipped maintenance of {name} until the next scan: {e}")
+        else:
+            result['skipped'] = True
+            logger.error(f"Maintenance of {name} stopped, retrying on the next scan: {e}")
+    finally:
+        # Store the counter as of the end of maintenance, which our own writes advanced
+        result['change_counter'] = read_change_counter(path)
+        result['duration_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+class MaintenanceScheduler:
+    """
+    Run database maintenance on a worker thread while the user is idle.
+
+    A Tk timer checks for idleness every TICK_MS and starts the worker, which runs
+    maintenance steps until the user becomes active or nothing is due. Results are handed
+    back to the Tk thread, where corrupt files are reported.
+
+    Args:
+        root: The Tk root window; used for scheduling and to detect user activity.
+        on_corrupt: Optional callable(file_name, message) invoked on the Tk thread when a
+            file fails its integrity check. It should not block.
+    """
+
+    def __init__(self, root, on_corrupt=None):
+        self.root = root
+        self.on_corrupt = on_corrupt
+        self.last_activity = time.monotonic()
+        self._queue = []
+        self._current = None
+        self._current_name = None
+        self._last_scan = None
+        self._after_id = None
+        self._worker = None
+        self._stopping = threading.Event()
+        # (file name, result) pairs finished by the worker, reported on the Tk thread
+        self._results = queue.Queue()
+
+    def start(self):
+        """Create the results table, start watching for activity and schedule the first tick."""
+        create_maintenance_table()
+        for sequence in ("<Any-KeyPress>", "<Any-ButtonPress>", "<Motion>"):
+            self.root.bind_all(sequence, self._on_activity, add="+")
+        self._stopping.clear()
+        self._after_id = self.root.after(TICK_MS, self._tick)
+        logger.info("Background maintenance scheduler started")
+
+    def stop(self):
+        """Cancel any scheduled tick and wait for the worker to finish its current step."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        if self._current is not None:
+            # Closing the generator releases its connection
+            self._current.close()
+            self._current = None
+            self._current_name = None
+
+    def _on_activity(self, event):
+        self.last_activity = time.monotonic()
+
+    def _is_idle(self):
+        return time.monotonic() - self.last_activity >= IDLE_SECONDS
+
+    def _tick(self):
+        try:
+            self._report_results()
+            if self._is_idle() and (self._worker is None or not self._worker.is_alive()):
+                self._worker = threading.Thread(target=self._run_worker, name="Maintenance", daemon=True)
+                self._worker.start()
+        except Exception as e:
+            logger.error(f"Error during background maintenance: {e}")
+        self._after_id = self.root.after(TICK_MS, self._tick)
+
+    def _run_worker(self):
+        try:
+            while self._is_idle() and not self._stopping.is_set():
+                if not self._step():
+                    return
+        except Exception as e:
+            logger.error(f"Error during background maintenance: {e}", exc_info=True)
+
+    def run_slice(self, budget_seconds=SLICE_MS / 1000):
+        """
+        Run maintenance steps on the calling thread until the time budget is spent or
+        nothing is due, then report the results. Meant for scripts; the application uses
+        the worker thread.
+        """
+        deadline = time.perf_counter() + budget_seconds
+        while time.perf_counter() < deadline and self._step():
+            pass
+        self._report_results()
+
+    def _step(self):
+        """Run one maintenance step. Returns False when nothing is due."""
+        if self._current is None and not self._next_file():
+            return False
+        try:
+            next(self._current)
+        except StopIteration as stop:
+            self._finish_file(stop.value)
+        return True
+
+    def _next_file(self):
+        if not self._queue:
+            now = time.monotonic()
+            if self._last_scan is not None and now - self._last_scan < RESCAN_SECONDS:
+                return False
+            self._last_scan = now
+            self._queue = [name for _, name in plan_maintenance()]
+            if self._queue:
+                logger.info(f"Scheduled maintenance for {len(self._queue)} database files")
+            else:
+                return False
+        self._current_name = self._queue.pop(0)
+        self._current = maintain_file(self._current_name)
+        return True
+
+    def _finish_file(self, result):
+        name = self._current_name
+        self._current = None
+        self._current_name = None
+        if result is None or result['change_counter'] is None or result['skipped']:
+            return
+        _record_result(name, result)
+        self._results.put((name, result))
+
+    def _report_results(self):
+        while True:
+            try:
+                name, result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            logger.info(f"Maintained {name} in {result['duration_ms']:.1f} ms "
+                        f"(integrity: {result['integrity']}, freelist {result['freelist_before']} -> {result['freelist_after']})")
+            if result['integrity'] not in (None, "ok") and self.on_corrupt:
+                self.on_corrupt(name, result['integrity'])
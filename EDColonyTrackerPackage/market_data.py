@@ -0,0 +1,427 @@
+"""
+This module ingests local market data dumps (EDDN-style commodity snapshots in JSON-lines
+or CSV form) into an indexed SQLite table and answers "where can I buy what this site still
+needs" queries against it.
+
+Dumps are read line by line and written in batches, so files of several gigabytes can be
+ingested without loading them into memory. A station's market snapshot replaces all of
+that station's listings once it is newer than the stored ones, so commodities the station
+no longer sells disappear; older snapshots never overwrite newer data.
+"""
+
+import csv
+import gzip
+import json
+import os
+import random
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from commodity_aliases import CommodityResolver, normalize_key
+from database import get_db_path, fetch_items, fetch_deliveries, open_connection
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('MarketData')
+
+# Market listings live in their own database so large dumps never bloat cargo_tracker.db
+MARKET_DB_NAME = "market_data.db"
+
+# Number of listings written per executemany call during ingest
+BATCH_SIZE = 5000
+
+@contextmanager
+def _connect():
+    """Open a tracked connection to the market database, creating the schema if necessary."""
+    with open_connection(get_db_path(MARKET_DB_NAME)) as conn:
+        _create_schema(conn)
+        yield conn
+
+def _create_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_listings (
+            commodity TEXT NOT NULL,
+            system TEXT NOT NULL,
+            station TEXT NOT NULL,
+            buy_price INTEGER,
+            stock INTEGER,
+            distance_ls REAL,
+            x REAL,
+            y REAL,
+            z REAL,
+            updated_at TEXT,
+            PRIMARY KEY (commodity, system, station)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_market_listings_commodity_price
+        ON market_listings (commodity, buy_price)
+    ''')
+    # Looks up a system's coordinates to rank sellers by distance from it, and a station's
+    # newest and older listings when a snapshot replaces its market
+    conn.execute("DROP INDEX IF EXISTS idx_market_listings_system")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_market_listings_station
+        ON market_listings (system, station, updated_at)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_snapshots (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            listings INTEGER,
+            ingested_at TEXT
+        )
+    ''')
+
+def _open_dump(path):
+    """Open a dump file for streaming text reads, transparently handling gzip."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode='rt', encoding='utf-8', newline='')
+    return open(path, mode='r', encoding='utf-8', newline='')
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _coords(record):
+    """Extract (x, y, z) system coordinates from a record, if it carries any."""
+    coords = record.get("coords") or record.get("StarPos")
+    if isinstance(coords, dict):
+        return _to_float(coords.get("x")), _to_float(coords.get("y")), _to_float(coords.get("z"))
+    if isinstance(coords, (list, tuple)) and len(coords) == 3:
+        return tuple(_to_float(c) for c in coords)
+    return _to_float(record.get("x")), _to_float(record.get("y")), _to_float(record.get("z"))
+
+def _listings_from_record(record):
+    """
+    Yield flat listing dicts from one dump record.
+
+    Both EDDN commodity messages (a station with a "commodities" list, optionally wrapped in
+    a "message" envelope) and flat one-commodity-per-row records are accepted. Listings
+    from a commodities list are marked as a snapshot: the station's whole market at that
+    time.
+    """
+    message = record.get("message", record)
+    if not isinstance(message, dict):
+        logger.warning(f"Skipping market record whose message is not an object: {str(message)[:80]}")
+        return
+    commodities = message.get("commodities")
+    if commodities is None:
+        yield {
+            "name": message.get("commodity") or message.get("name"),
+            "system": message.get("system") or message.get("systemName"),
+            "station": message.get("station") or message.get("stationName"),
+            "buy_price": _to_int(message.get("buy_price", message.get("buyPrice"))),
+            "stock": _to_int(message.get("stock")),
+            "distance_ls": _to_float(message.get("distance_ls", message.get("distanceToArrival"))),
+            "coords": _coords(message),
+            "timestamp": message.get("timestamp") or message.get("updated_at"),
+            "snapshot": False,
+        }
+        return
+
+    system = message.get("systemName") or message.get("system")
+    station = message.get("stationName") or message.get("station")
+    distance_ls = _to_float(message.get("distanceToArrival", message.get("distance_ls")))
+    coords = _coords(message)
+    timestamp = message.get("timestamp") or message.get("updated_at")
+    for commodity in commodities:
+        if not isinstance(commodity, dict):
+            logger.warning(f"Skipping commodity entry that is not an object at {station}: {str(commodity)[:80]}")
+            continue
+        yield {
+            "name": commodity.get("name"),
+            "system": system,
+            "station": station,
+            "buy_price": _to_int(commodity.get("buyPrice", commodity.get("buy_price"))),
+            "stock": _to_int(commodity.get("stock")),
+            "distance_ls": distance_ls,
+            "coords": coords,
+            "timestamp": timestamp,
+            "snapshot": True,
+        }
+
+def _iter_records(path):
+    """Stream records from a JSON-lines or CSV dump without reading the whole file."""
+    base_path = path[:-3] if path.endswith(".gz") else path
+    with _open_dump(path) as file:
+        if base_path.lower().endswith(".csv"):
+            for row in csv.DictReader(file):
+                yield row
+            return
+
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed line {line_number} in {path}: {e}")
+                continue
+            if not isinstance(record, dict):
+                logger.warning(f"Skipping line {line_number} in {path}: not a JSON object")
+                continue
+            yield record
+
+def ingest_market_dump(path, force=False):
+    """
+    Stream a market dump into the market database.
+
+    Only commodities known to the items table are stored. A station snapshot newer than
+    everything stored for the station replaces the station's listings, dropping
+    commodities it no longer lists; an older snapshot is ignored. Flat one-commodity rows
+    are upserted, replacing a listing only with a newer one. Either way, ingesting dumps
+    out of order never regresses the data. A file whose size and modification time match
+    the last ingest is skipped unless force is True.
+
+    Returns:
+        int: The number of listings written.
+    """
+    logger.info(f"Ingesting market data from {path}")
+    # Dumps list every traded commodity, so only exact aliases are matched, never fuzzy ones
+    resolver = CommodityResolver(fetch_items(), fuzzy=False)
+    stat = os.stat(path)
+    written = 0
+    skipped = 0
+    try:
+        with _connect() as conn:
+            if not force:
+                row = conn.execute("SELECT size, mtime FROM market_snapshots WHERE path = ?",
+                                   (os.path.abspath(path),)).fetchone()
+                if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                    logger.info(f"Market dump {path} unchanged since last ingest, skipping")
+                    return 0
+
+            batch = []
+            # Newest snapshot timestamp in the batch for each (system, station)
+            snapshots = {}
+            for record in _iter_records(path):
+                for listing in _listings_from_record(record):
+                    commodity = resolver.resolve(listing["name"])
+                    if not commodity or not listing["system"] or not listing["station"]:
+                        skipped += 1
+                        continue
+                    x, y, z = listing["coords"]
+                    timestamp = listing["timestamp"] or ""
+                    batch.append((commodity, listing["system"], listing["station"],
+                                  listing["buy_price"], listing["stock"], listing["distance_ls"],
+                                  x, y, z, timestamp))
+                    if listing["snapshot"]:
+                        key = (listing["system"], listing["station"])
+                        snapshots[key] = max(snapshots.get(key, ""), timestamp)
+                    if len(batch) >= BATCH_SIZE:
+                        written += _write_batch(conn, batch, snapshots)
+                        batch = []
+                        snapshots = {}
+            if batch:
+                written += _write_batch(conn, batch, snapshots)
+
+            conn.execute('''
+                INSERT OR REPLACE INTO market_snapshots (path, size, mtime, listings, ingested_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (os.path.abspath(path), stat.st_size, stat.st_mtime, written,
+                  datetime.now(timezone.utc).isoformat()))
+        logger.info(f"Ingested {written} market listings from {path} ({skipped} skipped)")
+    except sqlite3.Error as e:
+        logger.error(f"Database error in ingest_market_dump: {e}")
+    return written
+
+def _write_batch(conn, batch, snapshots):
+    """
+    Write a batch of listings, keeping whichever copy has the newer timestamp.
+
+    For each station in snapshots, listings older than its snapshot are deleted first, so
+    commodities missing from the snapshot go away. If the station already has newer data,
+    the snapshot is stale and the station's older rows in the batch are dropped instead.
+    """
+    floors = {}
+    for (system, station), timestamp in snapshots.items():
+        newest = conn.execute("SELECT MAX(updated_at) FROM market_listings WHERE system = ? AND station = ?",
+                              (system, station)).fetchone()[0]
+        if newest is not None and newest > timestamp:
+            floors[(system, station)] = newest
+        else:
+            conn.execute("DELETE FROM market_listings WHERE system = ? AND station = ? AND updated_at < ?",
+                         (system, station, timestamp))
+            floors[(system, station)] = timestamp
+    if floors:
+        batch = [row for row in batch if row[9] >= floors.get((row[1], row[2]), "")]
+    before = conn.total_changes
+    conn.executemany('''
+        INSERT INTO market_listings
+            (commodity, system, station, buy_price, stock, distance_ls, x, y, z, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (commodity, system, station) DO UPDATE SET
+            buy_price = excluded.buy_price,
+            stock = excluded.stock,
+            distance_ls = COALESCE(excluded.distance_ls, distance_ls),
+            x = COALESCE(excluded.x, x),
+            y = COALESCE(excluded.y, y),
+            z = COALESCE(excluded.z, z),
+            updated_at = excluded.updated_at
+        WHERE excluded.updated_at >= market_listings.updated_at
+    ''', batch)
+    conn.commit()
+    return conn.total_changes - before
+
+def find_sellers(commodity, origin=None, limit=5, min_stock=1):
+    """
+    Find stations selling a commodity.
+
+    If origin is an (x, y, z) tuple, stations are ordered by distance from it; otherwise
+    they are ordered by buy price. Each result is a tuple of
+    (system, station, buy_price, stock, distance_ly, updated_at), with distance_ly None
+    when no origin is given or the station has no coordinates.
+    """
+    sellers = []
+    try:
+        with _connect() as conn:
+            if origin:
+                ox, oy, oz = origin
+                cursor = conn.execute('''
+                    SELECT system, station, buy_price, stock,
+                           (x - ?) * (x - ?) + (y - ?) * (y - ?) + (z - ?) * (z - ?) AS dist2,
+                           updated_at
+                    FROM market_listings
+                    WHERE commodity = ? AND stock >= ? AND x IS NOT NULL
+                    ORDER BY dist2, buy_price
+                    LIMIT ?
+                ''', (ox, ox, oy, oy, oz, oz, commodity, min_stock, limit))
+                sellers = [(system, station, price, stock, dist2 ** 0.5, updated)
+                           for system, station, price, stock, dist2, updated in cursor]
+            else:
+                cursor = conn.execute('''
+                    SELECT system, station, buy_price, stock, NULL, updated_at
+                    FROM market_listings
+                    WHERE commodity = ? AND stock >= ?
+                    ORDER BY buy_price
+                    LIMIT ?
+                ''', (commodity, min_stock, limit))
+                sellers = cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error in find_sellers: {e}")
+    return sellers
+
+def find_system_coordinates(system):
+    """Return the (x, y, z) coordinates of a system seen in the market data, or None."""
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT x, y, z FROM market_listings WHERE system = ? AND x IS NOT NULL LIMIT 1",
+                               (system,)).fetchone()
+            return tuple(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Database error in find_system_coordinates: {e}")
+        return None
+
+def parse_origin(text):
+    """
+    Turn user input into origin coordinates for find_sellers.
+
+    Accepts "x, y, z" coordinates or the name of a system in the market data. Returns
+    None if the text is neither.
+    """
+    parts = [part.strip() for part in text.split(",")]
+    if len(parts) == 3:
+        try:
+            return tuple(float(part) for part in parts)
+        except ValueError:
+            pass
+    return find_system_coordinates(text.strip()) if text.strip() else None
+
+def find_sellers_for_site(construction_site, origin=None, limit=5):
+    """
+    Find stations selling each commodity a construction site still needs.
+
+    Returns:
+        dict: Maps each commodity with a remaining amount to a list of seller tuples as
+        returned by find_sellers, limited to stations stocking at least one unit.
+    """
+    results = {}
+    for commodity, _, remaining, _ in fetch_deliveries(construction_site):
+        if remaining > 0:
+            results[commodity] = find_sellers(commodity, origin=origin, limit=limit)
+    logger.debug(f"Found sellers for {len(results)} remaining commodities at {construction_site}")
+    return results
+
+def generate_market_fixture(path, stations=1000, fmt="jsonl", seed=None, commodities=None):
+    """
+    Write a synthetic EDDN-style market dump for testing ingestion.
+
+    Args:
+        path (str): Output file path.
+        stations (int): Number of station snapshots to write.
+        fmt (str): "jsonl" for EDDN commodity messages, "csv" for flat rows.
+        seed (int): Optional random seed for reproducible output.
+        commodities (list): Commodity names to use, defaulting to the items table.
+    """
+    rng = random.Random(seed)
+    commodities = commodities or fetch_items()
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(file)
+            writer.writerow(["system", "station", "commodity", "buy_price", "stock",
+                             "distance_ls", "x", "y", "z", "timestamp"])
+        for i in range(stations):
+            system = f"Synthetic Sector {i // 4:05d}"
+            station = f"Station {i:06d}"
+            x, y, z = (round(rng.uniform(-1000, 1000), 3) for _ in range(3))
+            distance_ls = rng.randint(10, 50000)
+            timestamp = (start + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            stocked = rng.sample(commodities, k=rng.randint(1, len(commodities)))
+            if writer:
+                for name in stocked:
+                    writer.writerow([system, station, name, rng.randint(100, 10000),
+                                     rng.randint(0, 50000), distance_ls, x, y, z, timestamp])
+            else:
+                message = {
+                    "$schemaRef": "https://eddn.edcd.io/schemas/commodity/3",
+                    "message": {
+                        "systemName": system,
+                        "stationName": station,
+                        "distanceToArrival": distance_ls,
+                        "StarPos": [x, y, z],
+                        "timestamp": timestamp,
+                        "commodities": [
+                            {"name": normalize_key(name), "buyPrice": rng.randint(100, 10000),
+                             "stock": rng.randint(0, 50000)}
+                            for name in stocked
+                        ],
+                    },
+                }
+                file.write(json.dumps(message) + "\n")
+    logger.info(f"Generated synthetic market fixture with {stations} stations at {path}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest or generate local market data dumps.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Ingest a JSON-lines or CSV market dump")
+    ingest_parser.add_argument("path")
+    ingest_parser.add_argument("--force", action="store_true", help="Re-ingest even if unchanged")
+
+    generate_parser = subparsers.add_parser("generate", help="Write a synthetic market dump")
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--stations", type=int, default=1000)
+    generate_parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    generate_parser.add_argument("--seed", type=int)
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        print(f"Ingested {ingest_market_dump(args.path, force=args.force)} listings")
+    else:
+        generate_market_fixture(args.path, stations=args.stations, fmt=args.format, seed=args.seed)
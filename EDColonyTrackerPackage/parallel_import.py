@@ -0,0 +1,144 @@
+"""
+This module imports many CSV requirement sheets at once, writing each construction site's
+database from a pool of worker processes.
+
+Every site lives in its own SQLite file, so sites can be written independently. Rows from
+all input files are first sharded by site, each shard is written in one transaction by a
+worker process, and the new sites are registered in cargo_tracker.db in a single batched
+step at the end.
+"""
+
+import csv
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+from database import (add_construction_sites, delivery_cache, site_file_name, site_registry,
+                      write_site_requirements)
+from events import publish, RequirementChanged
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('ParallelImport')
+
+def collect_csv_files(paths):
+    """Expand a list of files and directories into a sorted list of CSV file paths."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path)
+                         if name.lower().endswith(".csv"))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def shard_rows_by_site(csv_files):
+    """
+    Read requirement rows from CSV files and group them by construction site.
+
+    Rows follow the single-file import format (Commodity, Amount Required, Construction
+    Site, with a header row). Incomplete rows are skipped, as in import_from_csv_to_db.
+
+    Returns:
+        OrderedDict: Maps each site name to a list of (commodity, amount_required) tuples.
+    """
+    shards = OrderedDict()
+    for csv_file in csv_files:
+        with open(csv_file, mode='r', newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header row
+            for row in reader:
+                if len(row) < 3:
+                    continue
+                commodity, amount_required, construction_site = row[:3]
+                if not commodity or not construction_site:
+                    continue
+                amount_required = int(amount_required) if amount_required and amount_required.isdigit() else 0
+                shards.setdefault(construction_site, []).append((commodity, amount_required))
+    return shards
+
+def _import_site_shard(db_dir, construction_site, requirements, db_file):
+    """Worker entry point: write one site's requirements into its own database file."""
+    database.DB_DIR = db_dir
+    return construction_site, write_site_requirements(construction_site, requirements, db_file)
+
+def _remove_unregistered_file(db_file):
+    """Delete a database file reserved for a new site whose import failed."""
+    path = database.get_db_path(db_file)
+    for leftover in (path, path + "-journal"):
+        try:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        except OSError as e:
+            logger.warning(f"Could not remove {leftover} after a failed import: {e}")
+
+def import_csv_files_parallel(paths, max_workers=None):
+    """
+    Import requirement sheets from many CSV files or directories using a process pool.
+
+    A site whose requirements cannot be written does not stop the import: every other
+    site is still written and registered, and the failures are returned. Files created
+    for new sites that failed are deleted.
+
+    Args:
+        paths (list): CSV file paths and/or directories containing CSV files.
+        max_workers (int): Number of worker processes, defaulting to the CPU count.
+            A value of 1 writes every site in the calling process.
+
+    Returns:
+        tuple: (number of sites imported, number of requirement rows written, dict
+        mapping each site that failed to a description of the error)
+    """
+    csv_files = collect_csv_files(paths)
+    shards = shard_rows_by_site(csv_files)
+    logger.info(f"Importing {sum(len(rows) for rows in shards.values())} rows for "
+                f"{len(shards)} sites from {len(csv_files)} CSV files")
+
+    # Registered sites keep their file; new sites get one here so that the workers and the
+    # registration at the end agree on it
+    registered = {site: site_registry.file_for(site) for site in shards}
+    db_files = {site: registered[site] or site_file_name(site) for site in shards}
+
+    written = {}
+    failures = {}
+    if max_workers == 1 or len(shards) <= 1:
+        for site, requirements in shards.items():
+            try:
+                written[site] = write_site_requirements(site, requirements, db_files[site])
+            except Exception as e:
+                failures[site] = str(e)
+    else:
+        # Spawn rather than fork, since the caller may be the Tk main loop
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = {executor.submit(_import_site_shard, database.DB_DIR, site, requirements, db_files[site]): site
+                       for site, requirements in shards.items()}
+            for future, site in futures.items():
+                try:
+                    written[site] = future.result()[1]
+                except Exception as e:
+                    failures[site] = str(e) or type(e).__name__
+                    continue
+                # Worker processes have their own caches and event buses, so invalidate
+                # and announce the change here
+                delivery_cache.invalidate(site)
+                if written[site]:
+                    publish(RequirementChanged(site, None, None))
+
+    # write_site_requirements logs its own errors and reports them by writing nothing
+    for site, count in written.items():
+        if not count and shards[site]:
+            failures[site] = "no requirements could be written"
+
+    imported_sites = [site for site, count in written.items() if count]
+    add_construction_sites(imported_sites, db_files)
+    for site in failures:
+        if registered[site] is None:
+            _remove_unregistered_file(db_files[site])
+    total_rows = sum(written.values())
+    logger.info(f"Parallel import finished: {total_rows} rows across {len(imported_sites)} sites")
+    for site, error in failures.items():
+        logger.error(f"Could not import requirements for {site}: {error}")
+    return len(imported_sites), total_rows, failures
@@ -0,0 +1,154 @@
+"""
+This module builds per-site delivery progress time series and downsamples them for charts.
+
+A series holds the cumulative delivered amount after every logged delivery. For drawing,
+events are grouped into fixed-width time buckets (powers of two seconds, one width per zoom
+level) and each bucket is reduced to its first, min, max and last points, so a chart over
+100k deliveries draws only a few hundred points while keeping every spike visible. Bucket
+levels are cached per site and zoom level and extended in place as deliveries are appended,
+so new deliveries never trigger a recomputation of the whole series.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from database import fetch_deliveries, fetch_delivery_history
+from utils import get_logger
+
+# Get a logger for this module
+logger = get_logger('ProgressHistory')
+
+# Number of site series kept in memory
+MAX_CACHED_SERIES = 16
+
+# Bucket widths range from 1 second to 2**MAX_LEVEL seconds
+MAX_LEVEL = 40
+
+class _BucketLevel:
+    """First/min/max/last reduction of a series into buckets of 2**level seconds."""
+
+    __slots__ = ('width', 'keys', 'points', 'processed')
+
+    def __init__(self, level):
+        self.width = float(2 ** level)
+        self.keys = []
+        self.points = []
+        self.processed = 0
+
+    def extend(self, times, values):
+        """Fold series points not yet seen into the buckets."""
+        for i in range(self.processed, len(times)):
+            t, v = times[i], values[i]
+            key = math.floor(t / self.width)
+            if self.keys and self.keys[-1] == key:
+                first, low, high, _ = self.points[-1]
+                if v < low[1]:
+                    low = (t, v)
+                if v > high[1]:
+                    high = (t, v)
+                self.points[-1] = (first, low, high, (t, v))
+            else:
+                self.keys.append(key)
+                self.points.append(((t, v), (t, v), (t, v), (t, v)))
+        self.processed = len(times)
+
+    def window(self, t0, t1):
+        """Return the reduced points of every bucket overlapping [t0, t1], in time order."""
+        start = bisect_left(self.keys, math.floor(t0 / self.width))
+        end = bisect_right(self.keys, math.floor(t1 / self.width))
+        result = []
+        for first, low, high, last in self.points[start:end]:
+            middle = sorted({low, high})
+            for point in [first] + middle + [last]:
+                if not result or result[-1] != point:
+                    result.append(point)
+        return result
+
+class ProgressSeries:
+    """Cumulative delivered amount over time for one construction site."""
+
+    def __init__(self, construction_site):
+        self.construction_site = construction_site
+        self.times = []
+        self.values = []
+        self.baseline = 0
+        self.required = 0
+        self.last_id = 0
+        self._levels = {}
+        self.reload()
+
+    def reload(self):
+        """Rebuild the series from scratch, e.g. after deliveries were cleared."""
+        self.times = []
+        self.values = []
+        self.last_id = 0
+        self._levels = {}
+        # Back-filled deliveries can be logged after newer ones, so order by time
+        history = sorted(fetch_delivery_history(self.construction_site), key=lambda row: (row[1], row[0]))
+        deliveries = fetch_deliveries(self.construction_site)
+        self.required = sum(delivery[1] for delivery in deliveries)
+        # Deliveries recorded before the log existed show up as the starting amount
+        logged = sum(quantity for _, _, quantity in history)
+        self.baseline = sum(delivery[3] for delivery in deliveries) - logged
+        self._append(history)
+        logger.debug(f"Loaded {len(self.times)} history points for {self.construction_site}")
+
+    def refresh(self):
+        """Append deliveries logged since the last refresh and update the required total."""
+        self.required = sum(delivery[1] for delivery in fetch_deliveries(self.construction_site))
+        history = fetch_delivery_history(self.construction_site, after_id=self.last_id)
+        if history and self.times and min(row[1] for row in history) < self.times[-1]:
+            self.reload()
+            return
+        self._append(sorted(history, key=lambda row: (row[1], row[0])))
+
+    def _append(self, history):
+        total = self.values[-1] if self.values else self.baseline
+        for log_id, delivered_at, quantity in history:
+            total += quantity or 0
+            self.times.append(delivered_at)
+            self.values.append(total)
+            self.last_id = max(self.last_id, log_id)
+        for level in self._levels.values():
+            level.extend(self.times, self.values)
+
+    def level_for(self, span, max_points):
+        """Return the zoom level whose buckets fit a time span into max_points points."""
+        buckets = max(1, max_points // 4 - 1)
+        return min(MAX_LEVEL, max(0, math.ceil(math.log2(max(span, 1.0) / buckets))))
+
+    def downsample(self, t0, t1, max_points):
+        """
+        Return at most max_points (time, value) points covering [t0, t1].
+
+        Series small enough to draw directly are returned as-is.
+        """
+        start = bisect_left(self.times, t0)
+        end = bisect_right(self.times, t1)
+        if end - start <= max_points:
+            return list(zip(self.times[start:end], self.values[start:end]))
+
+        level = self.level_for(t1 - t0, max_points)
+        cached = self._levels.get(level)
+        if cached is None:
+            cached = self._levels[level] = _BucketLevel(level)
+            cached.extend(self.times, self.values)
+        return cached.window(t0, t1)
+
+_series_cache = OrderedDict()
+
+def get_progress_series(construction_site):
+    """Return the cached progress series for a site, loading it if needed."""
+    series = _series_cache.get(construction_site)
+    if series is None:
+        series = _series_cache[construction_site] = ProgressSeries(construction_site)
+        while len(_series_cache) > MAX_CACHED_SERIES:
+            _series_cache.popitem(last=False)
+    else:
+        _series_cache.move_to_end(construction_site)
+    return series
+
+def discard_progress_series(construction_site):
+    """Drop a site's cached series, e.g. when the site is removed or renamed."""
+    _series_cache.pop(construction_site, None)
@@ -8,8 +8,12 @@ import logging
 # Base directory of the application
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Environment variable that sends the log elsewhere; the benchmarks set it so neither they
+# nor the worker processes they spawn write to the application log
+LOG_FILE_VARIABLE = "EDCT_LOG_FILE"
+
 # Log file path
-LOG_FILE = os.path.join(BASE_DIR, "edcolonytracker.log")
+LOG_FILE = os.environ.get(LOG_FILE_VARIABLE) or os.path.join(BASE_DIR, "edcolonytracker.log")
 
 # Configure logging once for the entire application
 logging.basicConfig(